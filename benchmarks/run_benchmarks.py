@@ -0,0 +1,162 @@
+"""
+Benchmarks for the speedups of the vectorized day counts, the lazy holiday engines and the NumPy backtest engine.
+
+    python benchmarks/run_benchmarks.py [--baseline REV] [--pairs 100000] [--imports 20]
+
+Each benchmark runs in a fresh interpreter, on the working tree and, with --baseline, on a copy of the git revision
+REV (extracted with git archive), so that both are timed with the same installed packages:
+
+    daycounts   DayCounts.tf for ACT/ACT ISDA, ACT/ACT AFB and 1/1 on random date pairs (the loops over pairs before
+                the vectorized day counts take a few milliseconds per pair, so 100000 pairs run for minutes there)
+    import      wall time of python -c "import calendars", median over fresh interpreters, and the time of the
+                import alone once numpy and pandas are imported
+    backtest    FHLongOnlyWeights.run_backtest, 25 years x 50 assets with month-end rebalancing, against the loop over
+                dates that run_backtest used before the NumPy engine (reproduced below, as the old code no longer runs
+                with current pandas), checking that both give the same backtest, pnl and holdings
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def daycounts(tree, pairs):
+    import numpy as np
+    import pandas as pd
+    from calendars import DayCounts
+
+    rng = np.random.default_rng(0)
+    d1 = pd.DatetimeIndex(pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.integers(0, 9000, pairs), 'D'))
+    d2 = d1 + pd.to_timedelta(rng.integers(1, 11000, pairs), 'D')
+    results = {}
+    for dc in ['ACT/ACT ISDA', 'ACT/ACT AFB', '1/1']:
+        counter = DayCounts(dc, calendar='us_trading')
+        start = time.perf_counter()
+        counter.tf(d1, d2)
+        results[dc] = time.perf_counter() - start
+    return results
+
+
+def imports(tree, runs):
+    # the wall time of the interpreter, and the time of the import itself once numpy and pandas are imported
+    times, own_times = [], []
+    own = 'import time, numpy, pandas; t = time.perf_counter(); import calendars; print(time.perf_counter() - t)'
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import calendars'], cwd=tree, check=True)
+        times.append(time.perf_counter() - start)
+        output = subprocess.run([sys.executable, '-c', own], cwd=tree, check=True, capture_output=True, text=True)
+        own_times.append(float(output.stdout))
+    return {'median': statistics.median(times), 'min': min(times), 'median after pandas': statistics.median(own_times)}
+
+
+def loop_backtest(ts, weights):
+    """
+    The loop over dates of run_backtest before the NumPy engine, with pd.concat instead of DataFrame.append
+    """
+    import pandas as pd
+
+    backtest = pd.Series(index=ts.index, dtype=object)
+    backtest.iloc[0] = 1
+    pnl = pd.Series(index=ts.index, dtype=object)
+    pnl.iloc[0] = 0
+    if min(weights.index) > min(ts.index):
+        w0 = pd.DataFrame(columns=[min(ts.index)], index=weights.columns, data=weights.iloc[0].values)
+        weights = pd.concat([weights, w0.T]).sort_index()
+    holdings = pd.DataFrame(index=ts.index, columns=ts.columns, dtype=object)
+    holdings.iloc[0] = weights.iloc[0] / ts.iloc[0]
+    for t, tm1 in zip(backtest.index[1:], backtest.index[:-1]):
+        prices_t = ts.loc[:t].iloc[-1]
+        previous_prices = ts.loc[:tm1].iloc[-1]
+        pnl[t] = (holdings.loc[tm1].copy() * (prices_t - previous_prices)).sum()
+        backtest[t] = backtest[tm1] + pnl[t]
+        if t in weights.index:
+            holdings.loc[t] = backtest.loc[tm1] * weights.loc[t] / ts.loc[t]
+        else:
+            holdings.loc[t] = holdings.loc[tm1].copy()
+    return backtest.astype(float), pnl.astype(float), holdings.astype(float)
+
+
+def backtest(tree, years=25, assets=50):
+    import numpy as np
+    import pandas as pd
+
+    # portfolio/__init__.py cannot be imported, so the module is loaded from its file
+    spec = importlib.util.spec_from_file_location('backtesting', os.path.join(tree, 'portfolio', 'backtesting.py'))
+    backtesting = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(backtesting)
+
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range('1995-01-02', periods=252 * years)
+    ts = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, (len(index), assets)), axis=0)), index=index,
+                      columns=['A%02d' % i for i in range(assets)])
+    strategy = backtesting.FHLongOnlyWeights(ts, DTINI='1995-01-02', static=True, weighting_scheme='EW')
+    ts, weights = strategy.ts, strategy.weights
+
+    start = time.perf_counter()
+    strategy.run_backtest()
+    engine = time.perf_counter() - start
+    start = time.perf_counter()
+    loop = loop_backtest(ts, weights)
+    elapsed = time.perf_counter() - start
+    same = (np.array_equal(strategy.backtest.iloc[:, 0].values, loop[0].values)
+            and np.array_equal(strategy.pnl.values, loop[1].values)
+            and np.array_equal(strategy.holdings.values.astype(float), loop[2].values, equal_nan=True))
+    return {'engine': engine, 'loop': elapsed, 'same results': same}
+
+
+BENCHMARKS = {'daycounts': daycounts, 'import': imports, 'backtest': backtest}
+
+
+def run_in_subprocess(name, tree, args):
+    """
+    Runs one benchmark in a fresh interpreter with tree first on sys.path and returns its results
+    """
+    command = [sys.executable, os.path.abspath(__file__), '--run', name, '--tree', tree,
+               '--pairs', str(args.pairs), '--imports', str(args.imports)]
+    output = subprocess.run(command, cwd=tree, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', help='git revision to compare with, e.g. the commit before a change')
+    parser.add_argument('--pairs', type=int, default=100000, help='number of date pairs for the day counts')
+    parser.add_argument('--imports', type=int, default=20, help='number of fresh interpreters importing calendars')
+    parser.add_argument('--only', nargs='*', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--run', choices=list(BENCHMARKS), help=argparse.SUPPRESS)
+    parser.add_argument('--tree', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        sys.path.insert(0, args.tree)
+        parameter = {'daycounts': args.pairs, 'import': args.imports}.get(args.run)
+        results = BENCHMARKS[args.run](args.tree) if parameter is None else BENCHMARKS[args.run](args.tree, parameter)
+        print(json.dumps(results))
+        return
+
+    with tempfile.TemporaryDirectory() as baseline_tree:
+        trees = {'current': ROOT}
+        if args.baseline is not None:
+            archive = subprocess.run(['git', 'archive', args.baseline], cwd=ROOT, check=True, capture_output=True)
+            subprocess.run(['tar', '-x', '-C', baseline_tree], input=archive.stdout, check=True)
+            trees['baseline ' + args.baseline] = baseline_tree
+        for name in args.only:
+            for label, tree in trees.items():
+                if name == 'backtest' and tree != ROOT:
+                    continue  # the baseline of the backtest is the loop over dates, timed with the current tree
+                results = run_in_subprocess(name, tree, args)
+                print('%-10s %-20s %s' % (name, label, ', '.join('%s: %s' % (k, '%.4fs' % v if isinstance(v, float)
+                                                                                   else v)
+                                                                   for k, v in results.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,8 @@
-__all__ = ['DayCounts', 'holidays', 'utils', 'libor', 'closest_next_monday', 'closest_previous_monday',
+__all__ = ['DayCounts', 'FrozenDayCounts', 'holidays', 'utils', 'libor', 'closest_next_monday', 'closest_previous_monday',
            'Y_INI', 'Y_END', 'brazil', 'BRCalendars', 'us', 'USTradingCalendar', 'Holidays', 'LiborEurON',
            'LiborUsdON', 'AbstractBase']
 
-from calendars.daycounts import DayCounts
+from calendars.daycounts import DayCounts, FrozenDayCounts
 from calendars import holidays
 from .holidays import Holidays, utils, libor, brazil, us
 from .holidays.utils import closest_next_monday,  closest_previous_monday, \
@@ -2,14 +2,15 @@
 Author: Thiago Barros
 """
 
+from types import MappingProxyType
 from .holidays import Holidays
-from pandas import to_datetime, Timestamp, DatetimeIndex, date_range, \
+from pandas import to_datetime, Timestamp, DatetimeIndex, DataFrame, \
     DateOffset
 from pandas.tseries.offsets import MonthEnd, YearEnd
 from pandas.core.series import Series
 from numpy import busday_count, busday_offset, busdaycalendar, asarray, \
-    broadcast, broadcast_arrays, ndarray, minimum, divmod, count_nonzero, \
-    datetime64
+    broadcast_arrays, ndarray, minimum, divmod, \
+    datetime64, where, floor, is_busday, maximum, repeat, arange, cumsum, tile
 
 
 class DayCounts(object):
@@ -25,15 +26,32 @@ class DayCounts(object):
               'act/364', 'act/360', 'act/365l', 'act/act afb',
               'act/act icma']
     XX360_DC = ['30a/360', '30e/360', '30e+/360', '30e/360 isda', '30u/360']
+    # Days in base of the conventions where it does not depend on the dates
+    FIXED_DIB = MappingProxyType({'NL/365': 365,
+                                  'BUS/30': 30,
+                                  'BUS/252': 252,
+                                  'BUS/1': 1,
+                                  'ACT/365': 365,
+                                  'ACT/365F': 365,
+                                  'ACT/364': 364,
+                                  'ACT/360': 360,
+                                  '30A/360': 360,
+                                  '30E/360': 360,
+                                  '30E+/360': 360,
+                                  '30E/360 ISDA': 360,
+                                  '30U/360': 360})
     # Properties
     __dc = None
     __cal = None
     __adj = None
     __adjo = None
     __busc = None
+    __wkmask = None
+    __ords = None
+    __use_ords = True
 
     def __init__(self, dc, adj=None, calendar=None,
-                 weekmask='Mon Tue Wed Thu Fri', adjoffset=0):
+                 weekmask='Mon Tue Wed Thu Fri', adjoffset=0, ordinals=True):
         """
         Day count constructor
 
@@ -58,7 +76,9 @@ class DayCounts(object):
 
         calendar : None, str
             If specified, it must be the name of a calendar supported by the
-            Holidays factory class
+            Holidays factory class, or an expression combining such names
+            with '|' (holiday in any of the calendars, e.g.
+            'anbima|us_trading') and '&' (holiday in all of them)
 
         weekmask : str or array)like of bool, default 'Mon Tue Wed Thu Fri'
             From numpy.busday_offset: A seven-element array indicating which
@@ -73,6 +93,15 @@ class DayCounts(object):
             Scalar indicating the offset value that will be used if
             adjustment rule is not set to None
 
+        ordinals : bool, default True
+            If True, business day counts, checks and offsets (used by the
+            BUS day counts, workday, isbus and the rolling methods) are
+            looked up in a precomputed table of business day ordinals for
+            the calendar, shared by all instances (see
+            calendars.holidays.ordinal.BusinessDayOrdinals). The table is
+            built on first use. Dates outside of its range fall back to the
+            numpy busday functions
+
         Returns
         -------
         self : DayCounts
@@ -100,118 +129,167 @@ class DayCounts(object):
         self.dc = dc
         self.adj = adj
         self.adjoffset = adjoffset
-        h = Holidays.holidays(cdr=calendar)
-        self.__busc = busdaycalendar(weekmask=weekmask, holidays=h)
-        self.calendar = calendar
+        # Business day calendars are shared by all instances through the
+        # Holidays factory registry
+        self.__cal = Holidays.modify_calendar_name(calendar)
+        self.weekmask = weekmask
+        self.__use_ords = ordinals
 
     def tf(self, d1, d2):
         """Calculates time fraction (in year fraction) between two dates given
         day count convention"""
-        d1 = self.adjust(d1)
-        d2 = self.adjust(d2)
+        return self._tf_adjusted(self.adjust(d1), self.adjust(d2))
+
+    def tf_matrix(self, ref_dates, dates):
+        """Year fractions between every reference date and every date
+
+        Inputs:
+            ref_dates   - Reference date(s), one per row of the output
+
+            dates       - Date(s) (e.g. cash flow dates), one per column of
+                          the output
+
+        Returns:
+            yf          - DataFrame of shape (len(ref_dates), len(dates))
+                          with tf(ref_date, date) in each entry
+
+        Each date is adjusted only once and all pairs are handled in a single
+        vectorized call. Unlike tf, dates before the reference date are
+        accepted for every convention, and give negative year fractions.
+        """
+        rows = self._as_index(ref_dates)
+        cols = self._as_index(dates)
+        n, m = len(rows), len(cols)
+        t1 = repeat(self._to_days(self._as_index(self.adjust(rows))), m)
+        t2 = tile(self._to_days(self._as_index(self.adjust(cols))), n)
+        sign = 1
+        if self.dc in ('ACT/ACT ISDA', 'ACT/ACT AFB', '1/1'):
+            # Conventions that split the interval at year boundaries need
+            # ordered dates
+            sign = where(t1 <= t2, 1, -1)
+            t1, t2 = minimum(t1, t2), maximum(t1, t2)
+        yf = sign * asarray(self._tf_adjusted(DatetimeIndex(t1),
+                                              DatetimeIndex(t2)))
+        return DataFrame(yf.reshape(n, m), index=rows, columns=cols)
+
+    def _tf_adjusted(self, d1, d2):
+        """Year fraction between dates that have already been adjusted"""
+        if self.dc == 'ACT/ACT ICMA':
+            raise AttributeError('The time fraction function cannot be used '
+                                 'for the %s convention' % self.dc)
         # Save adjustment state and set it to none, so we can safely use the
         # days and dib functions of "date splits" we produce in for some
-        # day counts
+        # day counts. Note that this makes the object unsafe to share across
+        # threads; use FrozenDayCounts for that
         state = self.adj
         self.adj = None
-        if self.dc == 'ACT/ACT ICMA':
-            raise AttributeError('The time fraction function cannot be used '
-                                 'for the %s convention' % self.dc)
-        if not (self.dc == 'ACT/ACT ISDA' or self.dc == 'ACT/ACT AFB' or
-                self.dc == '1/1'):
-            yf = self.days(d1, d2) / self.dib(d1, d2)
-        elif self.dc == 'ACT/ACT ISDA':
-            # We could treat everything as an array, we leave the dual
-            # implementation because vectorizing is clumsy. So, we just
-            # mimic the interface
-            if isinstance(d1, Timestamp) and isinstance(d2, Timestamp):
-                # We place the assertion here to save some thought in the
-                # recursion (we check one by one or delegate)
-                assert d1 <= d2, 'First date must be smaller or equal to ' \
-                                 'second date'
-                if d1.year == d2.year:
-                    yf = self.days(d1, d2) / self.dib(d1, d2)
-                else:
-                    ey1 = to_datetime(str(d1.year) + '-12-31')
-                    ey2 = to_datetime(str(d2.year - 1) + '-12-31')
-                    yf = (d2.year - d1.year - 1) + \
-                         (self.days(d1, ey1) / self.dib(d1, d1)) + \
-                         (self.days(ey2, d2) / self.dib(d2, d2))
-            else:  # This is the dreaded vectorized case that, for now,
-                # will be dealt by simulating the interface
-                result = list()
-                f = result.append
-                for t1, t2 in broadcast(d1, d2):
-                    f(self.tf(t1, t2))
-                yf = asarray(result, dtype='float64')
-        elif self.dc == '1/1':
-            # See notes in the ACT/ACT sections about vectorization
-            if isinstance(d1, Timestamp) and isinstance(d2, Timestamp):
-                # We place the assertion here to save some thought in the
-                # recursion (we check one by one or delegate)
-                assert d1 <= d2, 'First date must be smaller or equal to ' \
-                                 'second date'
-                if (d1.day == d2.day and d1.month == d2.month) \
-                        or (d1.month == 2 and d2.month == 2 and
-                            d1.day in [28, 29] and d2.day in [28, 29]):
-                    yf = int(0.5 + self.days(d1, d2) / self.dib(d1, d2))
-                else:
-                    # This is the same as ACT/ACT. We tweak the DC and bring
-                    # it back. This is computationally costly (as a parsing
-                    # of the day count is involved at each step), but safer
-                    # from an implementation perspective.
-                    self.dc = 'act/act isda'
-                    yf = self.tf(d1, d2)
-                    self.dc = '1/1'
-            else:  # This is the dreaded vectorized case that, for now,
-                # will be dealt by simulating the interface
-                result = list()
-                f = result.append
-                for t1, t2 in broadcast(d1, d2):
-                    f(self.tf(t1, t2))
-                yf = asarray(result, dtype='float64')
-        elif self.dc == 'ACT/ACT AFB':
-            if isinstance(d1, Timestamp) and isinstance(d2, Timestamp):
-                # We place the assertion here to save some thought in the
-                # recursion (we check one by one or delegate)
-                assert d1 <= d2, 'First date must be smaller or equal to ' \
+        try:
+            if not (self.dc == 'ACT/ACT ISDA' or self.dc == 'ACT/ACT AFB' or
+                    self.dc == '1/1'):
+                yf = self.days(d1, d2) / self.dib(d1, d2)
+            elif self.dc == 'ACT/ACT ISDA':
+                yf = self._tf_year_split(d1, d2, self._tf_act_act_isda)
+            elif self.dc == '1/1':
+                yf = self._tf_year_split(d1, d2, self._tf_one_one)
+            else:
+                yf = self._tf_year_split(d1, d2, self._tf_act_act_afb)
+        finally:
+            # Return state
+            self.adj = state
+        return yf
+
+    @staticmethod
+    def _tf_year_split(d1, d2, core):
+        """Year fraction for conventions that split the interval at year
+        boundaries (ACT/ACT ISDA, ACT/ACT AFB and 1/1).
+
+        The split is done by core over datetime64[D] arrays, so scalars and
+        arrays (and any broadcastable combination of them) go through the
+        same code. Dates must already be adjusted."""
+        scalar = isinstance(d1, Timestamp) and isinstance(d2, Timestamp)
+        t1, t2 = broadcast_arrays(DayCounts._to_days(d1),
+                                  DayCounts._to_days(d2))
+        assert (t1 <= t2).all(), 'First date must be smaller or equal to ' \
                                  'second date'
-                # We need to loop back from d2 counting the number of
-                # years we can subtract until we close interval. Note that
-                # every time we fall on a Feb 29th, a year offset will land
-                # us on Feb 28th. In this cases, we need to add the missing
-                # day fraction (1/366). Note that we add it only once,
-                # and not the number of leap days in interval divided by
-                # 366. Why? While the documents are not super clear about
-                # this, it seems reasonable to infer that from the "counting
-                # back" rule, where we are always subtracting entire years.
-                #
-                # 2004-02-28 to 2008-02-27 = 3 + 365/366
-                # 2004-02-28 to 2008-02-28 = 4
-                # 2004-02-28 to 2008-02-29 = 4 + 1/366
-                # 2004-02-28 to 2012-02-28 = 8
-                # 2004-02-28 to 2012-02-29 = 8 + 1/366 (and NOT 2/366)
-                n = 0
-                offset = 0
-                while d2 - DateOffset(years=1) >= d1:
-                    if d2.day == 29 and d2.month == 2:
-                        offset += 1 / 366
-                    n += 1
-                    d2 = d2 - DateOffset(years=1)
-                yf = n + offset + (self.days(d1, d2) / self.dib(d1, d2))
-            else:  # This is the dreaded vectorized case that, for now,
-                # will be dealt by simulating the interface
-                result = list()
-                f = result.append
-                for t1, t2 in broadcast(d1, d2):
-                    f(self.tf(t1, t2))
-                yf = asarray(result, dtype='float64')
-        else:
-            raise NotImplementedError('Day count %s not supported' % self.dc)
-        # Return state
-        self.adj = state
+        yf = core(t1, t2)
+        if scalar:
+            yf = float(yf[0])
         return yf
 
+    @staticmethod
+    def _tf_act_act_isda(t1, t2):
+        """ACT/ACT ISDA year fraction between datetime64[D] arrays t1 <= t2
+
+        Dates in the same year are divided by the days in that year.
+        Otherwise, the stub in the first year (up to Dec 31st) is divided by
+        the days in the first year, the stub in the last year (from Dec 31st
+        of the previous year) by the days in the last year, and the whole
+        years in between are added.
+        """
+        y1, _, _ = DayCounts._ymd(t1)
+        y2, _, _ = DayCounts._ymd(t2)
+        dy1 = DayCounts._days_in_year(y1)
+        dy2 = DayCounts._days_in_year(y2)
+        # Dec 31st of the first year and of the year before the last one
+        ey1 = DayCounts._year_start(y1 + 1) - 1
+        ey2 = DayCounts._year_start(y2) - 1
+        same = (t2 - t1).astype('int64') / dy1
+        split = (y2 - y1 - 1) + (ey1 - t1).astype('int64') / dy1 + \
+            (t2 - ey2).astype('int64') / dy2
+        return where(y1 == y2, same, split)
+
+    @staticmethod
+    def _tf_one_one(t1, t2):
+        """1/1 year fraction between datetime64[D] arrays t1 <= t2
+
+        If both dates fall on the same day of the year (Feb 28th and 29th are
+        taken as the same day), the number of whole years in the interval is
+        returned. Otherwise, this is the same as ACT/ACT ISDA.
+        """
+        _, m1, dd1 = DayCounts._ymd(t1)
+        _, m2, dd2 = DayCounts._ymd(t2)
+        mask = ((dd1 == dd2) & (m1 == m2)) | \
+               ((m1 == 2) & (m2 == 2) & ((dd1 == 28) | (dd1 == 29)) &
+                ((dd2 == 28) | (dd2 == 29)))
+        years = floor(0.5 + (t2 - t1).astype('int64') / 365.25)
+        return where(mask, years, DayCounts._tf_act_act_isda(t1, t2))
+
+    @staticmethod
+    def _tf_act_act_afb(t1, t2):
+        """ACT/ACT AFB year fraction between datetime64[D] arrays t1 <= t2
+
+        Whole years are counted back from t2 for as long as we do not cross
+        t1. Every time we fall on a Feb 29, a year offset will land us on Feb
+        28th. In this cases, we need to add the missing day fraction (1/366).
+        Note that we add it only once, and not the number of leap days in
+        interval divided by 366. Why? While the documents are not super clear
+        about this, it seems reasonable to infer that from the "counting
+        back" rule, where we are always subtracting entire years.
+
+        2004-02-28 to 2008-02-27 = 3 + 365/366
+        2004-02-28 to 2008-02-28 = 4
+        2004-02-28 to 2008-02-29 = 4 + 1/366
+        2004-02-28 to 2012-02-28 = 8
+        2004-02-28 to 2012-02-29 = 8 + 1/366 (and NOT 2/366)
+
+        The remaining stub is divided by 366 if it contains a Feb 29 in the
+        interval [t1, stub end) and by 365 otherwise.
+        """
+        y1, m1, dd1 = DayCounts._ymd(t1)
+        y2, m2, dd2 = DayCounts._ymd(t2)
+        feb29 = (m2 == 2) & (dd2 == 29)
+        # Count back as many years as possible, noting that after the first
+        # year subtracted a Feb 29th becomes a Feb 28th
+        n = y2 - y1
+        md2 = where(feb29 & (n >= 1), 228, 100 * m2 + dd2)
+        n = n - (md2 < 100 * m1 + dd1)
+        offset = where(feb29 & (n >= 1), 1 / 366, 0)
+        md2 = where(feb29 & (n >= 1), 228, 100 * m2 + dd2)
+        stub = DayCounts._year_start(y2 - n) + \
+            DayCounts._day_of_year(y2 - n, md2 // 100, md2 % 100)
+        leap = DayCounts._feb29_before(stub) - DayCounts._feb29_before(t1) > 0
+        return n + offset + (stub - t1).astype('int64') / where(leap, 366, 365)
+
     def days(self, d1, d2):
         """Number of days (integer) between two dates given day count
         convention"""
@@ -228,7 +306,7 @@ class DayCounts(object):
                 d2 = d2.values.astype('datetime64[D]')
             else:
                 d2 = datetime64(d2).astype('datetime64[D]')
-            return busday_count(d1, d2, busdaycal=self.buscore)
+            return self._busday_count(d1, d2)
         # Deal with the 30/360 like conventions
         if self.dc == '30U/360':
             y1, m1, d1, y2, m2, d2 = self._date_parser(d1, d2)
@@ -334,6 +412,9 @@ class DayCounts(object):
         methods to come may use properties such as year or month on the array
         """
         if self.adj is None:
+            # Parsed dates need no work (to_datetime would iterate over them)
+            if isinstance(d, (Timestamp, DatetimeIndex)):
+                return d
             return to_datetime(d)
         else:
             return self.busdateroll(d, roll=self.adj)
@@ -367,23 +448,9 @@ class DayCounts(object):
         If one of the conditions above fails, function will return scalar.
         """
 
-        # Handle fixed cases with dict
-        dibd = {'NL/365': 365,
-                'BUS/30': 30,
-                'BUS/252': 252,
-                'BUS/1': 1,
-                'ACT/365': 365,
-                'ACT/365F': 365,
-                'ACT/364': 364,
-                'ACT/360': 360,
-                '30A/360': 360,
-                '30E/360': 360,
-                '30E+/360': 360,
-                '30E/360 ISDA': 360,
-                '30U/360': 360}
-        # Simply cases end here
+        # Handle fixed cases with dict. Simply cases end here
         try:
-            return dibd[self.dc]
+            return self.FIXED_DIB[self.dc]
         except KeyError:
             pass
         # Throw error for ACT/ACT ISMA
@@ -418,11 +485,9 @@ class DayCounts(object):
             leap = self.hasleap(d1, d2)
             base = asarray(366 * leap + 365 * ~leap, dtype='int64')
             # Guarantee dimension conformity
-            d2, base = broadcast_arrays(d2, base)
-            d2 = DatetimeIndex(d2)
-            mask = (d2.day == 29) & (d2.month == 2)
-            base[mask] = 366
-            return base
+            t2, base = broadcast_arrays(self._to_days(d2), base)
+            _, m2, dd2 = self._ymd(t2)
+            return where((dd2 == 29) & (m2 == 2), 366, base)
         elif self.dc == 'ACT/ACT AFB':
             # The bizarre french case. No surprise here.
             d1 = self.adjust(d1)
@@ -477,15 +542,11 @@ class DayCounts(object):
         assert d is not None, 'User may not pass None to BDY function'
         d = self.adjust(d)
         if isinstance(d, Timestamp):
-            res = busday_count(str(d.year), str(d.year + 1),
-                               busdaycal=self.buscore)
+            year = d.year
         else:
-            # This is brutal from a readability perspective,
-            # but essentially it is a long list of casting executions
-            res = busday_count(list(d.year.astype(str)),
-                               list((d.year + 1).astype(str)),
-                               busdaycal=self.buscore)
-        return res
+            year = asarray(d.year)
+        return self._busday_count(self._year_start(year),
+                                  self._year_start(year + 1))
 
     def hasleap(self, d1, d2):
         """Check if there is a leap year in range between d1 and d2.
@@ -507,40 +568,20 @@ class DayCounts(object):
         there seems to be a consensus between OpenGamma and Wikipedia that
         the interval is [d1, d2).
 
-        NOTE: This is not a truly vectorized function, but it mimics the
-        interface of one.
+        Feb 29ths are counted directly on the datetime64[D] representation
+        of the dates, so arrays are handled in a single vectorized pass.
         """
         assert d1 is not None and d2 is not None, 'Inputs may not be None'
         d1 = self.adjust(d1)
         d2 = self.adjust(d2)
-        if isinstance(d1, Timestamp) and isinstance(d2, Timestamp):
-            # Give user some flexibility
-            if d1 > d2:
-                d1, d2 = d2, d1
-            # Boundary cases
-            # First year is leap, d1 <= 29 Feb < d2
-            if (self.isleap(d1) and d1.month <= 2 and d1.day <= 29) and \
-                    ((d2.year == d1.year and d2.month > 2) or
-                     (d2.year > d1.year)):
-                return True
-            elif (self.isleap(d2) and d2.month > 2) and d1.year < d2.year:
-                # d2 is leap and d2 is greater than 29 Feb. Note that we
-                # don't care about d1.year == d2.year in this case, as it has
-                # been dealt with above.
-                return True
-            elif d1.year == d2.year or d1.year + 1 == d2.year:
-                # May or may not be a leap year, but dates are not
-                # bracketing it (or we have consecutive years,
-                # where same rule applies)
-                return False
-            else:
-                # We have a range here to look for dates
-                return any(self.isleap(x) for x in range(d1.year, d2.year))
-        else:
-            result = list()
-            for t1, t2 in broadcast(d1, d2):
-                result.append(self.hasleap(t1, t2))
-            return asarray(result, dtype='bool')
+        scalar = isinstance(d1, Timestamp) and isinstance(d2, Timestamp)
+        t1, t2 = broadcast_arrays(self._to_days(d1), self._to_days(d2))
+        # Give user some flexibility
+        lo, hi = minimum(t1, t2), maximum(t1, t2)
+        leap = self._feb29_before(hi) - self._feb29_before(lo) > 0
+        if scalar:
+            return bool(leap[0])
+        return leap
 
     def leapdays(self, d1, d2):
         """Calculate number of leap days between two dates, in the interval
@@ -551,26 +592,21 @@ class DayCounts(object):
         in our case). This contrasts with function hasleap(d1, d2). To
         understand why, please refer to the help notes on hasleap(d1, d2).
 
-        NOTE: This is not a truly vectorized function, but it mimics the
-        interface of one.
+        Feb 29ths are counted directly on the datetime64[D] representation
+        of the dates, so arrays are handled in a single vectorized pass.
         """
         assert d1 is not None and d2 is not None, 'Inputs may not be None'
         d1 = self.adjust(d1)
         d2 = self.adjust(d2)
-        if isinstance(d1, Timestamp) and isinstance(d2, Timestamp):
-            # Give user some flexibility
-            if d1 > d2:
-                d1, d2 = d2, d1
-            # We only have to care about the open lower bound if we are
-            # exactly at a Feb 29th. Given that we are we will use pandas
-            # for this, we can pass a parameter to date_range to handle it.
-            drange = date_range(d1, d2, closed='right')
-            return count_nonzero((drange.day == 29) & (drange.month == 2))
-        else:
-            result = list()
-            for t1, t2 in broadcast(d1, d2):
-                result.append(self.leapdays(t1, t2))
-            return asarray(result, dtype='int64')
+        scalar = isinstance(d1, Timestamp) and isinstance(d2, Timestamp)
+        t1, t2 = broadcast_arrays(self._to_days(d1), self._to_days(d2))
+        # Give user some flexibility. Shifting both ends by one day turns
+        # the count in [lo, hi) into a count in (lo, hi]
+        lo, hi = minimum(t1, t2) + 1, maximum(t1, t2) + 1
+        leapdays = self._feb29_before(hi) - self._feb29_before(lo)
+        if scalar:
+            return int(leapdays[0])
+        return asarray(leapdays, dtype='int64')
 
     def dy(self, d):
         """Days in year given by date(s) d"""
@@ -595,13 +631,15 @@ class DayCounts(object):
     # Add methods respecting the interface of BWDate class for compatibility
     def isbus(self, d):
         """True if date is a business day"""
-        return self.following(d) == d
+        d = self._simple_cast(d)
+        if self.ordinals is None:
+            return is_busday(d, busdaycal=self.buscore)
+        return self.ordinals.is_busday(d)
 
     def busdateroll(self, d, roll):
         """Rolls business date according to convention specified in roll"""
         d = self._simple_cast(d)
-        nd = busday_offset(d, offsets=self.adjoffset, roll=roll,
-                           busdaycal=self.buscore)
+        nd = self._busday_offset(d, offsets=self.adjoffset, roll=roll)
         return to_datetime(nd)
 
     def workday(self, d, offset=0):
@@ -612,8 +650,7 @@ class DayCounts(object):
                 adj = 'preceding'
             else:
                 adj = 'following'
-            nd = busday_offset(d, offsets=offset, busdaycal=self.buscore,
-                               roll=adj)
+            nd = self._busday_offset(d, offsets=offset, roll=adj)
         elif self.adj is None and (isinstance(offset, ndarray) or
                                    isinstance(offset, Series)):
             if all(offset >= 0):
@@ -624,11 +661,9 @@ class DayCounts(object):
                 raise NotImplementedError('If offset is an array like '
                                           'structure, then all values must '
                                           'have the same sign')
-            nd = busday_offset(d, offsets=offset, busdaycal=self.buscore,
-                               roll=adj)
+            nd = self._busday_offset(d, offsets=offset, roll=adj)
         else:
-            nd = busday_offset(d, offsets=offset, busdaycal=self.buscore,
-                               roll=self.adj)
+            nd = self._busday_offset(d, offsets=offset, roll=self.adj)
         return to_datetime(nd)
 
     def following(self, d):
@@ -726,25 +761,90 @@ class DayCounts(object):
         """Generator for dates in an interval assuming following in the
         lower end and preceding in the upper end
 
-        Note: only scalar values are accepted
+        Note: only scalar values are accepted. See busdates for the
+        vectorized version
         """
-        start_date = self.adjust(start_date)
-        end_date = self.adjust(end_date)
+        for d in self.busdates(start_date, end_date):
+            yield d
+
+    def busdates(self, start_date, end_date):
+        """Business dates in an interval assuming following in the lower
+        end and preceding in the upper end (if both ends are the same date,
+        preceding is used in the lower end as well). Returns a DatetimeIndex
+        generated in a single vectorized call
+
+        Note: only scalar values are accepted. See busdates_pairs for many
+        intervals at once
+        """
+        start_date = to_datetime(start_date)
+        end_date = to_datetime(end_date)
         assert isinstance(start_date, Timestamp), 'Start date must be scalar'
         assert isinstance(end_date, Timestamp), 'End date must be scalar'
-        if start_date == end_date:
-            start_date = self.preceding(start_date)
-        else:
-            start_date = self.following(start_date)
-        end_date = self.preceding(end_date)
-        while start_date <= end_date:
-            yield start_date
-            start_date = self.workday(start_date, 1)
+        dates = self.busdates_pairs(start_date, end_date)
+        return DatetimeIndex(dates.values)
+
+    def busdates_pairs(self, start_dates, end_dates):
+        """Business dates of many intervals at once, with the same rules of
+        busdates in each of them. Inputs are dates or arrays of dates
+        (broadcast against each other).
+
+        Returns a Series with the business dates of all intervals, in order,
+        indexed by the (integer) position of the interval they belong to.
+        Use groupby(level=0) to iterate over intervals.
+        """
+        start_dates = self._to_days(self.adjust(start_dates))
+        end_dates = self._to_days(self.adjust(end_dates))
+        start_dates, end_dates = broadcast_arrays(start_dates, end_dates)
+        start_dates = where(
+            start_dates == end_dates,
+            self._busday_offset(start_dates, self.adjoffset, 'preceding'),
+            self._busday_offset(start_dates, self.adjoffset, 'following'))
+        end_dates = self._busday_offset(end_dates, self.adjoffset,
+                                        'preceding')
+        # Number of business dates in each (closed) interval
+        n = maximum(self._busday_count(start_dates, end_dates + 1), 0)
+        # Each date is its interval's start date offset by its position in
+        # the interval
+        pair = repeat(arange(len(n)), n)
+        within = arange(n.sum()) - repeat(cumsum(n) - n, n)
+        dates = self._busday_offset(start_dates[pair], within, 'following')
+        return Series(DatetimeIndex(dates), index=pair)
+
+    def _busday_count(self, d1, d2):
+        """numpy.busday_count on the object's calendar, through the business
+        day ordinals table if enabled"""
+        if self.ordinals is None:
+            return busday_count(d1, d2, busdaycal=self.buscore)
+        return self.ordinals.count(d1, d2)
+
+    def _busday_offset(self, d, offsets, roll):
+        """numpy.busday_offset on the object's calendar, through the
+        business day ordinals table if enabled"""
+        if self.ordinals is None:
+            return busday_offset(d, offsets=offsets, roll=roll,
+                                 busdaycal=self.buscore)
+        return self.ordinals.offset(d, offsets=offsets, roll=roll)
 
     @property
     def buscore(self):
+        # Built on first use: with the business day ordinals table, it is
+        # only needed if ordinals are disabled
+        if self.__busc is None:
+            self.__busc = Holidays.busdaycalendar(cdr=self.calendar,
+                                                  weekmask=self.weekmask)
         return self.__busc
 
+    @property
+    def ordinals(self):
+        """Business day ordinals table for the calendar and weekmask of the
+        object, or None if disabled"""
+        if not self.__use_ords:
+            return None
+        if self.__ords is None:
+            self.__ords = Holidays.business_day_ordinals(
+                cdr=self.calendar, weekmask=self.weekmask)
+        return self.__ords
+
     @property
     def adjoffset(self):
         return self.__adjo
@@ -757,15 +857,17 @@ class DayCounts(object):
     @property
     def weekmask(self):
         wkmask = list()
-        for b, w in zip(self.buscore.weekmask, self.WKMASK):
+        for b, w in zip(self.__wkmask, self.WKMASK):
             if b:
                 wkmask.append(w)
         return ' '.join(wkmask)
 
     @weekmask.setter
     def weekmask(self, x):
-        h = self.holidays.values.astype('datetime64[D]')
-        self.__busc = busdaycalendar(weekmask=x, holidays=h)
+        # Let numpy parse (and validate) the weekmask
+        self.__wkmask = tuple(bool(b) for b in busdaycalendar(weekmask=x).weekmask)
+        self.__busc = None
+        self.__ords = None
 
     @property
     def weekends(self):
@@ -794,8 +896,8 @@ class DayCounts(object):
         # Save calendar
         self.__cal = x
         # Update buscore engine
-        h = Holidays.holidays(cdr=x)
-        self.__busc = busdaycalendar(weekmask=self.weekmask, holidays=h)
+        self.__busc = None
+        self.__ords = None
 
     @property
     def adj(self):
@@ -1068,7 +1170,8 @@ class DayCounts(object):
         """
         # Broadcast, no matter what. This will enable us to do logical
         # indexing even for the scalar case. Transforming time stamps to
-        # lists is necessary for the proper broadcasting
+        # lists is necessary for the proper broadcasting. Arrays are copied, as
+        # they are modified in place by the 30/360 conventions
         if isinstance(d1, Timestamp):
             d1 = [d1]
         if isinstance(d2, Timestamp):
@@ -1076,12 +1179,12 @@ class DayCounts(object):
         d1, d2 = broadcast_arrays(d1, d2)
         d1 = DatetimeIndex(d1)
         d2 = DatetimeIndex(d2)
-        y1 = d1.year.values
-        m1 = d1.month.values
-        d1 = d1.day.values
-        y2 = d2.year.values
-        m2 = d2.month.values
-        d2 = d2.day.values
+        y1 = d1.year.values.copy()
+        m1 = d1.month.values.copy()
+        d1 = d1.day.values.copy()
+        y2 = d2.year.values.copy()
+        m2 = d2.month.values.copy()
+        d2 = d2.day.values.copy()
         return y1, m1, d1, y2, m2, d2
 
     def _eom_mask(self, year, months, days):
@@ -1097,12 +1200,144 @@ class DayCounts(object):
                               (months == 12))
         return (febeom | m30) | m31
 
+    @staticmethod
+    def _to_days(d):
+        """Cast Timestamp or DatetimeIndex into a datetime64[D] array"""
+        if isinstance(d, Timestamp):
+            return asarray([datetime64(d, 'D')])
+        return asarray(d.values).astype('datetime64[D]')
+
+    @staticmethod
+    def _as_index(d):
+        """Cast date or array of dates into a DatetimeIndex"""
+        d = to_datetime(d)
+        if isinstance(d, Timestamp):
+            return DatetimeIndex([d])
+        return DatetimeIndex(d)
+
+    @staticmethod
+    def _ymd(d):
+        """Split a datetime64[D] array into integer arrays of years, months
+        and days"""
+        y = d.astype('datetime64[Y]')
+        m = d.astype('datetime64[M]')
+        years = y.astype('int64') + 1970
+        months = (m - y.astype('datetime64[M]')).astype('int64') + 1
+        days = (d - m.astype('datetime64[D]')).astype('int64') + 1
+        return years, months, days
+
+    @staticmethod
+    def _year_start(year):
+        """Jan 1st of (integer array) year as a datetime64[D] array"""
+        return (asarray(year) - 1970).astype('datetime64[Y]')\
+            .astype('datetime64[D]')
+
+    @staticmethod
+    def _day_of_year(year, month, day):
+        """Zero based day of year for integer arrays year, month and day"""
+        m = (asarray(year) - 1970) * 12 + asarray(month) - 1
+        m = m.astype('datetime64[M]').astype('datetime64[D]')
+        return (m - DayCounts._year_start(year)).astype('int64') + \
+            asarray(day) - 1
+
+    @staticmethod
+    def _days_in_year(year):
+        """Days in (integer array) year"""
+        leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        return where(leap, 366, 365)
+
+    @staticmethod
+    def _feb29_before(d):
+        """Number of Feb 29ths strictly before each date of datetime64[D]
+        array d"""
+        y, m, _ = DayCounts._ymd(d)
+        p = y - 1
+        leap = (y % 4 == 0) & ((y % 100 != 0) | (y % 400 == 0))
+        return p // 4 - p // 100 + p // 400 + (leap & (m > 2))
+
     @staticmethod
     def _simple_cast(d):
         """Cast date into Timestamp or numpy datetime64[D] array"""
+        # Arrays of datetime64 need no parsing
+        if isinstance(d, ndarray) and d.dtype.kind == 'M':
+            return d.astype('datetime64[D]')
         d = to_datetime(d)
         if not isinstance(d, Timestamp):
             d = d.values.astype('datetime64[D]')
         else:
             d = datetime64(d).astype('datetime64[D]')
         return d
+
+
+class FrozenDayCounts(DayCounts):
+    """Immutable and stateless DayCounts.
+
+    The day count convention is resolved once, at construction, into the
+    year fraction function used by tf, and no method changes the state of
+    the object afterwards (lazily built tables, such as the business day
+    ordinals, are built in the constructor). Setting any attribute or
+    property raises an AttributeError.
+
+    Instances are therefore safe to share across threads, e.g. module level
+    objects used by curve bootstraps or tracker builds running in a thread
+    pool. Results are the same as the ones of a DayCounts with the same
+    parameters.
+    """
+    # Conventions that split the interval at year boundaries and the
+    # function that does it
+    YEAR_SPLIT_TF = MappingProxyType(
+        {'ACT/ACT ISDA': DayCounts._tf_act_act_isda,
+         'ACT/ACT AFB': DayCounts._tf_act_act_afb,
+         '1/1': DayCounts._tf_one_one})
+    __frozen = False
+
+    def __init__(self, dc, adj=None, calendar=None,
+                 weekmask='Mon Tue Wed Thu Fri', adjoffset=0, ordinals=True):
+        """Same parameters as the DayCounts constructor"""
+        super(FrozenDayCounts, self).__init__(dc, adj=adj, calendar=calendar,
+                                              weekmask=weekmask,
+                                              adjoffset=adjoffset,
+                                              ordinals=ordinals)
+        # Twin without adjustment rule, used on dates that have already
+        # been adjusted. This replaces the switching of the adj property
+        # done by DayCounts.tf
+        raw = DayCounts(self.dc, calendar=calendar, weekmask=weekmask,
+                        ordinals=ordinals)
+        # Build the business day ordinals and calendars now (they are lazy
+        # otherwise)
+        self.ordinals, raw.ordinals, self.buscore, raw.buscore
+        self.__tf = self._resolve_tf(raw)
+        self.__frozen = True
+
+    def __setattr__(self, key, value):
+        if self.__frozen:
+            raise AttributeError('FrozenDayCounts objects are immutable')
+        super(FrozenDayCounts, self).__setattr__(key, value)
+
+    def _tf_adjusted(self, d1, d2):
+        """Year fraction between dates that have already been adjusted"""
+        return self.__tf(d1, d2)
+
+    @staticmethod
+    def _resolve_tf(raw):
+        """Year fraction function of adjusted dates for the convention of
+        the unadjusted DayCounts raw"""
+        dc = raw.dc
+        if dc == 'ACT/ACT ICMA':
+            def tf(d1, d2):
+                raise AttributeError('The time fraction function cannot be '
+                                     'used for the %s convention' % dc)
+        elif dc in FrozenDayCounts.YEAR_SPLIT_TF:
+            core = FrozenDayCounts.YEAR_SPLIT_TF[dc]
+
+            def tf(d1, d2):
+                return DayCounts._tf_year_split(d1, d2, core)
+        elif dc in DayCounts.FIXED_DIB:
+            base = DayCounts.FIXED_DIB[dc]
+
+            def tf(d1, d2):
+                return raw.days(d1, d2) / base
+        else:
+            def tf(d1, d2):
+                return raw.days(d1, d2) / raw.dib(d1, d2)
+        return tf
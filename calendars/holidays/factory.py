@@ -1,32 +1,221 @@
+from threading import RLock
+from functools import partial
+from numpy import asarray, busdaycalendar, ndarray, datetime64, isnat, \
+    union1d, intersect1d
 from .brazil import BRCalendars
 from .us import USTradingCalendar
 from .libor import LiborAllTenorsAndCurrencies, LiborEurON, LiborUsdON
+from .ordinal import BusinessDayOrdinals
+from .utils import Y_INI, Y_END, Y_CHUNK, Y_WINDOW_INI, Y_WINDOW_END
 
 
 class Holidays(object):
     STDCAL      = 'cdr_standard'
-    ENGINES     = [BRCalendars(), USTradingCalendar(), LiborAllTenorsAndCurrencies(), LiborEurON(), LiborUsdON()]
-    # Note that we instantiate the objects in the ENGINE variable because
-    # not all calendars are accessible via static methods. In this case,
-    # just passing the pointer will fail in the holidays() method
+    # Operators of combined calendars: a date is a holiday of 'a|b' if it is
+    # a holiday of a or of b, and of 'a&b' if it is a holiday of both. As
+    # usual, & binds tighter than |
+    UNION       = '|'
+    INTERSECT   = '&'
+    ENGINES     = {'brazil': BRCalendars,
+                   'us_trading': USTradingCalendar,
+                   'libor': LiborAllTenorsAndCurrencies,
+                   'libor_eur_on': LiborEurON,
+                   'libor_usd_on': LiborUsdON}
+    # Engines are registered by name and only instantiated the first time
+    # one of their calendars is requested (see the engine() method). Note
+    # that we still need instances because not all calendars are accessible
+    # via static methods
+    _ENGINE_INSTANCES = dict()
+
+    # Process-wide registries of holiday arrays (keyed by calendar name) and
+    # of numpy.busdaycalendar objects (keyed by calendar name and weekmask).
+    # Both are built once and shared by every caller
+    _HOLIDAY_ARRAYS = dict()
+    _BUSDAYCALENDARS = dict()
+    _BUSDAYORDINALS = dict()
+    _LOCK = RLock()
 
     @staticmethod
     def holidays(cdr=None):
         """Factory interface"""
+        h = Holidays._engine_holidays(cdr)
+        # Engines backed by the binary holiday store return datetime64[D]
+        # arrays. For backward compatibility we `cast` them into a list of
+        # datetime.date
+        if isinstance(h, ndarray):
+            return h.tolist()
+        return h
+
+    @staticmethod
+    def _engine_holidays(cdr=None, years=None):
+        """Holidays of calendar cdr as returned by the engine implementing
+        it, i.e. either a list of dates or a datetime64[D] array. If years
+        is given as (first year, last year), only the holidays in that
+        window are requested from the engine"""
         # Save original name for error message
         cn      = cdr
         cdr     = Holidays.modify_calendar_name(cdr)
         if cdr is None or cdr == Holidays.STDCAL:
             return []
-        for en in Holidays.ENGINES:
-            try:
-                h = getattr(en, cdr)
-                return h()
-            except AttributeError:
-                pass
+        if Holidays.UNION in cdr or Holidays.INTERSECT in cdr:
+            return Holidays._combined_holidays(cdr, years=years)
+        for name, cls in Holidays.ENGINES.items():
+            # Calendars are methods, so we can find the engine that
+            # implements one without building it
+            if hasattr(cls, cdr):
+                return getattr(Holidays.engine(name), cdr)(years=years)
         raise NotImplementedError('Calendar `%s` not found. Please implement '
                                   'it.' % cn)
 
+    @staticmethod
+    def _combined_holidays(cdr, years=None):
+        """Sorted datetime64[D] array with the holidays of the combined
+        calendar cdr (as normalized by modify_calendar_name)"""
+        h = None
+        for term in cdr.split(Holidays.UNION):
+            t = None
+            for c in term.split(Holidays.INTERSECT):
+                x = asarray(Holidays._engine_holidays(c, years=years),
+                            dtype='datetime64[D]')
+                t = x if t is None else intersect1d(t, x)
+            h = t if h is None else union1d(h, t)
+        return h
+
+    @staticmethod
+    def engine(name):
+        """Instance of the holiday engine registered as name. Engines are
+        built on first use and shared afterwards"""
+        try:
+            return Holidays._ENGINE_INSTANCES[name]
+        except KeyError:
+            pass
+        if name not in Holidays.ENGINES:
+            raise NotImplementedError('Holiday engine `%s` not registered' % name)
+        with Holidays._LOCK:
+            if name not in Holidays._ENGINE_INSTANCES:
+                Holidays._ENGINE_INSTANCES[name] = Holidays.ENGINES[name]()
+        return Holidays._ENGINE_INSTANCES[name]
+
+    @staticmethod
+    def register_engine(name, engine):
+        """Register a holiday engine class under name. Its calendars are the
+        methods named 'cdr_<calendar name>', taking an optional years
+        window (see AbstractBase._base_caller), and the class is only
+        instantiated when one of them is first requested"""
+        with Holidays._LOCK:
+            Holidays.ENGINES[name] = engine
+            Holidays._ENGINE_INSTANCES.pop(name, None)
+
+    @staticmethod
+    def holiday_array(cdr=None):
+        """Read-only datetime64[D] array with the holidays of calendar cdr.
+
+        The array is generated on the first request and shared afterwards"""
+        cdr = Holidays.modify_calendar_name(cdr)
+        try:
+            return Holidays._HOLIDAY_ARRAYS[cdr]
+        except KeyError:
+            pass
+        with Holidays._LOCK:
+            if cdr not in Holidays._HOLIDAY_ARRAYS:
+                # Arrays coming from the holiday store are memory-mapped and
+                # already read-only, so they are used without a copy
+                h = Holidays._engine_holidays(cdr=cdr)
+                if not (isinstance(h, ndarray) and h.dtype == 'datetime64[D]'):
+                    h = asarray(h, dtype='datetime64[D]')
+                    h.flags.writeable = False
+                Holidays._HOLIDAY_ARRAYS[cdr] = h
+        return Holidays._HOLIDAY_ARRAYS[cdr]
+
+    @staticmethod
+    def busdaycalendar(cdr=None, weekmask='Mon Tue Wed Thu Fri'):
+        """numpy.busdaycalendar for calendar cdr and the given weekmask.
+
+        The object is built on the first request for each pair of calendar
+        and weekmask and the same instance is returned to every caller
+        afterwards. Business day calendars are immutable, so sharing them
+        across objects and threads is safe"""
+        cdr = Holidays.modify_calendar_name(cdr)
+        # Normalize the weekmask, so that equivalent specifications (e.g.
+        # '1111100' and 'Mon Tue Wed Thu Fri') share the same entry
+        wkmask = tuple(bool(x) for x in busdaycalendar(weekmask=weekmask).weekmask)
+        key = (cdr, wkmask)
+        try:
+            return Holidays._BUSDAYCALENDARS[key]
+        except KeyError:
+            pass
+        with Holidays._LOCK:
+            if key not in Holidays._BUSDAYCALENDARS:
+                Holidays._BUSDAYCALENDARS[key] = busdaycalendar(weekmask=list(wkmask),
+                                                                holidays=Holidays.holiday_array(cdr))
+        return Holidays._BUSDAYCALENDARS[key]
+
+    @staticmethod
+    def business_day_ordinals(cdr=None, weekmask='Mon Tue Wed Thu Fri',
+                              years=None):
+        """BusinessDayOrdinals table for calendar cdr and the given weekmask,
+        covering at least the window years (first year, last year).
+
+        The default window is Y_WINDOW_INI to Y_WINDOW_END, so only the
+        holidays of those years need to be generated. Tables extend
+        themselves the first time a date outside of them is queried: a
+        table for a wider window (in blocks of Y_CHUNK years) is built and
+        replaces the previous one in the registry. As with
+        busdaycalendar(), tables are read-only and shared by every
+        caller"""
+        cdr = Holidays.modify_calendar_name(cdr)
+        wkmask = tuple(bool(x) for x in busdaycalendar(weekmask=weekmask).weekmask)
+        y0, y1 = (Y_WINDOW_INI, Y_WINDOW_END) if years is None else years
+        return Holidays._ordinals_window((cdr, wkmask), y0, y1)
+
+    @staticmethod
+    def _ordinals_window(key, y0, y1):
+        """Registry table for key = (calendar, weekmask), widened if needed
+        to cover years y0 to y1"""
+        y0, y1 = max(y0, Y_INI), min(y1, Y_END)
+        lo = datetime64('%d-01-01' % y0, 'D')
+        hi = datetime64('%d-12-31' % y1, 'D')
+        ords = Holidays._BUSDAYORDINALS.get(key)
+        if ords is not None and ords.start <= lo and hi <= ords.end:
+            return ords
+        with Holidays._LOCK:
+            ords = Holidays._BUSDAYORDINALS.get(key)
+            if ords is not None:
+                if ords.start <= lo and hi <= ords.end:
+                    return ords
+                y0 = min(y0, ords.start.item().year)
+                y1 = max(y1, ords.end.item().year)
+            # Windows are made of whole blocks of Y_CHUNK years, as
+            # generated by the holiday engines
+            y0 = Y_INI + (y0 - Y_INI) // Y_CHUNK * Y_CHUNK
+            y1 = min(Y_INI + ((y1 - Y_INI) // Y_CHUNK + 1) * Y_CHUNK - 1,
+                     Y_END)
+            cdr, wkmask = key
+            if y0 == Y_INI and y1 == Y_END:
+                busc = Holidays.busdaycalendar(cdr=cdr, weekmask=list(wkmask))
+                extend = None
+            else:
+                h = asarray(Holidays._engine_holidays(cdr=cdr, years=(y0, y1)),
+                            dtype='datetime64[D]')
+                busc = busdaycalendar(weekmask=list(wkmask), holidays=h)
+                extend = partial(Holidays._extend_ordinals, key)
+            ords = BusinessDayOrdinals(busc, start='%d-01-01' % y0,
+                                       end='%d-12-31' % y1, extend=extend)
+            Holidays._BUSDAYORDINALS[key] = ords
+        return ords
+
+    @staticmethod
+    def _extend_ordinals(key, lo=None, hi=None):
+        """Table for key covering the dates lo to hi (datetime64[D]), or the
+        full range if they are not given or fall outside of it"""
+        if lo is None or hi is None or isnat(lo) or isnat(hi):
+            return Holidays._ordinals_window(key, Y_INI, Y_END)
+        y0, y1 = [int(x.astype('datetime64[Y]').astype('int64')) + 1970
+                  for x in (lo, hi)]
+        if y0 < Y_INI or y1 > Y_END:
+            y0, y1 = Y_INI, Y_END
+        return Holidays._ordinals_window(key, y0, y1)
+
     @staticmethod
     def modify_calendar_name(cdr=None):
         if cdr is None or cdr == Holidays.STDCAL or \
@@ -34,6 +223,16 @@ class Holidays(object):
             return Holidays.STDCAL
         assert isinstance(cdr, str), 'Cdr must be either None or a string'
         cdr = cdr.lower()
+        if Holidays.UNION in cdr or Holidays.INTERSECT in cdr:
+            # Combined calendar. Names are normalized one by one and sorted,
+            # so that equivalent expressions (e.g. 'a|b' and 'cdr_b | a')
+            # share the entries of the registries
+            terms = set()
+            for term in cdr.split(Holidays.UNION):
+                names = {Holidays.modify_calendar_name(c.strip())
+                         for c in term.split(Holidays.INTERSECT)}
+                terms.add(Holidays.INTERSECT.join(sorted(names)))
+            return Holidays.UNION.join(sorted(terms))
         # Save original name for error message below
         if 'cdr_' not in cdr:
             cdr = 'cdr_' + cdr
@@ -19,6 +19,6 @@ class LiborEurON(AbstractBase):
     def __init__(self):
         super(LiborEurON, self).__init__(name='libor_eur_on')
 
-    def cdr_libor_eur_on(self):
-        """Return calendar for fixed period"""
-        return self._base_caller()
+    def cdr_libor_eur_on(self, years=None):
+        """Return calendar for fixed period (or for the window of years)"""
+        return self._base_caller(years)
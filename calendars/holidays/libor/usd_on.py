@@ -28,6 +28,6 @@ class LiborUsdON(AbstractBase):
     def __init__(self):
         super(LiborUsdON, self).__init__(name='libor_usd_on')
 
-    def cdr_libor_usd_on(self):
-        """Return calendar for fixed period"""
-        return self._base_caller()
+    def cdr_libor_usd_on(self, years=None):
+        """Return calendar for fixed period (or for the window of years)"""
+        return self._base_caller(years)
@@ -0,0 +1,199 @@
+from datetime import date
+from numpy import arange, asarray, cumsum, datetime64, \
+    is_busday, busday_count, busday_offset, where, zeros, integer
+from .utils import Y_END, Y_INI
+
+
+class BusinessDayOrdinals(object):
+    """Precomputed business day ordinals for a numpy.busdaycalendar.
+
+    For every calendar day in the supported range we store whether it is a
+    business day and the cumulative number of business days before it.
+    Business day counts, checks and offsets then become integer array
+    lookups instead of calls to the numpy busday functions. Dates outside
+    the supported range fall back to the numpy functions, so results are
+    always the same as numpy.busday_count, numpy.is_busday and
+    numpy.busday_offset with the same busdaycalendar.
+
+    A table may also be built for a window of dates only, from a
+    busdaycalendar holding the holidays of that window. Such a table is
+    given an extend function, and queries that do not fit in it are handed
+    over to the wider table that extend returns, instead of the numpy
+    functions.
+
+    Instances are read-only after construction and may be shared across
+    threads.
+    """
+
+    def __init__(self, busdaycal, start=None, end=None, extend=None):
+        """
+        Parameters
+        ----------
+        busdaycal : numpy.busdaycalendar
+            Business day calendar the table is built from
+
+        start, end : None or anything numpy can cast to datetime64[D]
+            First and last calendar days covered by the table. Default is
+            the range of the holiday engines, Jan 1st of Y_INI to Dec 31st
+            of Y_END
+
+        extend : None or callable
+            extend(lo, hi) must return a table covering (at least) the
+            dates lo to hi, and extend() one covering the full range of
+            the holiday engines. None if busdaycal is valid for any date
+        """
+        self.busdaycal = busdaycal
+        self.extend = extend
+        self.start = datetime64('%d-01-01' % Y_INI if start is None else start, 'D')
+        self.end = datetime64('%d-12-31' % Y_END if end is None else end, 'D')
+        self._start_ordinal = self.start.item().toordinal()
+        days = arange(self.start, self.end + 1, dtype='datetime64[D]')
+        self.isbus_table = is_busday(days, busdaycal=busdaycal)
+        # cum[i] is the number of business days in [start, start + i)
+        cum = zeros(len(days) + 1, dtype='int64')
+        cum[1:] = cumsum(self.isbus_table)
+        self.cum = cum
+        self.dates = days[self.isbus_table]
+        for a in (self.isbus_table, self.cum, self.dates):
+            a.flags.writeable = False
+
+    def _positions(self, d):
+        """Position of datetime64[D] date(s) d in the table, or None if any
+        of them falls outside of it. Scalar dates give integer positions,
+        which keeps the overhead of single lookups small"""
+        if isinstance(d, datetime64):
+            # datetime64[D] scalars become datetime.date, whose ordinal is
+            # much cheaper to get than numpy scalar arithmetic
+            x = d.item()
+            if type(x) is date:
+                p = x.toordinal() - self._start_ordinal
+                return p if 0 <= p < len(self.isbus_table) else None
+        p = (asarray(d, dtype='datetime64[D]') - self.start).astype('int64')
+        if p.size == 0 or (p.min() >= 0 and p.max() < len(self.isbus_table)):
+            return p
+        return None
+
+    def count(self, d1, d2):
+        """Same as numpy.busday_count(d1, d2)"""
+        p1 = self._positions(d1)
+        p2 = self._positions(d2)
+        if p1 is None or p2 is None:
+            wider = self._wider(d1, d2)
+            if wider is not None:
+                return wider.count(d1, d2)
+            return busday_count(d1, d2, busdaycal=self.busdaycal)
+        # Like numpy, the interval is [d1, d2) if d1 <= d2 and the count is
+        # minus the number of business days in (d2, d1] otherwise
+        if isinstance(p1, int) and isinstance(p2, int):
+            if p1 <= p2:
+                return self.cum[p2] - self.cum[p1]
+            return self.cum[p2 + 1] - self.cum[p1 + 1]
+        n = where(p1 <= p2, self.cum[p2] - self.cum[p1],
+                  self.cum[p2 + 1] - self.cum[p1 + 1])
+        return n[()]
+
+    def is_busday(self, d):
+        """Same as numpy.is_busday(d)"""
+        p = self._positions(d)
+        if p is None:
+            wider = self._wider(d)
+            if wider is not None:
+                return wider.is_busday(d)
+            return is_busday(d, busdaycal=self.busdaycal)
+        if isinstance(p, int):
+            return self.isbus_table[p]
+        return self.isbus_table[p][()]
+
+    def offset(self, d, offsets=0, roll='raise'):
+        """Same as numpy.busday_offset(d, offsets, roll) for rolls 'raise',
+        'following', 'preceding', 'modifiedfollowing' and
+        'modifiedpreceding'"""
+        p = self._positions(d)
+        if p is None or roll not in ['raise', 'following', 'preceding',
+                                     'modifiedfollowing', 'modifiedpreceding']:
+            return self._offset_fallback(d, offsets, roll)
+        if roll == 'raise' and not self.isbus_table[p].all():
+            # Let numpy raise its own error message
+            return busday_offset(d, offsets=offsets, roll=roll,
+                                 busdaycal=self.busdaycal)
+        if isinstance(p, int) and isinstance(offsets, (int, integer)):
+            return self._offset_scalar(d, p, int(offsets), roll)
+        # Index (in the business dates array) of the first business day on
+        # or after d and of the last business day on or before d
+        kf = self.cum[p]
+        kp = self.cum[p + 1] - 1
+        nb = len(self.dates)
+        if roll in ['following', 'raise']:
+            k = kf
+        elif roll == 'preceding':
+            k = kp
+        else:
+            if kf.max() >= nb or kp.min() < 0:
+                return self._offset_fallback(d, offsets, roll)
+            month = asarray(d, dtype='datetime64[D]').astype('datetime64[M]')
+            if roll == 'modifiedfollowing':
+                cross = self.dates[kf].astype('datetime64[M]') != month
+                k = where(cross, kp, kf)
+            else:
+                cross = self.dates[kp].astype('datetime64[M]') != month
+                k = where(cross, kf, kp)
+        k = k + asarray(offsets, dtype='int64')
+        if k.size > 0 and (k.min() < 0 or k.max() >= nb):
+            return self._offset_fallback(d, offsets, roll)
+        return self.dates[k][()]
+
+    def _offset_scalar(self, d, p, offset, roll):
+        """Single date version of offset, working on Python integers"""
+        nb = len(self.dates)
+        kf = int(self.cum[p])
+        kp = int(self.cum[p + 1]) - 1
+        if roll in ['following', 'raise']:
+            k = kf
+        elif roll == 'preceding':
+            k = kp
+        elif kf >= nb or kp < 0:
+            # The roll leaves the table, so it cannot tell if it crosses
+            # the end of the month
+            return self._offset_fallback(d, offset, roll)
+        elif roll == 'modifiedfollowing':
+            k = kf if self.dates[kf].item().month == d.item().month else kp
+        else:
+            k = kp if self.dates[kp].item().month == d.item().month else kf
+        k += offset
+        if k < 0 or k >= nb:
+            return self._offset_fallback(d, offset, roll)
+        return self.dates[k]
+
+    def _offset_fallback(self, d, offsets, roll):
+        """numpy.busday_offset, or offset on a wider table, for queries
+        that do not fit in this one"""
+        if self.extend is None:
+            return busday_offset(d, offsets=offsets, roll=roll,
+                                 busdaycal=self.busdaycal)
+        if roll in ['raise', 'following', 'preceding', 'modifiedfollowing',
+                    'modifiedpreceding']:
+            # There are (many) more calendar days than business days
+            # between a date and its offset, so we leave some slack
+            margin = 2 * int(abs(asarray(offsets, dtype='int64')).max(
+                initial=0)) + 31
+            wider = self._wider(d, margin=margin)
+        else:
+            wider = self.extend()
+        return wider.offset(d, offsets=offsets, roll=roll)
+
+    def _wider(self, *d, margin=0):
+        """Table covering dates d (with margin days on both sides), to
+        which queries that do not fit in this one are handed over, or None
+        if the table does not extend"""
+        if self.extend is None:
+            return None
+        d = [asarray(x, dtype='datetime64[D]') for x in d]
+        lo = min(x.min() for x in d) - margin
+        hi = max(x.max() for x in d) + margin
+        wider = self.extend(lo, hi)
+        if wider is self:
+            # Only happens if this table already covers the dates, but not
+            # the business days the query needs (offset). Go for the full
+            # range, which does not extend any further
+            wider = self.extend()
+        return wider
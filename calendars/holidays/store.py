@@ -0,0 +1,41 @@
+"""
+Binary holiday store. Each calendar is kept as a sorted datetime64[D] array
+in its own .npy file under the data folder, which is memory-mapped at load,
+so that no Python date objects are created when reading it.
+"""
+
+from os import path
+from numpy import load, save, unique, asarray, searchsorted, datetime64
+
+STORE_PATH = path.join(path.dirname(path.abspath(__file__)), 'data')
+
+
+def store_file(name):
+    """Path of the store file for calendar name"""
+    return path.join(STORE_PATH, name.lower().replace('cdr_', '') + '.npy')
+
+
+def load_holidays(name, years=None):
+    """Read-only, memory-mapped datetime64[D] array with the holidays of
+    calendar name. If years is given as (first year, last year), only the
+    holidays in that window are returned"""
+    fp = store_file(name)
+    if not path.isfile(fp):
+        raise NotImplementedError('Calendar `%s` not found in the holiday '
+                                  'store' % name)
+    h = load(fp, mmap_mode='r')
+    if years is not None:
+        # Store files are sorted, so the window is a slice of the file
+        i, j = searchsorted(h, [datetime64('%d-01-01' % years[0], 'D'),
+                                datetime64('%d-01-01' % (years[1] + 1), 'D')])
+        h = h[i:j]
+    return h
+
+
+def save_holidays(name, dates):
+    """Write the holidays in dates (anything numpy can cast to
+    datetime64[D]) as the store file of calendar name. Dates are sorted and
+    duplicates are removed"""
+    h = unique(asarray(dates, dtype='datetime64[D]'))
+    save(store_file(name), h)
+    return h
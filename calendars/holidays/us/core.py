@@ -19,6 +19,6 @@ class USTradingCalendar(AbstractBase):
     def __init__(self):
         super(USTradingCalendar, self).__init__(name='us_trading')
 
-    def cdr_us_trading(self):
-        """Return calendar for fixed period"""
-        return self._base_caller()
+    def cdr_us_trading(self, years=None):
+        """Return calendar for fixed period (or for the window of years)"""
+        return self._base_caller(years)
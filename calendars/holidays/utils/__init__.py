@@ -1,12 +1,13 @@
 __all__ = ['USIndependenceDay', 'USVeteransDay', 'UKEarlyMayBank',
            'UKLateSummerBank', 'UKSpringBank', 'Christmas', 'BoxingDay',
            'NewYearsDay', 'InternationalLaborDay', 'closest_next_monday',
-           'closest_previous_monday', 'Y_END', 'Y_INI', 'AbstractBase']
+           'closest_previous_monday', 'Y_END', 'Y_INI', 'Y_CHUNK',
+           'Y_WINDOW_INI', 'Y_WINDOW_END', 'AbstractBase']
 
 from .abstract_base import AbstractBase
 from .international import InternationalLaborDay
 from .anglorules import USIndependenceDay, USVeteransDay, UKEarlyMayBank, \
     UKLateSummerBank, UKSpringBank, Christmas, BoxingDay, NewYearsDay
 from .observances import closest_next_monday, closest_previous_monday
-from .constants import Y_END, Y_INI
+from .constants import Y_END, Y_INI, Y_CHUNK, Y_WINDOW_INI, Y_WINDOW_END
 
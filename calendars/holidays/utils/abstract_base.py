@@ -1,5 +1,7 @@
+from threading import Lock
 from pandas.tseries.holiday import AbstractHolidayCalendar
-from .constants import Y_END, Y_INI
+from numpy import asarray, concatenate, datetime64
+from .constants import Y_END, Y_INI, Y_CHUNK
 from datetime import date
 
 
@@ -8,11 +10,63 @@ class AbstractBase(AbstractHolidayCalendar):
 
     def __init__(self, name):
         super(AbstractBase, self).__init__(name=name, rules=self._config)
+        # Holidays already generated, by block of Y_CHUNK years
+        self._chunks = dict()
+        self._chunks_lock = Lock()
 
-    def _base_caller(self):
-        """Base caller generates list of holiday dates using inherited
-        method. The method holidays returns a DatetimeIndex object,
-        however for backward compatibility we `cast` this into a list of
-        datetime.date"""
-        h = self.holidays(date(Y_INI - 1, 12, 31), date(Y_END, 12, 31))
-        return list(h.date)
+    def _base_caller(self, years=None):
+        """Base caller generates array of holiday dates using inherited
+        method.
+
+        Inputs:
+            years   - None or tuple (first year, last year) with the window
+                      of interest. Default is the full range, Y_INI to Y_END
+
+        Returns:
+            h       - datetime64[D] array with the holidays in the window.
+                      For the full range, this includes Dec 31st of
+                      Y_INI - 1, as in the original engines
+
+        Holidays are only generated for the blocks of Y_CHUNK years
+        overlapping the window (and kept for later calls), so asking for a
+        narrow window is much cheaper than asking for the full range.
+        Results are the same as slicing the full range output"""
+        y0, y1 = (Y_INI, Y_END) if years is None else years
+        y0, y1 = max(y0, Y_INI), min(y1, Y_END)
+        if y0 > y1:
+            return asarray([], dtype='datetime64[D]')
+        k0 = (y0 - Y_INI) // Y_CHUNK
+        k1 = (y1 - Y_INI) // Y_CHUNK
+        if any(k not in self._chunks for k in range(k0, k1 + 1)):
+            self._generate_chunks(k0, k1)
+        h = concatenate([self._chunks[k] for k in range(k0, k1 + 1)])
+        # Trim the blocks to the window
+        lo = datetime64('%d-12-31' % (y0 - 1), 'D')
+        if y0 > Y_INI:
+            lo = lo + 1
+        hi = datetime64('%d-01-01' % (y1 + 1), 'D')
+        return h[(h >= lo) & (h < hi)]
+
+    def _generate_chunks(self, k0, k1):
+        """Generate holidays for the blocks k0 to k1 in a single call to the
+        holiday rules, and store them by block"""
+        with self._chunks_lock:
+            missing = [k for k in range(k0, k1 + 1) if k not in self._chunks]
+            if not missing:
+                return
+            k0, k1 = missing[0], missing[-1]
+            y0 = Y_INI + k0 * Y_CHUNK
+            y1 = min(Y_INI + (k1 + 1) * Y_CHUNK - 1, Y_END)
+            # The first block keeps Dec 31st of the year before Y_INI, which
+            # has always been part of the generated range
+            start = date(y0 - 1, 12, 31) if k0 == 0 else date(y0, 1, 1)
+            h = self.holidays(start, date(y1, 12, 31))
+            h = asarray(h.values, dtype='datetime64[D]')
+            for k in range(k0, k1 + 1):
+                lo = datetime64('%d-01-01' % (Y_INI + k * Y_CHUNK), 'D')
+                hi = datetime64('%d-01-01' % (Y_INI + (k + 1) * Y_CHUNK), 'D')
+                if k == 0:
+                    lo = lo - 1
+                chunk = h[(h >= lo) & (h < hi)]
+                chunk.flags.writeable = False
+                self._chunks.setdefault(k, chunk)
@@ -1,2 +1,9 @@
 Y_INI = 1940
 Y_END = 2200
+# Holiday engines generate dates on demand, in blocks of Y_CHUNK years
+# (aligned at Y_INI), and business day tables start out covering the years
+# Y_WINDOW_INI to Y_WINDOW_END only. Both extend themselves when dates
+# outside of them are requested
+Y_CHUNK = 10
+Y_WINDOW_INI = 1990
+Y_WINDOW_END = 2039
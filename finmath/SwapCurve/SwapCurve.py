@@ -443,7 +443,7 @@ class SwapCurve(object):
 
         rate1 = rate1/100
         rate2 = rate2/100
-        holidays = AnbimaHolidays().get_holidays()
+        busdaycal = AnbimaHolidays().get_busdaycalendar()
 
         maturity1_date = base_date + dt.timedelta(days=maturity1)
         print(maturity1_date)
@@ -451,9 +451,9 @@ class SwapCurve(object):
         maturity2_date = base_date + dt.timedelta(days=maturity2)
 
         business_days1 = np.busday_count(np.array(base_date).astype('datetime64[D]'),
-                                         np.array(maturity1_date).astype('datetime64[D]'), holidays=holidays)
+                                         np.array(maturity1_date).astype('datetime64[D]'), busdaycal=busdaycal)
         business_days2 = np.busday_count(np.array(base_date).astype('datetime64[D]'),
-                                         np.array(maturity2_date).astype('datetime64[D]'), holidays=holidays)
+                                         np.array(maturity2_date).astype('datetime64[D]'), busdaycal=busdaycal)
 
         days_to_years1 = (business_days1/convention)
         days_to_years2 = (business_days2/convention)
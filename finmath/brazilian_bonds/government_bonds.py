@@ -150,13 +150,10 @@ class NTNF(object):
 
     @property
     def calculate_risk(self):
-        macaulay = 0.
-        convexity = 0.
-        for d, p in self.cash_flows.items():
-            pv = p / (1. + self.rate) ** dc.tf(self.ref_date, d)
-            t = dc.tf(self.ref_date, d)
-            macaulay += t * pv
-            convexity += t * (1 + t) * pv
+        t = dc.tf_matrix(self.ref_date, self.cash_flows.index).values[0]
+        pv = self.cash_flows.values / (1. + self.rate) ** t
+        macaulay = (t * pv).sum()
+        convexity = (t * (1 + t) * pv).sum()
         macaulay = macaulay / self.price
         mod_duration = macaulay / (1. + self.rate)
         convexity = (convexity / self.price) / (1. + self.rate) ** 2
@@ -30,7 +30,7 @@ def _clean_curve(curve: pd.Series,
         msg = 'Parameter ref_date as Date required!'
         assert type(ref_date) in date_types, msg
         assert dc is not None, 'Parameter dc as DayCounts required!'
-        dates = [dc.tf(pd.to_datetime(ref_date).date(), t) for t in curve.index]
+        dates = dc.tf_matrix(ref_date, curve.index).values[0]
         clean_curve = pd.Series(curve.values, dates).astype(float)
     else:
         clean_curve = pd.Series(curve.values,
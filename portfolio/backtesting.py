@@ -1,9 +1,18 @@
+import os
+import json
+import hashlib
+import inspect
 import pandas as pd
 import numpy as np
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
 from pandas.tseries.offsets import *
 import scipy.optimize as opt
 import scipy.cluster.hierarchy as sch
 from scipy import stats
+from scipy.spatial.distance import squareform
+from scipy.linalg import eigh
+from scipy.linalg.blas import dsyrk
 
 
 class FHBacktestAncilliaryFunctions(object):
@@ -15,8 +24,18 @@ class FHBacktestAncilliaryFunctions(object):
 
     resample_dates : for calculating rebalancing dates based on Pandas calendar sampling
     expand_static_weights : to transfor static weights series in a dataframe of constant weights over some time index
-    get_cov_matrix_on_date : calculates covariance matrices
+    get_cov_matrix_on_date : calculates covariance matrices (see FHCovarianceProvider for many dates at once)
     static_weights : static non-negative weights (long-only) for a given weighting scheme
+    cross_sectional_weights_from_signals : long-short weights for a given set of signals
+    panel_weights_from_signals : the same weights on many dates at once, for weighting schemes without optimizer
+    min_variance_weights : active-set solver for long-only minimum variance weights
+    risk_parity_weights : Newton solver for risk parity weights
+    bounded_risk_parity_weights : projected Newton solver for risk budgeting weights within caps
+    hrp_weights : hierarchical risk parity weights, also used by the HRP class in portfolio/construction.py
+    max_signal_weights : closed-form/active-set solver for the maximum signal portfolio with a volatility target
+    simulate_holdings : NumPy engine running the holdings and pnl recursion of the backtests
+    simulate_strategies : the same engine running many strategies with the same underlyings at once
+    map_over_dates : runs a weighting function for each rebalancing date, optionally in a pool of processes
 
     """
 
@@ -45,7 +64,7 @@ class FHBacktestAncilliaryFunctions(object):
         if isinstance(rebalance, str):
             if (rebalance[0] == 'W' and len(rebalance) > 1) or rebalance == 'W':
                 wd = int(2 * (rebalance[1] == 'W') + 4 * (rebalance[1] == 'F')) if len(rebalance) > 1 else None
-                rebc = pd.to_datetime([x for x in (index + Week(1, weekday=wd)).unique()])
+                rebc = pd.to_datetime((index + Week(1, weekday=wd)).unique())
             elif rebalance == 'ME' or rebalance == 'M':
                 rebc = pd.to_datetime((index + BMonthEnd(1)).unique())
             elif rebalance == 'MM':
@@ -61,13 +80,15 @@ class FHBacktestAncilliaryFunctions(object):
                 # TODO: This is taking the last business day of the quarter if index + QuarterBegin(0) fall on a weekend. Fix this.
                 rebc = pd.to_datetime((index + QuarterBegin(0)).unique())
             elif rebalance == 'SE' or rebalance == 'S':
-                rebc = pd.to_datetime([x for x in (index + BMonthEnd(1)).unique() if x.month in [6, 12]])
+                rebc = (index + BMonthEnd(1)).unique()
+                rebc = pd.to_datetime(rebc[rebc.month.isin([6, 12])])
             elif rebalance == 'SM':
-                rebc = pd.to_datetime(
-                    [x for x in (index + MonthBegin(0) + BusinessDay(10)).unique() if x.month in [6, 12]])
+                rebc = (index + MonthBegin(0) + BusinessDay(10)).unique()
+                rebc = pd.to_datetime(rebc[rebc.month.isin([6, 12])])
             elif rebalance == 'SS':
                 # TODO: This is taking the last business day of the semester if index + MonthBegin(0) fall on a weekend. Fix this.
-                rebc = pd.to_datetime([x for x in (index + MonthBegin(0)).unique() if x.month in [6, 12]])
+                rebc = (index + MonthBegin(0)).unique()
+                rebc = pd.to_datetime(rebc[rebc.month.isin([6, 12])])
             elif rebalance == 'YE' or rebalance == 'Y':
                 rebc = pd.to_datetime((index + BYearEnd(1)).unique())
             elif rebalance == 'YM':
@@ -85,7 +106,8 @@ class FHBacktestAncilliaryFunctions(object):
             else:
                 # this will work if the user provided a list with months to rebalance month end frequency (last day of the month
                 try:
-                    rebc = pd.to_datetime([x for x in (index + BMonthEnd(1)).unique() if x.month in rebalance])
+                    rebc = (index + BMonthEnd(1)).unique()
+                    rebc = pd.to_datetime(rebc[rebc.month.isin(rebalance)])
                 except:  # last resort for user provided list
                     print('Invalid rebalance list, assuming month end frequency (last day of the month)')
                     rebc = pd.to_datetime((index + BMonthEnd(1)).unique())
@@ -96,26 +118,28 @@ class FHBacktestAncilliaryFunctions(object):
         # not necessarily the rebalancing days are valid days, i.e., are in index
         # we need to take the rebalancing days that are not in index and alter them
         # we alter them to the closest possible date in index
-        # rebalancing days that are not in index
+        # rebalancing days after the end of index are dropped
         rebc.freq = None
-        notin = pd.DatetimeIndex([x for x in rebc if x not in index and x < index.max()],
-                                                                        dtype=rebc.dtype, freq=rebc.freq)
+        days = np.sort(index.values.astype('datetime64[ns]').view('i8'))
+        rebc_days = rebc.values.astype('datetime64[ns]').view('i8')
+        pos = np.searchsorted(days, rebc_days)  # first day in index on or after each rebalancing day
+        isin = days[np.minimum(pos, len(days) - 1)] == rebc_days
+        notin = ~isin & (rebc_days < days[-1])
 
         # find the closest day in index
+        pos = pos[notin]
         if isinstance(rebalance, str) and len(rebalance) == 2 and rebalance[1] == 'S':
             # when dealing with start frequency we want to find the next valid day not only the closest
-            next_index_day = lambda x: min([d for d in index if d >= x])
-            alter = [next_index_day(p) for p in notin]
+            alter = days[pos]
         else:
-            # for the other cases, we just find the closest date
-            alter = [min(index, key=lambda x: abs(x - p)) for p in notin]
+            # for the other cases, we just find the closest date, the earlier one if both are equally close
+            before = days[np.maximum(pos - 1, 0)]
+            after = days[pos]
+            alter = np.where((pos > 0) & (rebc_days[notin] - before <= after - rebc_days[notin]), before, after)
 
-        notin = notin.append(pd.DatetimeIndex([x for x in rebc if x > index.max()], dtype=rebc.dtype, freq=rebc.freq))
-
-        alter = pd.DatetimeIndex(alter, dtype=rebc.dtype, freq=rebc.freq)
-        reb = rebc.drop(notin)  # drop the invalid rebalancing dates
-        reb = reb.append(alter)  # add the closest days in index
-        reb = reb.sort_values()  # reorder
+        # drop the invalid rebalancing dates, add the closest days in index and reorder
+        reb = np.sort(np.concatenate([rebc_days[isin], alter]))
+        reb = pd.DatetimeIndex(reb.view('datetime64[ns]')).astype(rebc.dtype)
 
         return reb
 
@@ -130,7 +154,8 @@ class FHBacktestAncilliaryFunctions(object):
         return w_df
 
     @staticmethod
-    def get_cov_matrix_on_date(d, ts, h=21, cov_type='rolling', cov_window=756, halflife=60, shrinkage_parameter = 1):
+    def get_cov_matrix_on_date(d, ts, h=21, cov_type='rolling', cov_window=756, halflife=60, shrinkage_parameter = 1,
+                               n_factors=5):
         """
             This function calculates the annualized covariance matrix for a given date, r
             It does a few things that are important for backtests that are not done by pandas cov functions
@@ -149,55 +174,28 @@ class FHBacktestAncilliaryFunctions(object):
                 1. rolling (default) : is a rolling window of size cov_window (default is 3 years of data)
                 2. ewma : is a ewma cov (default halflife is 60 bdays)
                 3. expanding : is an expanding window from the start of each series
+                4. factor : is a statistical factor model with n_factors factors (default is 5), the principal
+                            components of the returns over the rolling window, and idiosyncratic variances.
+                            Series with too little data take their unconditional variance
+            n_factors : the number of factors when cov_type is 'factor'
 
             Returns
             -------
-            an annualized covariance matrix based on h period returns
+            an annualized covariance matrix based on h period returns. For cov_type equal to 'factor' it is a
+            FHFactorCovariance, which the weighting schemes use without forming the dense matrix, in O(n K^2)
+            operations per step for n assets and K factors: 'IVP', 'MVR' and 'ERC', including the signal-based 'ERC'
+            with binding bounds, and 'vol_target' when the maximum signal portfolio within the bounds reaches the
+            volatility target. Otherwise 'vol_target' falls back to SLSQP, which uses dense matrices and does not
+            scale to thousands of assets
 
         """
 
-        # clean up
-        ts = ts.astype(float)
-        ts.index = pd.DatetimeIndex(pd.to_datetime(ts.index))
-        r = max([x for x in ts.index if x <= pd.to_datetime(d)])
-
-        t0 = ts.index[0]  # this is when the data starts
-        unc_cov = np.log(ts).diff(h).cov() * (252 / h)  # this is the unconditional covariance matrix annualized
-
-        # if the dataframe has less than certain amount of data, use the unconditional covariance matrix
-        if (r - t0).days < cov_window:
-            cov = unc_cov.copy()
-        # if the ts DataFrame has at least some amount of data, use the conditional cov
-        else:
-            past_data = ts.shift(1).loc[:r]  # note the day lag to not use information not available in the backtesst
-            if cov_type == 'expanding':
-                cond_cov = np.log(past_data).diff(h).cov() * (252 / h)
-            elif cov_type == 'ewma':
-                # This is roughly similar to a GARCH(1, 1) model:
-                cond_cov = (np.log(past_data).diff(1).ewm(halflife=halflife).cov().loc[r]) * 252
-            else:
-                if cov_type != 'rolling':
-                    print('cov_type not recognized, assuming rolling window of %s bdays' % str(cov_window))
-                cond_cov = np.log(past_data.iloc[-cov_window:]).diff(h).cov() * (252 / h)
-
-            count_past = past_data.count()  # this counts how munch data for each series
-
-            # take the series that do not have enough data and replace with unconditional estimates
-            for x in count_past[count_past <= cov_window].index:
-                cond_cov.loc[x, :] = unc_cov.loc[x, :].values
-                cond_cov.loc[:, x] = unc_cov.loc[:, x].values
-            cov = cond_cov.copy()
-
-        if shrinkage_parameter >=0 and shrinkage_parameter<1:
-            vols = pd.Series(index=cov.index,data=np.sqrt(np.diag(cov)))
-            corr = cov.div(vols, axis=0).div(vols, axis=1)
-            corr = shrinkage_parameter * corr + (1 - shrinkage_parameter) * np.eye(len(vols))
-            cov  = corr.multiply(vols, axis=0).multiply(vols, axis=1).copy()
-
-        return cov
+        provider = FHCovarianceProvider(ts, h=h, cov_type=cov_type, cov_window=cov_window, halflife=halflife,
+                                        shrinkage_parameter=shrinkage_parameter, n_factors=n_factors)
+        return provider.get_cov_matrix_on_date(d)
 
     @staticmethod
-    def static_weights(weighting_scheme, cov=None, vol_target=0.1):
+    def static_weights(weighting_scheme, cov=None, vol_target=0.1, seed=None, initial_weights=None):
         """
         This method calculates static non-negative weights for a given weighting scheme
         This method largely makes the functions in portfolio/construction.py obsolete
@@ -206,25 +204,38 @@ class FHBacktestAncilliaryFunctions(object):
         ----------
         weighting_scheme :  this is a string that can take the following values
             'IVP' : Inverse Volatility Portfolio
-            'MVR' : Minimum Variance Portfolio
-            'ERC' : Equal Risk Contribution Portfolio
+            'MVR' : Minimum Variance Portfolio (see min_variance_weights)
+            'ERC' : Equal Risk Contribution Portfolio (see risk_parity_weights)
             'HRP' : Hierarchical Risk Parity from López de Prado (2016) in the Journal of Portfolio Management
+                    (see hrp_weights)
             'EW'  : Equal weights (this is the fall back case if the string is not recognized)
 
-        cov : a DataFrame with the covariance matrix used in all weighting schemes but equal weights
+        cov : a DataFrame (or FHFactorCovariance) with the covariance matrix used in all weighting schemes but equal
+              weights
         vol_target : only used in the Equal Risk Contribution Portfolio to set the overall volatility of the portfolio
+        seed : seed for the random steps of the basinhopping optimizations of the 'MVR' and 'ERC' weighting schemes
+               An integer makes the weights reproducible. Default is None, using the global NumPy random state
+        initial_weights : an array with the weights used as starting point of the dedicated solvers of the 'MVR' and
+                          'ERC' weighting schemes, typically the weights of the previous rebalancing date.
+                          If the warm-started solver does not converge, it is started again from its usual (cold)
+                          starting point. Default is None, for a cold start
 
         Returns
         -------
         a Pandas series with static non-negative weights (long-only)
+        For 'MVR' and 'ERC' the name of the solver used is in the attrs['solver'] of the series, its number of
+        iterations in attrs['iterations'] and attrs['warm_start'] is True if the weights come from the warm-started
+        solver. The global basinhopping search is only used if the dedicated solver does not converge
         """
 
-        assert isinstance(ts, pd.DataFrame), "input 'cov' must be a pandas DataFrame"
+        assert cov is None or isinstance(cov, (pd.DataFrame, FHFactorCovariance)),\
+            "input 'cov' must be a pandas DataFrame or a FHFactorCovariance"
+        values = None if cov is None else FHBacktestAncilliaryFunctions._covariance_values(cov)
 
         # Inverse Volatility Portfolio
         if weighting_scheme == 'IVP':
             # non-negative weights are set to be proportional to the inverse of the vol, adding up to one
-            w = np.sqrt(np.diag(cov))
+            w = np.sqrt(FHBacktestAncilliaryFunctions._variances(values))
             w = 1 / w
             w = w / w.sum()
             static_weights = pd.Series(data=w, index=cov.columns)
@@ -232,253 +243,2014 @@ class FHBacktestAncilliaryFunctions(object):
         # Minimum Variance Portfolio
         elif weighting_scheme == 'MVR':
             # non-negative weights are set to minimize the overall portfolio variance
-            n = cov.shape[0]
-            port_variance = lambda x: x.dot(cov).dot(x)
-            eq_cons = {'type': 'eq', 'fun': lambda w: w.sum() - 1}
-            bounds = opt.Bounds(0, np.inf)
-            w0 = np.ones(n) / n
-            res = opt.basinhopping(port_variance, w0, minimizer_kwargs={'method': 'SLSQP',
-                                                                        'constraints': eq_cons, 'bounds': bounds},
-                                   T=1.0,
-                                   niter=500,
-                                   stepsize=0.5,
-                                   interval=50,
-                                   disp=False,
-                                   niter_success=100)
-
-            if not res['lowest_optimization_result']['success']:
-                raise ArithmeticError('Optimization convergence failed for static MVR weighting scheme')
-
-            static_weights = pd.Series(data=res.x, index=cov.columns)
+            w, converged, iterations, warm = FHBacktestAncilliaryFunctions._warm_or_cold_start(
+                FHBacktestAncilliaryFunctions.min_variance_weights, initial_weights, cov)
+            solver = 'active_set_qp'
+            if not converged:
+                n = cov.shape[0]
+                port_variance = lambda x: x @ values @ x
+                eq_cons = {'type': 'eq', 'fun': lambda w: w.sum() - 1}
+                bounds = opt.Bounds(0, np.inf)
+                w0 = np.ones(n) / n
+                res = FHBacktestAncilliaryFunctions._basinhopping_weights(port_variance, w0, eq_cons, bounds, seed)
+                if not res['lowest_optimization_result']['success']:
+                    raise ArithmeticError('Optimization convergence failed for static MVR weighting scheme')
+                w, solver, iterations, warm = res.x, 'basinhopping', res['nit'], False
+
+            static_weights = pd.Series(data=w, index=cov.columns)
+            static_weights.attrs.update(solver=solver, iterations=iterations, warm_start=warm)
 
         # Equal Risk Contribution Portfolio
         elif weighting_scheme == 'ERC':
             # non-negative weights are set to for each component to have equal risk contribution
+            # risk parity weights have unit variance, so they are rescaled to the volatility target
+            w, converged, iterations, warm = FHBacktestAncilliaryFunctions._warm_or_cold_start(
+                FHBacktestAncilliaryFunctions.risk_parity_weights, initial_weights, cov)
+            w = w * vol_target
+            solver = 'newton'
+            if not converged:
+                n = cov.shape[0]
+                target_risk_contribution = np.ones(n) / n
+                dist_to_target = lambda x: np.linalg.norm(x * (x @ values / (vol_target ** 2))
+                                                          - target_risk_contribution)
+                port_vol = lambda x: np.sqrt(x @ values @ x)
+                eq_cons = {'type': 'eq', 'fun': lambda x: port_vol(x) - vol_target}
+                bounds = opt.Bounds(0, np.inf)
+                res = FHBacktestAncilliaryFunctions._basinhopping_weights(dist_to_target, target_risk_contribution,
+                                                                          eq_cons, bounds, seed)
+                if not res['lowest_optimization_result']['success']:
+                    raise ArithmeticError('Optimization convergence failed for static ERC weighting scheme')
+                w, solver, iterations, warm = res.x, 'basinhopping', res['nit'], False
+            static_weights = pd.Series(data=w, index=cov.columns)
+            static_weights.attrs.update(solver=solver, iterations=iterations, warm_start=warm)
+
+        # Hierarchical Risk Parity
+        elif weighting_scheme == 'HRP':
+            w, _, _ = FHBacktestAncilliaryFunctions.hrp_weights(cov)
+            static_weights = pd.Series(data=w, index=cov.columns)
+        else:
+            # Equal Weights
+            if weighting_scheme != 'EW':
+                print('%s weighting scheme is not recognized, defaulting to static equal weights' % weighting_scheme)
+            n = cov.shape[0]
+            static_weights = pd.Series(index=cov.index, data=1 / n)
+
+        return static_weights
+
+    @staticmethod
+    def cross_sectional_weights_from_signals(signals, weighting_scheme = 'rank', cov = None, vol_target = 0.1,
+                                             seed = None, initial_weights = None):
+        """
+        This method calculates static long-short weights for a given set of signals
+
+        Parameters
+        ----------
+
+        signals : a Pandas series containing a set of signals on which assets will be sorted. Typically, we want to
+                  be long and have higher weight on assets with large signals and to be short and have large negative
+                  weights in the assets with low signals
+
+        weighting_scheme :  this is a string that can take the following values
+            'zscores' : z-score long-short weights adding up to 200% in absolute value
+            'winsorized' : same as 'zscores' but with z-scores winsorized at 10th/90th percentile limits
+            'vol_target' : long-short weights set to achieve a certain volatility target for the entire portfolio
+                           (see max_signal_weights)
+            'ERC' : Equal Risk Contribution Portfolio (see risk_parity_weights)
+            'IVP' : Inverse Volatility Portfolio
+            'EW' : Equal Weights
+            'rank' : Signal Rank Based Portfolio (this is the case if the parameter is not given or not recognized)
+
+        cov : a DataFrame (or FHFactorCovariance) with the covariance matrix used in all weighting schemes but equal
+              weights
+        vol_target : used in the 'vol_target' and 'ERC' weighting schemes to set the overall volatility of the portfolio
+        seed : seed for the random steps of the basinhopping optimizations of the 'vol_target' and 'ERC' weighting
+               schemes. An integer makes the weights reproducible. Default is None, using the global NumPy random state
+        initial_weights : an array with the weights used as starting point of the dedicated solver of the 'ERC'
+                          weighting scheme, typically the weights of the previous rebalancing date.
+                          If the warm-started solver does not converge, it is started again from its usual (cold)
+                          starting point. Default is None, for a cold start
+
+        Returns
+        -------
+        a Pandas series with static long-short weights as type float
+        For 'vol_target' and 'ERC' the name of the solver used is in the attrs['solver'] of the series, its number of
+        iterations in attrs['iterations'] and attrs['warm_start'] is True if the weights come from the warm-started
+        solver. The global basinhopping search is only used if the dedicated solver does not converge
+        """
+
+        assert isinstance(signals, pd.Series), "input 'signals' must be a pandas Series"
+        assert isinstance(weighting_scheme, str), "input 'weighting_scheme' must be a string"
+        values = None if cov is None else FHBacktestAncilliaryFunctions._covariance_values(cov)
+        scheme = FHBacktestAncilliaryFunctions._signal_scheme(weighting_scheme)
+
+        if scheme == 'zscores':
+            # z-score long-short weights adding up to 200% in absolute value
+            weights = signals.copy().fillna(0) * 0
+            scores = pd.Series(index=signals.dropna().index, data=stats.zscore(signals.dropna()))
+            weights[scores.index] = scores.values
+            weights = weights / (np.nansum(np.abs(weights)) / 2)
+
+        elif scheme == 'winsorized':
+            # z-scores winsorized at 10th/90th percentile limits long-short weights adding up to 200%
+            weights = signals.copy().fillna(0) * 0
+            raw_scores = stats.zscore(signals.dropna())
+            w_scores = stats.mstats.winsorize(raw_scores, limits=.1)
+            scores = pd.Series(index=signals.dropna().index, data=w_scores)
+            weights[scores.index] = scores.values
+            weights = weights / (np.nansum(np.abs(weights)) / 2)
+
+        elif scheme == 'vol_target':
+            # long-short weights set to achieve a certain volatility target for the entire portfolio
+
+            # maximize the portfolio signal (actually minimize the opposite of that)
+            port_signal = lambda x: - x.dot(signals.values)
+
+            # subject to the portfolio volatility being equal to vol_target
+            port_vol = lambda x: np.sqrt(x @ values @ x) - vol_target
+            eq_cons = {'type': 'eq', 'fun': lambda x: port_vol(x)}
+
+            # initialize optimization with rank-based portfolio
+            ranks = signals.rank()
+            w0 = ranks - ranks.mean()
+            w0 = w0 / (np.nansum(np.abs(w0)) / 2)
+
+            # bounds are set in order to be long/short what the rank based portfolio tells us to be long/short
+            # the maximum weight in absolute value is the maximum weight in the rank-based portfolio
+            bounds = pd.DataFrame(index=signals.index, columns=['lower', 'upper'])
+            bounds['lower'] = np.array([np.sign(w0) * max(np.abs(w0)), np.zeros(w0.shape)]).min(axis=0)
+            bounds['upper'] = np.array([np.sign(w0) * max(np.abs(w0)), np.zeros(w0.shape)]).max(axis=0)
+
+            # assets without signals are kept out of the portfolio. The bounds move with the ranks of the signals,
+            # so the clipped closed-form solution is a better starting point than the weights of a previous date
+            lower, upper = np.nan_to_num(bounds['lower'].values), np.nan_to_num(bounds['upper'].values)
+            w, converged, iterations = FHBacktestAncilliaryFunctions.max_signal_weights(np.nan_to_num(signals.values),
+                                                                                        cov, vol_target, lower, upper)
+            solver, warm = 'lagrangian_active_set', False
+            if not converged:
+                # the bounds keep the volatility of the maximum signal portfolio below the target, so search locally
+                # starting from the maximum signal portfolio found. SLSQP forms dense matrices, also for a
+                # FHFactorCovariance, so this is not scalable to thousands of assets
+                res = opt.minimize(port_signal, w, method='SLSQP', constraints=eq_cons, bounds=bounds.values)
+                w, solver, iterations = res.x, 'slsqp', res['nit']
+                if not res['success']:
+                    res = FHBacktestAncilliaryFunctions._basinhopping_weights(port_signal, np.nan_to_num(w0.values),
+                                                                              eq_cons, bounds.values, seed)
+                    if not res['lowest_optimization_result']['success']:
+                        raise ArithmeticError('Optimization convergence failed for volatility target weighting scheme')
+                    w, solver, iterations = res.x, 'basinhopping', res['nit']
+
+            weights = pd.Series(index=signals.index, data = np.nan_to_num(w))
+            weights.attrs.update(solver=solver, iterations=iterations, warm_start=warm)
+
+        elif scheme == 'ERC':
+            # Equal Risk Contribution Portfolio
+
+            # minimize the distance to the equal risk portfolio
             n = cov.shape[0]
             target_risk_contribution = np.ones(n) / n
-            dist_to_target = lambda x: np.linalg.norm(x * (x @ cov / (vol_target ** 2)) - target_risk_contribution)
-            port_vol = lambda x: np.sqrt(x.dot(cov).dot(x))
+            dist_to_target = lambda x: np.linalg.norm(x * (x @ values / (vol_target ** 2)) - target_risk_contribution)
+
+            # subject to the portfolio volatility being equal to vol_target
+            port_vol = lambda x: np.sqrt(x @ values @ x)
             eq_cons = {'type': 'eq', 'fun': lambda x: port_vol(x) - vol_target}
-            bounds = opt.Bounds(0, np.inf)
-            res = opt.basinhopping(dist_to_target, target_risk_contribution,
-                                   minimizer_kwargs={'method': 'SLSQP', 'constraints': eq_cons, 'bounds': bounds},
-                                   T=1.0,
-                                   niter=500,
-                                   stepsize=0.5,
-                                   interval=50,
-                                   disp=False,
-                                   niter_success=100)
-            if not res['lowest_optimization_result']['success']:
-                raise ArithmeticError('Optimization convergence failed for static ERC weighting scheme')
-            static_weights = pd.Series(data=res.x, index=cov.columns)
 
-        # Hierarchical Risk Parity
-        elif weighting_scheme == 'HRP':
-            # Idea is from López de Prado (2016) in the Journal of Portfolio Management
-            # Code is from the book Advances in Lopez de Prado(2018), Financial Machine Learning, John Wiley & Sons
-            vols = np.sqrt(np.diag(cov))
-            corr = cov.div(vols, axis=0).div(vols, axis=1)
-            dist = np.sqrt(np.round(((1 - corr) / 2),10))
-            link = sch.linkage(dist)
-
-            # quasi diagonal
-            link = link.astype(int)
-            sort_ix = pd.Series([link[-1, 0], link[-1, 1]])
-            num_items = link[-1, 3]
-
-            while sort_ix.max() >= num_items:
-                sort_ix.index = range(0, sort_ix.shape[0] * 2, 2)  # make space
-                df0 = sort_ix[sort_ix >= num_items]  # find clusters
-                i = df0.index
-                j = df0.values - num_items
-                sort_ix[i] = link[j, 0]  # item 1
-                df0 = pd.Series(link[j, 1], index=i + 1)
-                sort_ix = sort_ix.append(df0)  # item 2
-                sort_ix = sort_ix.sort_index()  # re-sort
-                sort_ix.index = range(sort_ix.shape[0])  # re-index
-
-            sort_ix = corr.index[sort_ix.tolist()].tolist()
-            static_weights = pd.Series(1, index=sort_ix)
-            c_items = [sort_ix]  # initialize all items in one cluster
-
-            while len(c_items) > 0:
-                # bi-section
-                c_items = [i[j:k] for i in c_items for j, k in ((0, len(i) // 2), (len(i) // 2, len(i))) if
-                           len(i) > 1]
-
-                for i in range(0, len(c_items), 2):  # parse in pairs
-                    c_items0 = c_items[i]  # cluster 1
-                    c_items1 = c_items[i + 1]  # cluster 2
-
-                    # get cluster var for 0
-                    cov_ = cov.loc[c_items0, c_items0]  # matrix slice
-                    ivp = 1 / np.diag(cov_)
-                    ivp /= ivp.sum()
-                    w_ = ivp.reshape(-1, 1)
-                    c_var0 = np.dot(np.dot(w_.T, cov_), w_)[0, 0]
-
-                    # get cluster var for 1
-                    cov_ = cov.loc[c_items1, c_items1]  # matrix slice
-                    ivp = 1 / np.diag(cov_)
-                    ivp /= ivp.sum()
-                    w_ = ivp.reshape(-1, 1)
-                    c_var1 = np.dot(np.dot(w_.T, cov_), w_)[0, 0]
-
-                    alpha = 1 - c_var0 / (c_var0 + c_var1)
-                    static_weights[c_items0] *= alpha  # weight 1
-                    static_weights[c_items1] *= 1 - alpha  # weight 2
+            # initialize optimization with rank-based portfolio
+            ranks = signals.rank()
+            w0 = ranks - ranks.mean()
+            w0 = w0 / (np.nansum(np.abs(w0)) / 2)
+
+            # bounds are set in order to be long/short what the rank based portfolio tells us to be long/short
+            # the maximum weight in absolute value is the maximum weight in the rank-based portfolio
+            bounds = pd.DataFrame(index=signals.index, columns=['lower', 'upper'])
+            bounds['lower'] = np.array([np.sign(w0) * max(np.abs(w0)), np.zeros(w0.shape)]).min(axis=0)
+            bounds['upper'] = np.array([np.sign(w0) * max(np.abs(w0)), np.zeros(w0.shape)]).max(axis=0)
+
+            # with the signs given by the bounds, equal risk contributions of the assets that can be held are the
+            # closest to the target. Risk parity on the covariance of the signed weights gives these directly
+            signs = np.nan_to_num(np.sign(w0.values))
+            held = np.flatnonzero(signs)
+            if isinstance(values, FHFactorCovariance):
+                signed_cov = values.take(held, signs[held])
+            else:
+                signed_cov = values[np.ix_(held, held)] * np.outer(signs[held], signs[held])
+            # previous weights are a valid starting point only if all the assets held now were held with the same sign
+            y0 = None if initial_weights is None else signs[held] * np.asarray(initial_weights, dtype=float)[held]
+            y0 = y0 if y0 is not None and (y0 > 0).all() else None
+            y, converged, iterations, warm = FHBacktestAncilliaryFunctions._warm_or_cold_start(
+                FHBacktestAncilliaryFunctions.risk_parity_weights, y0, signed_cov)
+            w = np.zeros(n)
+            w[held] = signs[held] * y * vol_target
+            solver = 'newton'
+            lower, upper = np.nan_to_num(bounds['lower'].values), np.nan_to_num(bounds['upper'].values)
+            if not converged or (w < lower - 1e-12).any() or (w > upper + 1e-12).any():
+                # with binding bounds equal risk contributions are not attainable, so the risk contributions of the
+                # capped assets are kept below the others (constrained risk budgeting), starting from the risk parity
+                # weights
+                caps = np.where(signs[held] > 0, upper[held], -lower[held])
+                y, converged, bounded_iterations = FHBacktestAncilliaryFunctions.bounded_risk_parity_weights(
+                    signed_cov, vol_target, caps, w0=y * vol_target if converged else None)
+                w = np.zeros(n)
+                w[held] = signs[held] * y
+                solver, iterations = 'bounded_newton', iterations + bounded_iterations
+                if not converged:
+                    res = FHBacktestAncilliaryFunctions._basinhopping_weights(dist_to_target, target_risk_contribution,
+                                                                              eq_cons, bounds.values, seed)
+                    if not res['lowest_optimization_result']['success']:
+                        raise ArithmeticError('Optimization convergence failed for ERC weighting scheme')
+                    w, solver, iterations, warm = res.x, 'basinhopping', res['nit'], False
+            weights = pd.Series(index=signals.index, data=np.nan_to_num(w))
+            weights.attrs.update(solver=solver, iterations=iterations, warm_start=warm)
+
+        elif scheme == 'IVP':
+            # Inverse Volatility Portfolio
+            ranks = signals.rank()
+            weights = ranks - ranks.mean()
+            vols = pd.Series(index=cov.index, data=np.sqrt(FHBacktestAncilliaryFunctions._variances(values)))
+            weights = np.sign(weights) / vols
+            weights = weights / (np.nansum(np.abs(weights)) / 2)
+
+        elif scheme == 'EW':
+            # Equal Weights
+            ranks = signals.rank()
+            weights = ranks - ranks.mean()
+            weights = np.sign(weights) / signals.shape[0]
+            weights = weights / (np.nansum(np.abs(weights)) / 2)
+
+        else:
+            # Signal Rank Based Portfolio
+            if weighting_scheme.lower().find('rank')== -1:
+                print('Unclear weighting scheme, assuming signal-rank based weights')
+            ranks = signals.rank()
+            weights = ranks - ranks.mean()
+            weights = weights / (np.nansum(np.abs(weights)) / 2)
+
+        return weights.astype(float)
+
+    @staticmethod
+    def panel_weights_from_signals(signals, weighting_scheme='rank', vols=None):
+        """
+        The long-short weights of cross_sectional_weights_from_signals on many dates at once, for the weighting
+        schemes that do not need an optimizer: 'zscores', 'winsorized', 'IVP', 'EW' and 'rank'. These are row-wise
+        calculations on the (dates x assets) array of signals, with the missing signals of each date masked out,
+        so they are done for all the dates together instead of once per date
+
+        Parameters
+        ----------
+
+        signals : a Pandas DataFrame with the signals, one row per date and one column per asset
+
+        weighting_scheme : a string with the weighting scheme, as in cross_sectional_weights_from_signals.
+                           'vol_target' and 'ERC' are not row-wise and raise a ValueError
+
+        vols : a Pandas DataFrame with the volatility of each asset on each date, with the same index as signals,
+               used by the 'IVP' weighting scheme. Its columns are aligned with the columns of signals by name
+
+        Returns
+        -------
+        a Pandas DataFrame with the weights, with the same index and columns as signals. Each row is the same as the
+        weights of cross_sectional_weights_from_signals for the signals on that date, up to rounding errors
+        """
+
+        assert isinstance(signals, pd.DataFrame), "input 'signals' must be a pandas DataFrame"
+        scheme = FHBacktestAncilliaryFunctions._signal_scheme(weighting_scheme)
+        if scheme in ['vol_target', 'ERC']:
+            raise ValueError('the %s weighting scheme needs an optimizer on each date, see '
+                             'cross_sectional_weights_from_signals' % weighting_scheme)
+
+        x = signals.to_numpy(dtype=float)
+        valid = ~np.isnan(x)
+        counts = valid.sum(axis=1, keepdims=True)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if scheme in ['zscores', 'winsorized']:
+                # z-scores (population standard deviation) of the signals available on each date. As in
+                # scipy.stats.zscore, they are all missing if the signals on a date are constant
+                means = np.where(valid, x, 0).sum(axis=1, keepdims=True) / counts
+                stds = np.sqrt(np.where(valid, (x - means) ** 2, 0).sum(axis=1, keepdims=True) / counts)
+                first = x[np.arange(len(x)), valid.argmax(axis=1)][:, None]
+                constant = (np.where(valid, x, first) == first).all(axis=1, keepdims=True)
+                scores = np.where(constant, np.nan, (x - means) / stds)
+                if scheme == 'winsorized':
+                    # scipy.stats.mstats.winsorize with limits of 10% sets the int(0.1 * n) lowest and highest of
+                    # the n scores to the next ones in order. Missing scores are sorted last
+                    ordered = np.sort(scores, axis=1)
+                    cut = (0.1 * counts[:, 0]).astype(int)
+                    rows = np.arange(len(x))
+                    low = ordered[rows, np.minimum(cut, x.shape[1] - 1)]
+                    high = ordered[rows, np.maximum(counts[:, 0] - cut - 1, 0)]
+                    scores = np.clip(scores, low[:, None], high[:, None])
+                weights = np.where(valid, scores, 0)
+            else:
+                ranks = signals.rank(axis=1).to_numpy(dtype=float)
+                centered = ranks - np.where(valid, ranks, 0).sum(axis=1, keepdims=True) / counts
+                if scheme == 'IVP':
+                    assert isinstance(vols, pd.DataFrame), "input 'vols' must be a pandas DataFrame for 'IVP'"
+                    vols = vols.reindex(index=signals.index, columns=signals.columns).to_numpy(dtype=float)
+                    weights = np.sign(centered) / vols
+                elif scheme == 'EW':
+                    weights = np.sign(centered) / x.shape[1]
+                else:
+                    if weighting_scheme.lower().find('rank') == -1:
+                        print('Unclear weighting scheme, assuming signal-rank based weights')
+                    weights = centered
+            weights = weights / (np.nansum(np.abs(weights), axis=1, keepdims=True) / 2)
+
+        return pd.DataFrame(index=signals.index, columns=signals.columns, data=weights)
+
+    @staticmethod
+    def min_variance_weights(cov, max_iter=None, w0=None):
+        """
+        Long-only minimum variance weights adding up to one, solving the quadratic program
+
+            min w'.cov.w  subject to  sum(w) = 1 and w >= 0
+
+        with a primal active-set method. It starts from equal weights, or from w0, and, at each iteration, solves the
+        equality constrained problem on the free weights, either moving towards its solution until a weight hits zero
+        or, if it is already feasible, freeing the fixed weight with the most negative Lagrange multiplier.
+        Starting from the solution of a nearby problem, the zero weights of w0 are fixed from the start and only
+        a few assets enter or leave the free set.
+
+        The method needs a positive definite covariance matrix, for which each iteration decreases the variance.
+        Covariance matrices estimated with series starting at different dates may have negative eigenvalues, so the
+        eigenvalues of a matrix that is not positive definite are floored at 1e-8 times the largest one, which gives
+        the closest matrix (in Frobenius norm) with eigenvalues above that floor. The method stops, without
+        convergence, if the variance increases.
+
+        Parameters
+        ----------
+        cov : a square array, DataFrame or FHFactorCovariance with the covariance matrix
+        max_iter : maximum number of iterations (default is 10 times the number of assets)
+        w0 : an array with the starting weights. Negative weights are set to zero and the weights are rescaled to add
+             up to one (default is None, for equal weights)
+
+        Returns
+        -------
+        a tuple with an array of weights, a Boolean that is True if the method converged and the number of iterations
+        """
+
+        cov = FHBacktestAncilliaryFunctions._covariance_values(cov)
+        n = cov.shape[0]
+        max_iter = 10 * n if max_iter is None else max_iter
+        if not isinstance(cov, FHFactorCovariance) and n > 0 and np.isfinite(cov).all():
+            try:
+                np.linalg.cholesky(cov)
+            except np.linalg.LinAlgError:
+                eigenvalues, eigenvectors = np.linalg.eigh(cov)
+                eigenvalues = np.maximum(eigenvalues, 1e-8 * max(eigenvalues.max(), 0))
+                cov = (eigenvectors * eigenvalues) @ eigenvectors.T
+        w = np.ones(n) / n
+        if w0 is not None:
+            w0 = np.clip(np.nan_to_num(np.asarray(w0, dtype=float)), 0, None)
+            if w0.sum() > 0:
+                w = w0 / w0.sum()
+        free = w > 0
+        variance = w @ cov @ w
+
+        for iteration in range(1, max_iter + 1):
+            # minimum variance weights using only the free assets
+            f = np.flatnonzero(free)
+            try:
+                z = FHBacktestAncilliaryFunctions._solve(cov, np.ones(len(f)), f)
+            except np.linalg.LinAlgError:
+                return w, False, iteration
+            if not np.isfinite(z).all() or z.sum() <= 0:
+                return w, False, iteration
+            x = np.zeros(n)
+            x[f] = z / z.sum()
+
+            if (x[f] < 0).any():
+                # move towards x until the first free weight hits zero, which is then fixed at zero
+                d = x - w
+                blocking = np.flatnonzero(free & (d < 0))
+                ratios = w[blocking] / -d[blocking]
+                k = blocking[np.argmin(ratios)]
+                w = np.maximum(w + min(ratios.min(), 1) * d, 0)
+                w[k] = 0
+                free[k] = False
+                w_variance = w @ cov @ w
+                if w_variance > variance + 1e-12 * abs(variance):
+                    return w, False, iteration
+                variance = w_variance
+            else:
+                # optimality requires that the fixed weights have non-negative Lagrange multipliers
+                w = x
+                gradient = cov @ w
+                multipliers = np.where(free, np.inf, gradient - w @ gradient)
+                k = np.argmin(multipliers)
+                if multipliers[k] >= -1e-12 * abs(w @ gradient):
+                    return w, True, iteration
+                free[k] = True
+                variance = w @ gradient
+
+        return w, False, max_iter
+
+    @staticmethod
+    def risk_parity_weights(cov, budgets=None, tol=1e-10, max_iter=10000, w0=None):
+        """
+        Long-only risk parity weights y, such that the risk contribution y_i * (cov.y)_i of each asset is equal to its
+        risk budget, by Newton's method on the convex problem
+
+            min 1/2 y'.cov.y - sum(budgets * log(y))
+
+        with a backtracking line search that keeps the weights positive. The solution has y'.cov.y = sum(budgets), so
+        it can be rescaled to any volatility target. For a FHFactorCovariance the Hessian cov + diag(budgets / y^2)
+        has the same factor structure, so each step takes O(n K^2) operations, and for other matrices each step
+        solves a dense linear system, O(n^3). Newton's method takes a few tens of steps even when the covariance
+        matrix is ill-conditioned, as for the signed covariance of hedged long-short portfolios, where cyclical
+        coordinate descent takes thousands of cycles over the assets.
+
+        Parameters
+        ----------
+        cov : a square array, DataFrame or FHFactorCovariance with the covariance matrix
+        budgets : an array with the risk budgets of each asset (default is 1/n for all assets)
+        tol : tolerance on the largest absolute difference between risk contributions and budgets
+        max_iter : maximum number of Newton steps
+        w0 : an array with positive starting weights, which are rescaled to the total budget (default is None, for
+             inverse volatility weights)
+
+        Returns
+        -------
+        a tuple with an array of weights, a Boolean that is True if the method converged and the number of steps
+        """
+
+        cov = FHBacktestAncilliaryFunctions._covariance_values(cov)
+        factor = isinstance(cov, FHFactorCovariance)
+        n = cov.shape[0]
+        budgets = np.ones(n) / n if budgets is None else np.asarray(budgets, dtype=float)
+        variances = FHBacktestAncilliaryFunctions._variances(cov).copy()
+        finite = np.isfinite(cov.loadings).all() and np.isfinite(cov.idiosyncratic).all() if factor \
+            else np.isfinite(cov).all()
+        if n == 0 or not finite or (variances <= 0).any():
+            return np.full(n, np.nan), False, 0
+
+        # start from inverse volatility weights, or from w0, scaled to the total budget
+        y = 1 / np.sqrt(variances)
+        if w0 is not None:
+            w0 = np.asarray(w0, dtype=float)
+            if np.isfinite(w0).all() and (w0 > 0).all():
+                y = w0.copy()
+        y = y * np.sqrt(budgets.sum() / (y @ cov @ y))
+        cov_y = cov @ y
+
+        def objective(y):
+            return 0.5 * (y @ cov @ y) - budgets @ np.log(y)
+
+        for iteration in range(1, max_iter + 1):
+            gradient = cov_y - budgets / y
+            if factor:
+                step = FHFactorCovariance(cov.loadings, cov.idiosyncratic + budgets / (y * y)).solve(gradient)
+            else:
+                hessian = cov.copy()
+                hessian[np.diag_indices_from(hessian)] += budgets / (y * y)
+                step = np.linalg.solve(hessian, gradient)
+            # the largest step up to the Newton step that keeps the weights positive, halved until the objective
+            # decreases enough
+            decreasing = step > 0
+            t = min(1., 0.99 * (y[decreasing] / step[decreasing]).min(initial=np.inf))
+            f0, slope = objective(y), gradient @ step
+            for _ in range(60):
+                if objective(y - t * step) <= f0 - 1e-4 * t * slope:
+                    break
+                t = t / 2
+            previous, y = y, y - t * step
+            cov_y = cov @ y
+            converged = np.abs(y * cov_y - budgets).max() <= tol
+            if converged or (y == previous).all():
+                return y, converged, iteration
+
+        return y, False, max_iter
+
+    @staticmethod
+    def bounded_risk_parity_weights(cov, vol_target, caps, budgets=None, tol=1e-8, max_iter=10000, w0=None):
+        """
+        Long-only risk budgeting weights within caps, for a given portfolio volatility (constrained risk budgeting)
+
+            y(l) = argmin 1/2 y'.cov.y - l * sum(budgets * log(y))  subject to  y <= caps
+
+        for the multiplier l at which the volatility of y(l) is equal to vol_target. Weights below their caps have risk
+        contributions y_i * (cov.y)_i equal to l * budgets_i and capped weights have smaller ones, so without binding
+        caps these are the risk parity weights of risk_parity_weights. The volatility of y(l) increases with l, up to
+        the volatility of the capped weights, and l is found by Brent's method.
+
+        If the volatility target is above the volatility of the capped weights, as for hedged long-short portfolios,
+        some assets are dropped (their weights set to zero). Starting from the capped weights, and if needed from the
+        capped weights on either side of the leading eigenvector of cov (found by power iteration), the weight that
+        increases the variance the most is moved between zero and its cap until the target is attainable, then the
+        dropped assets that keep it attainable are added back one at a time. The vertex with the most assets held is
+        kept.
+
+        For each l the problem is convex and is solved by a projected Newton method: capped weights (or weights close
+        to their caps) with a negative gradient are fixed at their caps and the others take a Newton step, with a
+        backtracking line search that keeps them positive and within the caps. For a FHFactorCovariance the Hessian
+        of the free weights has the factor structure, so each step takes O(n K^2) operations and the whole method
+        O(n K^2) times the number of steps, typically a few tens, as Brent's method starts each solve from the
+        previous weights. For other matrices each step solves a dense linear system, O(n^3). Moving a weight between
+        zero and its cap updates cov.y with one column of the covariance matrix, O(n K) (O(n)) operations.
+
+        Parameters
+        ----------
+        cov : a square array, DataFrame or FHFactorCovariance with the covariance matrix
+        vol_target : the portfolio volatility
+        caps : an array with the largest weight of each asset (positive)
+        budgets : an array with the risk budgets of each asset (default is 1/n for all assets)
+        tol : tolerance on the largest absolute difference between risk contributions and l * budgets, relative to
+              the largest of these, for the weights below their caps
+        max_iter : maximum number of Newton steps, in total
+        w0 : an array with positive starting weights, clipped to the caps, typically the risk parity weights
+             (default is None, starting from the caps)
+
+        Returns
+        -------
+        a tuple with an array of weights, a Boolean that is True if the method converged and the total number of
+        Newton steps
+        """
+
+        cov = FHBacktestAncilliaryFunctions._covariance_values(cov)
+        factor = isinstance(cov, FHFactorCovariance)
+        caps = np.asarray(caps, dtype=float)
+        n = cov.shape[0]
+        budgets = np.ones(n) / n if budgets is None else np.asarray(budgets, dtype=float)
+        variances = FHBacktestAncilliaryFunctions._variances(cov).copy()
+        finite = np.isfinite(cov.loadings).all() and np.isfinite(cov.idiosyncratic).all() if factor \
+            else np.isfinite(cov).all()
+        if n == 0 or not finite or (variances <= 0).any() or not (caps > 0).all():
+            return np.zeros(n), False, 0
+
+        def vertex(y):
+            # moves the weight with the largest increase in the variance between zero and its cap until the variance
+            # reaches the target, then adds back the dropped assets that keep it there, the least costly first
+            cov_y = cov @ y
+            variance = y @ cov_y
+            for _ in range(n):
+                if variance >= vol_target ** 2:
+                    break
+                steps = np.where(y > 0, -caps, caps)
+                gains = 2 * steps * cov_y + steps * steps * variances
+                i = np.argmax(gains)
+                if not gains[i] > 0:
+                    return None
+                cov_y += FHBacktestAncilliaryFunctions._column(cov, i) * steps[i]
+                y[i] += steps[i]
+                variance += gains[i]
+            if variance < vol_target ** 2:
+                return None
+            for _ in range(n):
+                gains = np.where(y > 0, -np.inf, 2 * caps * cov_y + caps * caps * variances)
+                i = np.argmax(gains)
+                if not variance + gains[i] >= vol_target ** 2:
+                    break
+                cov_y += FHBacktestAncilliaryFunctions._column(cov, i) * caps[i]
+                y[i] = caps[i]
+                variance += gains[i]
+            return y
+
+        y = vertex(caps.copy())
+        if y is None or (y == 0).any():
+            # the leading eigenvector of cov splits hedged portfolios into their two sides
+            v = FHBacktestAncilliaryFunctions._column(cov, np.argmax(variances))
+            for _ in range(100):
+                v = cov @ v
+                v = v / np.abs(v).max()
+            for side in [v > 0, v < 0]:
+                candidate = vertex(np.where(side, caps, 0))
+                if candidate is not None and (y is None or (candidate > 0).sum() > (y > 0).sum()):
+                    y = candidate
+        if y is None:
+            return caps.copy(), False, 0
+        held = np.flatnonzero(y > 0)
+        if len(held) < n:
+            cov = cov.take(held) if factor else cov[np.ix_(held, held)]
+            caps, budgets = caps[held], budgets[held]
+            w0 = None if w0 is None else np.asarray(w0, dtype=float)[held]
+
+        # solve from w0, clipped to the caps, or from the caps
+        y = caps.copy()
+        if w0 is not None and np.isfinite(w0).all() and (w0 > 0).all():
+            y = np.minimum(w0, caps)
+        state = {'y': y, 'iterations': 0, 'converged': True}
+
+        def objective(y, l):
+            return 0.5 * (y @ cov @ y) - l * (budgets @ np.log(y))
+
+        def solve(l):
+            y = state['y'].copy()
+            cov_y = cov @ y
+            while state['iterations'] < max_iter:
+                # risk contributions of the weights below their caps, and excess contributions of the capped ones
+                residuals = y * cov_y - l * budgets
+                residuals = np.where(y < caps, np.abs(residuals), np.maximum(residuals, 0))
+                if residuals.max() <= tol * l * budgets.max():
+                    break
+                state['iterations'] += 1
+                gradient = cov_y - l * budgets / y
+                barrier = l * budgets / (y * y)
+                # weights closer to their caps than a step on the diagonal of the Hessian and with a negative gradient
+                # move to their caps by that step and the others take the Newton step, so that projecting on the caps
+                # does not stall the iterations
+                diagonal_step = gradient / barrier
+                closeness = np.abs(np.minimum(y - diagonal_step, caps) - y).max()
+                free = (y < caps - np.minimum(closeness, 0.01 * caps)) | (gradient > 0)
+                step = np.where(free, 0, diagonal_step)
+                f = np.flatnonzero(free)
+                if len(f) > 0:
+                    if factor:
+                        step[f] = FHFactorCovariance(cov.loadings[f], cov.idiosyncratic[f] + barrier[f]).solve(
+                            gradient[f])
+                    else:
+                        hessian = cov[np.ix_(f, f)]
+                        hessian[np.diag_indices_from(hessian)] += barrier[f]
+                        step[f] = np.linalg.solve(hessian, gradient[f])
+                # the largest step up to the Newton step that keeps the weights positive, projected on the caps and
+                # halved until the objective decreases enough
+                decreasing = step > 0
+                t = min(1., 0.99 * (y[decreasing] / step[decreasing]).min(initial=np.inf))
+                f0 = objective(y, l)
+                for _ in range(60):
+                    y_t = np.minimum(y - t * step, caps)
+                    if objective(y_t, l) <= f0 - 1e-4 * gradient @ (y - y_t):
+                        break
+                    t = t / 2
+                previous, y = y, y_t
+                cov_y = cov @ y
+                if (y == previous).all():
+                    break  # the residuals are down to rounding errors
+            else:
+                state['converged'] = False
+            state['y'] = y
+            return np.sqrt(y @ cov_y) - vol_target
+
+        # the volatility of y(l) is at most sqrt(l * sum(budgets)), and all the weights are capped for l above the
+        # largest caps_i * (cov.caps)_i / budgets_i
+        l_low = vol_target ** 2 / budgets.sum()
+        l_high = max(l_low, (caps * (cov @ caps) / budgets).max())
+        try:
+            if solve(l_low) < 0 and solve(l_high) > 0:
+                l = opt.brentq(solve, l_low, l_high, xtol=1e-15 * l_high, rtol=4 * np.finfo(float).eps)
+                solve(l)
+        except (ValueError, RuntimeError):
+            state['converged'] = False
+
+        y = np.zeros(n)
+        y[held] = state['y']
+        converged = state['converged'] and abs(np.sqrt(y[held] @ cov @ y[held]) - vol_target) <= 1e-8 * vol_target
+        return y, bool(converged), state['iterations']
+
+    @staticmethod
+    def hrp_weights(cov, corr=None, method='single', metric='euclidean'):
+        """
+        Hierarchical Risk Parity weights from López de Prado (2016) in the Journal of Portfolio Management.
+        Assets are clustered on the distances between their correlation-distance vectors and put in the order of
+        the leaves of the dendrogram (quasi-diagonalization). The weights are then split recursively between the two
+        halves of each cluster in inverse proportion to their variance, using inverse-variance weights within each
+        half. Clusters are integer ranges of the quasi-diagonal order, so each step only slices arrays.
+        The distances between assets are pairwise, so a FHFactorCovariance is only made dense for the correlation
+        matrix, when corr is not given, while the variances of the clusters use its factor structure
+
+        Parameters
+        ----------
+        cov : a (n x n) DataFrame, array or FHFactorCovariance with the covariance matrix
+        corr : the (n x n) correlation matrix used to cluster the assets. Default is None, the correlation matrix of cov
+        method : any method available in scipy.cluster.hierarchy.linkage
+        metric : any metric available in scipy.cluster.hierarchy.linkage
+
+        Returns
+        -------
+        a tuple (w, link, order) with the (n,) float array of weights in the order of cov, the linkage matrix and the
+        integer array with the quasi-diagonal order of the assets
+        """
+
+        cov = FHBacktestAncilliaryFunctions._covariance_values(cov)
+        factor = isinstance(cov, FHFactorCovariance)
+        n = cov.shape[0]
+        if corr is None:
+            vols = np.sqrt(FHBacktestAncilliaryFunctions._variances(cov))
+            corr = (cov.to_numpy() if factor else cov) / vols[:, None] / vols[None, :]
+        dist = np.sqrt(np.round((1 - np.asarray(corr, dtype=float)) / 2, 10))
+
+        # tree clustering. Euclidean distances between the rows of dist come from a single symmetric matrix
+        # product, of which only the upper triangle is calculated and used
+        if n < 2:
+            link, order = np.zeros((0, 4)), np.arange(n)
+        else:
+            if metric == 'euclidean':
+                squares = np.einsum('ij,ij->i', dist, dist)
+                products = dsyrk(1., dist.T, trans=1)
+                pairwise = np.sqrt(np.maximum(squares[:, None] + squares[None, :] - 2 * products, 0))
+                link = sch.linkage(squareform(pairwise, checks=False), method)
+            else:
+                link = sch.linkage(dist, method, metric)
+            order = sch.leaves_list(link)
+
+        # recursive bisection over ranges [start, end) of the quasi-diagonal order
+        cov = cov.take(order) if factor else cov[np.ix_(order, order)]
+        inv_var = 1 / FHBacktestAncilliaryFunctions._variances(cov)
+
+        def cluster_var(start, end):
+            ivp = inv_var[start:end] / inv_var[start:end].sum()
+            return ivp @ (cov.take(slice(start, end)) if factor else cov[start:end, start:end]) @ ivp
+
+        w = np.ones(n)
+        clusters = [(0, n)]
+        while len(clusters) > 0:
+            # bi-section
+            halves = []
+            for start, end in clusters:
+                if end - start > 1:
+                    middle = start + (end - start) // 2
+                    var0, var1 = cluster_var(start, middle), cluster_var(middle, end)
+                    alpha = 1 - var0 / (var0 + var1)
+                    w[start:middle] *= alpha
+                    w[middle:end] *= 1 - alpha
+                    halves += [(start, middle), (middle, end)]
+            clusters = halves
+
+        weights = np.empty(n)
+        weights[order] = w
+        return weights, link, order
+
+    @staticmethod
+    def max_signal_weights(signals, cov, vol_target, lower, upper, max_iter=None, w0=None):
+        """
+        Long-short weights maximizing the portfolio signal for a given portfolio volatility, solving
+
+            max signals'.w  subject to  w'.cov.w = vol_target ** 2 and lower <= w <= upper
+
+        From the Lagrangian, the solution is w(t) = argmin 1/2 w'.cov.w - t * signals'.w within the bounds, for the
+        multiplier t > 0 at which the volatility of w(t) is equal to vol_target. Without binding bounds this is
+        closed-form, w = t * inv(cov).signals. Otherwise, with the set of weights at their bounds fixed, the other
+        weights are affine in t and the volatility target is a quadratic equation on t. Starting from the weights at
+        the bounds of w0 (or of the clipped closed-form solution), t is found from this equation and the set is updated
+        by an active-set method on the bound constrained quadratic program (see _box_qp) at that t, until it does not
+        change. If this does not settle, t is found by Brent's method, as the volatility of w(t) increases with t.
+
+        Parameters
+        ----------
+        signals : an array with the signals
+        cov : a square array, DataFrame or FHFactorCovariance with the covariance matrix
+        vol_target : the portfolio volatility
+        lower, upper : arrays with the bounds of each weight (lower <= 0 <= upper)
+        max_iter : maximum number of active-set iterations of each quadratic program (default is 10 times the number
+                   of assets)
+        w0 : an array with the starting weights of the first quadratic program, clipped to the bounds. Its weights at
+             the bounds set the initial active set (default is None, starting from the closed-form solution)
+
+        Returns
+        -------
+        a tuple with an array of weights, a Boolean that is True if the method converged and the number of active-set
+        iterations
+        """
+
+        signals = np.asarray(signals, dtype=float)
+        cov = FHBacktestAncilliaryFunctions._covariance_values(cov)
+        lower = np.asarray(lower, dtype=float)
+        upper = np.asarray(upper, dtype=float)
+        n = cov.shape[0]
+        max_iter = 10 * n if max_iter is None else max_iter
+
+        # closed-form solution, in case no bound is binding
+        try:
+            a = FHBacktestAncilliaryFunctions._solve(cov, signals)
+        except np.linalg.LinAlgError:
+            return np.zeros(n), False, 0
+        if not signals @ a > 0:
+            return np.zeros(n), False, 0
+        t0 = vol_target / np.sqrt(signals @ a)
+        w = t0 * a
+        if ((w >= lower) & (w <= upper)).all():
+            return w, True, 1
+
+        iterations = [0]
+        if w0 is not None and np.isfinite(w0).all():
+            w = np.asarray(w0, dtype=float)
+        w = np.clip(w, lower, upper)
+
+        for _ in range(10):
+            at_bound = (w <= lower) | (w >= upper)
+            f = np.flatnonzero(~at_bound)
+            b = np.flatnonzero(at_bound)
+            if len(f) == 0:
+                break
+            # weights are u * t + v with the weights at the bounds fixed
+            u = np.zeros(n)
+            v = np.where(at_bound, w, 0)
+            try:
+                u[f] = FHBacktestAncilliaryFunctions._solve(cov, signals[f], f)
+                v[f] = - FHBacktestAncilliaryFunctions._solve(
+                    cov, FHBacktestAncilliaryFunctions._block_dot(cov, f, b, w[b]), f)
+            except np.linalg.LinAlgError:
+                break
+            a2, a1, a0 = u @ cov @ u, 2 * u @ cov @ v, v @ cov @ v - vol_target ** 2
+            if not (a2 > 0 and a1 * a1 - 4 * a2 * a0 >= 0):
+                break
+            t = (-a1 + np.sqrt(a1 * a1 - 4 * a2 * a0)) / (2 * a2)
+            if not t > 0:
+                break
+            w_t, converged, it = FHBacktestAncilliaryFunctions._box_qp(cov, t * signals, lower, upper, u * t + v,
+                                                                       max_iter)
+            iterations[0] += it
+            if not converged:
+                break
+            w = w_t
+            if (((w <= lower) | (w >= upper)) == at_bound).all():
+                if abs(np.sqrt(w @ cov @ w) - vol_target) <= 1e-8 * vol_target:
+                    return w, True, iterations[0]
+                break
+
+        state = {'w': w}
+
+        def excess_vol(t):
+            w, converged, it = FHBacktestAncilliaryFunctions._box_qp(cov, t * signals, lower, upper, state['w'], max_iter)
+            iterations[0] += it
+            if not converged:
+                raise ArithmeticError('bound constrained quadratic program did not converge')
+            state['w'] = w
+            return np.sqrt(w @ cov @ w) - vol_target
+
+        # bracket the multiplier. Volatility is zero at t = 0 and is capped by the bounds for large t
+        t_high = t0
+        try:
+            for _ in range(60):
+                if excess_vol(t_high) >= 0:
+                    break
+                t_high = 2 * t_high
+            else:
+                return state['w'], False, iterations[0]
+            t = opt.brentq(excess_vol, 0, t_high, xtol=1e-15 * t_high, rtol=4 * np.finfo(float).eps)
+            excess_vol(t)
+        except (ArithmeticError, ValueError, RuntimeError):
+            return state['w'], False, iterations[0]
+
+        w = state['w']
+        return w, bool(abs(np.sqrt(w @ cov @ w) - vol_target) <= 1e-8 * vol_target), iterations[0]
+
+    @staticmethod
+    def _box_qp(cov, q, lower, upper, w0, max_iter):
+        """
+        Primal active-set method for the bound constrained quadratic program
+
+            min 1/2 w'.cov.w - q'.w  subject to  lower <= w <= upper
+
+        starting from the feasible point w0. Returns the weights, a convergence flag and the number of iterations
+        """
+
+        n = cov.shape[0]
+        w = np.clip(w0, lower, upper)
+        fixed = lower == upper
+        at_bound = fixed | (w <= lower) | (w >= upper)
+
+        for iteration in range(1, max_iter + 1):
+            f = np.flatnonzero(~at_bound)
+            b = np.flatnonzero(at_bound)
+            x = w.copy()
+            if len(f) > 0:
+                try:
+                    x[f] = FHBacktestAncilliaryFunctions._solve(
+                        cov, q[f] - FHBacktestAncilliaryFunctions._block_dot(cov, f, b, w[b]), f)
+                except np.linalg.LinAlgError:
+                    return w, False, iteration
+
+            outside = (x < lower) | (x > upper)
+            if outside.any():
+                # move towards x until the first free weight hits a bound, which is then fixed at the bound
+                d = x - w
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    ratios = np.where(d < 0, (lower - w) / d, np.where(d > 0, (upper - w) / d, np.inf))
+                ratios[at_bound] = np.inf
+                k = np.argmin(ratios)
+                w = np.clip(w + min(ratios[k], 1) * d, lower, upper)
+                w[k] = lower[k] if d[k] < 0 else upper[k]
+                at_bound[k] = True
+            else:
+                # optimality requires the gradient to point out of the bounds on the fixed weights
+                w = x
+                gradient = cov @ w - q
+                wrong_sign = np.where(at_bound & ~fixed, np.where(w >= upper, gradient, -gradient), -np.inf)
+                k = np.argmax(wrong_sign)
+                if wrong_sign[k] <= 1e-12 * max(np.abs(q).max(), 1e-300):
+                    return w, True, iteration
+                at_bound[k] = False
+
+        return w, False, max_iter
+
+    @staticmethod
+    def _covariance_values(cov):
+        """
+        The covariance matrix as used by the solvers: a FHFactorCovariance as it is, other matrices as float arrays
+        """
+        return cov if isinstance(cov, FHFactorCovariance) else np.asarray(cov, dtype=float)
+
+    @staticmethod
+    def _variances(cov):
+        """
+        The diagonal of a covariance matrix given as an array, DataFrame or FHFactorCovariance
+        """
+        return cov.diagonal() if isinstance(cov, FHFactorCovariance) else np.diag(cov)
+
+    @staticmethod
+    def _column(cov, i):
+        """
+        The column i of a covariance matrix given as an array or FHFactorCovariance
+        """
+        if isinstance(cov, FHFactorCovariance):
+            column = cov.loadings @ cov.loadings[i]
+            column[i] += cov.idiosyncratic[i]
+            return column
+        return cov[:, i]
+
+    @staticmethod
+    def _solve(cov, b, block=None):
+        """
+        The solution x of cov[block, block].x = b, for an integer array of positions block (default is None, for the
+        full matrix). For a FHFactorCovariance the block keeps the factor structure and is never made dense
+        """
+        if isinstance(cov, FHFactorCovariance):
+            return (cov if block is None else cov.take(block)).solve(b)
+        return np.linalg.solve(cov if block is None else cov[np.ix_(block, block)], b)
+
+    @staticmethod
+    def _block_dot(cov, rows, columns, x):
+        """
+        cov[rows, columns].x for disjoint integer arrays of positions rows and columns
+        """
+        if isinstance(cov, FHFactorCovariance):
+            return cov.block_dot(rows, columns, x)
+        return cov[np.ix_(rows, columns)] @ x
+
+    @staticmethod
+    def _signal_scheme(weighting_scheme):
+        """
+        The weighting scheme of cross_sectional_weights_from_signals given by the string weighting_scheme: 'zscores',
+        'winsorized', 'vol_target', 'ERC', 'IVP', 'EW' or 'rank'
+        """
+        if weighting_scheme.lower().find('zscores') > -1:
+            return 'zscores'
+        elif weighting_scheme.lower().find('winsorized') > -1:
+            return 'winsorized'
+        elif weighting_scheme.lower().find('vol_target') > -1:
+            return 'vol_target'
+        elif weighting_scheme.find('ERC') > -1:
+            return 'ERC'
+        elif weighting_scheme.find('IVP') > -1:
+            return 'IVP'
+        elif weighting_scheme == 'EW':
+            return 'EW'
+        return 'rank'
+
+    @staticmethod
+    def _warm_or_cold_start(solver, w0, *args):
+        """
+        Runs one of the dedicated solvers starting from w0 and, if it does not converge, from its default starting
+        point. Returns the solver results with the total number of iterations and a Boolean that is True if the
+        warm-started solver converged
+        """
+        iterations = 0
+        if w0 is not None:
+            w, converged, iterations = solver(*args, w0=w0)
+            if converged:
+                return w, converged, iterations, True
+        w, converged, cold_iterations = solver(*args)
+        return w, converged, iterations + cold_iterations, False
+
+    @staticmethod
+    def _basinhopping_weights(objective, x0, constraints, bounds, seed=None):
+        """
+        Global stochastic search used as fallback when the dedicated solvers do not converge.
+        Returns the basinhopping result
+        """
+        return opt.basinhopping(objective, x0,
+                                minimizer_kwargs={'method': 'SLSQP', 'constraints': constraints, 'bounds': bounds},
+                                T=1.0,
+                                niter=500,
+                                stepsize=0.5,
+                                interval=50,
+                                disp=False,
+                                niter_success=100,
+                                seed=seed)
+
+    @staticmethod
+    def simulate_holdings(prices, weights0, rebalance_positions, rebalance_weights,
+                          holdings_costs=None, rebalance_costs=None, days=None, state=None, return_state=False):
+        """
+        This method runs the holdings and pnl recursion of a backtest on NumPy arrays.
+        Holdings only change on rebalancing dates, so the recursion runs over the periods between rebalancing dates
+        and not over single dates, which keeps it fast for long daily histories. See simulate_strategies for many
+        sets of weights over the same prices.
+
+        Parameters
+        ----------
+        prices : a (dates x assets) float array with the prices of the underlyings, NaN where not available
+        weights0 : a (assets,) float array with the weights used on the first date
+        rebalance_positions : an increasing integer array with the positions (>= 1) of the rebalancing dates in prices
+        rebalance_weights : a (rebalancing dates x assets) float array with the weights for each rebalancing date
+        holdings_costs : None, a float or a (assets,) float array with the cost per year of holding 100% notional
+                         of each underlying (as a fraction, not in bps). Requires days
+        rebalance_costs : None, a float or a (assets,) float array with the cost of trading 100% notional of each
+                          underlying (as a fraction, not in bps). Costs of a rebalance are taken out of the next day pnl
+        days : a (dates,) integer array with the number of calendar days since the previous date,
+               used to accrue holdings costs
+        state : None, or the state returned by a previous run to resume it. prices then start on the last date of
+                the previous run, weights0 is not used and the first rebalancing position may be 0, for a rebalance
+                on that date. The results on the first date are only the holdings and traded notional (pnl is NaN)
+        return_state : a Boolean, True to also return the state at the end of the run
+
+        Returns
+        -------
+        a tuple (backtest, pnl, holdings, traded_notional) with the (dates,) float arrays of the indexed cumulative
+        pnl (net of costs) and of the daily pnl (gross of costs) and the (dates x assets) float arrays of the
+        quantities held and of the notional traded on each date. With return_state, a fifth element is the state on
+        the last date, before any rebalance on it: a dictionary with the (assets,) float array of the quantities held
+        'q', the rebalancing costs not yet taken out of the pnl 'reb_costs' and the backtest on that date 'nav' and on
+        the date before 'previous_nav'. Resuming from it gives the same results as a single run over all dates
+        """
+        if state is not None:
+            state = {key: np.asarray(value, dtype=float)[None] for key, value in state.items()}
+        backtest, pnl, holdings, traded_notional, state = FHBacktestAncilliaryFunctions._holdings_recursion(
+            prices, np.asarray(weights0, dtype=float)[None], rebalance_positions,
+            np.asarray(rebalance_weights, dtype=float)[None], holdings_costs, rebalance_costs, days, per_asset=True,
+            state=state)
+        results = (backtest[0], pnl[0], holdings[0].T, traded_notional[0].T)
+        if return_state:
+            results += ({key: value[0] if key == 'q' else float(value[0]) for key, value in state.items()},)
+        return results
+
+    @staticmethod
+    def simulate_strategies(prices, weights0, rebalance_positions, rebalance_weights,
+                            holdings_costs=None, rebalance_costs=None, days=None):
+        """
+        This method runs the backtests of many strategies with the same underlyings and rebalancing dates at once,
+        such as variants of a signal, advancing the holdings of all strategies together with array operations.
+        Each strategy follows the same recursion as simulate_holdings, with the same results.
+
+        Parameters
+        ----------
+        prices : a (dates x assets) float array with the prices of the underlyings, NaN where not available
+        weights0 : a (strategies x assets) float array with the weights of each strategy used on the first date
+        rebalance_positions : an increasing integer array with the positions (>= 1) of the rebalancing dates in prices
+        rebalance_weights : a (strategies x rebalancing dates x assets) float array with the weights of each strategy
+                            for each rebalancing date
+        holdings_costs, rebalance_costs, days : costs used in all strategies, see simulate_holdings
+
+        Returns
+        -------
+        a tuple (backtest, pnl, traded_notional) with the (dates x strategies) float arrays of the indexed cumulative
+        pnl (net of costs), of the daily pnl (gross of costs) and of the notional traded (summed over the underlyings)
+        on each date
+        """
+        backtest, pnl, _, traded_notional, _ = FHBacktestAncilliaryFunctions._holdings_recursion(
+            prices, weights0, rebalance_positions, rebalance_weights, holdings_costs, rebalance_costs, days,
+            per_asset=False)
+        return backtest.T, pnl.T, traded_notional.T
+
+    @staticmethod
+    def _holdings_recursion(prices, weights0, rebalance_positions, rebalance_weights,
+                            holdings_costs, rebalance_costs, days, per_asset, state=None):
+        """
+        Holdings and pnl recursion of simulate_holdings for a (strategies x assets) weights0 and a (strategies x
+        rebalancing dates x assets) rebalance_weights. Returns (strategies x dates) arrays of the backtests and pnl
+        and, with per_asset, the (strategies x assets x dates) arrays of holdings and traded notional. Otherwise
+        holdings is None and the traded notional is summed over the assets. The last element is the state on the
+        last date (see simulate_holdings), with a leading strategy axis, as is the state to resume from
+        """
+        # work with assets on the rows, after the strategies
+        prices = np.ascontiguousarray(np.asarray(prices, dtype=float).T)
+        n, t = prices.shape
+        weights0 = np.asarray(weights0, dtype=float)
+        m = weights0.shape[0]
+        rebalance_positions = np.asarray(rebalance_positions, dtype=int)
+        rebalance_weights = np.asarray(rebalance_weights, dtype=float)
+        hc = None if holdings_costs is None else np.broadcast_to(np.asarray(holdings_costs, dtype=float), (n,))
+        tc = None if rebalance_costs is None else np.broadcast_to(np.asarray(rebalance_costs, dtype=float), (n,))
+        costs = hc is not None or tc is not None
+
+        def sum_over_assets(x):
+            # accumulate (unlike sum) adds the assets one at a time, in order, as a Python loop over them does.
+            # NaN's count as zero
+            x[np.isnan(x)] = 0
+            return np.add.accumulate(x, axis=1)[:, -1]
+
+        price_changes = np.zeros((n, t))
+        price_changes[:, 1:] = prices[:, 1:] - prices[:, :-1]
+        backtest = np.empty((m, t))
+        pnl = np.empty((m, t))
+        holdings = np.empty((m, n, t)) if per_asset else None
+        traded_notional = np.zeros((m, n, t) if per_asset else (m, t))
+        if state is None:
+            backtest[:, 0] = 1
+            pnl[:, 0] = 0
+            q = weights0 / prices[:, 0]  # first trade
+            reb_costs = np.zeros(m)
+            previous_nav = np.full(m, np.nan)
+        else:
+            backtest[:, 0] = state['nav']
+            pnl[:, 0] = np.nan
+            q = state['q']
+            reb_costs = state['reb_costs']
+            previous_nav = state['previous_nav']
+        if per_asset:
+            holdings[:, :, 0] = q
+        final_state = None
+
+        starts = np.concatenate([[0], rebalance_positions])
+        ends = np.concatenate([rebalance_positions, [t - 1]])
+        for k, (s, e) in enumerate(zip(starts, ends)):
+            if e > s:
+                # from the day after s up to e the quantities held are the ones set on s
+                period_pnl = sum_over_assets(q[:, :, None] * price_changes[:, s + 1:e + 1])
+                pnl[:, s + 1:e + 1] = period_pnl
+                if costs:
+                    # each day, take out of the backtest the pnl, then the costs of the last rebalance (only on
+                    # the first day) and then the holdings costs, in this order
+                    steps = np.zeros((m, e - s, 3))
+                    steps[:, :, 0] = period_pnl
+                    steps[:, 0, 1] = - reb_costs
+                    if hc is not None:
+                        steps[:, :, 2] = - sum_over_assets(q[:, :, None] * prices[:, s:e] * hc[:, None]
+                                                           * days[s + 1:e + 1] / 365.25)
+                else:
+                    steps = period_pnl[:, :, None]
+                cum_pnl = np.cumsum(np.concatenate([backtest[:, s:s + 1], steps.reshape(m, -1)], axis=1), axis=1)
+                backtest[:, s + 1:e + 1] = cum_pnl[:, steps.shape[2]::steps.shape[2]]
+                if per_asset:
+                    holdings[:, :, s + 1:e + 1] = q[:, :, None]
+                reb_costs = np.zeros(m)
+
+            if final_state is None and e == t - 1:
+                # what a later run needs to resume on the last date, including a rebalance on it
+                final_state = dict(q=q, reb_costs=reb_costs, nav=backtest[:, -1].copy(),
+                                   previous_nav=backtest[:, -2].copy() if t > 1 else previous_nav)
+
+            # rebalance on e based on the new weights
+            if k < len(rebalance_positions):
+                nav = backtest[:, e - 1:e] if e > 0 else previous_nav[:, None]
+                new_q = nav * rebalance_weights[:, k] / prices[:, e]
+                traded = np.abs(np.nan_to_num(new_q) - np.nan_to_num(q)) * prices[:, e]
+                if tc is not None:
+                    # to be subtracted from the next day pnl
+                    reb_costs = sum_over_assets(traded * tc)
+                if per_asset:
+                    traded_notional[:, :, e] = traded
+                    holdings[:, :, e] = new_q
+                else:
+                    traded_notional[:, e] = sum_over_assets(traded)
+                q = new_q
+
+        return backtest, pnl, holdings, traded_notional, final_state
+
+    @staticmethod
+    def map_over_dates(weighting_function, n_jobs, *iterables, warm_start=False, warm_start_block=12):
+        """
+        Calls weighting_function with one item of each of the iterables per rebalancing date, as the built-in map,
+        and returns the list of results in the order of the dates.
+        The optimizations on each rebalancing date are independent from each other once the covariance matrices are
+        known, so they can be spread over a pool of processes. Results do not depend on n_jobs as long as the weighting
+        function is deterministic, e.g., with a seed given for each date
+
+        With warm_start, the weights of the previous date are passed as the initial_weights keyword argument of
+        weighting_function, so that its solver starts close to the solution. Dates are then solved in order, in blocks
+        of warm_start_block consecutive dates where the first date of each block has a cold start. The blocks only
+        depend on the position of the dates, so they are the same whether they run serially or spread over a pool of
+        processes, and the results do not depend on n_jobs either
+
+        Parameters
+        ----------
+        weighting_function : a function that can be pickled, such as the static methods of this class
+        n_jobs : the number of processes. 1 runs serially in the current process and -1 uses all CPUs
+        iterables : the arguments of weighting_function, one iterable per positional argument
+        warm_start : a Boolean, True to start the optimization on each date from the weights of the previous date
+        warm_start_block : the number of dates in each block of warm-started dates (default is 12, a year of monthly
+                           rebalancing dates)
+        """
+
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+        if n_jobs is None or n_jobs <= 1:
+            if warm_start:
+                return FHBacktestAncilliaryFunctions._warm_started_map(weighting_function, zip(*iterables),
+                                                                       warm_start_block=warm_start_block)
+            return list(map(weighting_function, *iterables))
+
+        arguments = list(zip(*iterables))  # one tuple of arguments per date, the shortest iterable sets the dates
+        if len(arguments) == 0:
+            return []
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(arguments))) as executor:
+            if warm_start:
+                blocks = [arguments[b:b + warm_start_block] for b in range(0, len(arguments), warm_start_block)]
+                results = executor.map(FHBacktestAncilliaryFunctions._warm_started_map, repeat(weighting_function),
+                                       blocks)
+                return [w for block in results for w in block]
+            chunksize = max(1, int(np.ceil(len(arguments) / (4 * n_jobs))))
+            return list(executor.map(weighting_function, *zip(*arguments), chunksize=chunksize))
+
+    @staticmethod
+    def _solver_info(rebalance_dates, weights):
+        """
+        DataFrame with the solver, the number of iterations and the warm start flag in the attrs of the weights
+        calculated on each rebalancing date (None for weights calculated without solver)
+        """
+        return pd.DataFrame(index=rebalance_dates,
+                            data={key: [None if w is None else w.attrs.get(key) for w in weights]
+                                  for key in ['solver', 'iterations', 'warm_start']})
+
+    @staticmethod
+    def _warm_started_map(weighting_function, arguments, initial_weights=None, start=0, warm_start_block=12):
+        """
+        Calls weighting_function for each tuple of arguments, in order, with the weights of the previous call as
+        initial_weights, starting from the initial_weights given. The arguments are the ones of the dates from
+        position start on, and the dates in positions multiple of warm_start_block have a cold start, as in
+        map_over_dates. Returns the list of results
+        """
+        results = []
+        for position, args in enumerate(arguments, start):
+            if position % warm_start_block == 0:
+                initial_weights = None
+            weights = weighting_function(*args, initial_weights=initial_weights)
+            results.append(weights)
+            initial_weights = weights.values
+        return results
+
+    @staticmethod
+    def _append_dates(df, new_df, ffill=False):
+        """
+        df with the rows of new_df for the columns of df appended, for dates after the last date of df.
+        With ffill, missing values are filled forward from the last row of df, as ffill over all the rows does
+        """
+        new_df = new_df.reindex(columns=df.columns)
+        new_df.index = pd.DatetimeIndex(pd.to_datetime(new_df.index))
+        if len(new_df.index) > 0 and new_df.index.min() <= df.index.max():
+            raise ValueError('the new dates must be after %s' % str(df.index.max()))
+        if ffill:
+            new_df = pd.concat([df.iloc[-1:], new_df]).ffill().iloc[1:]
+        return pd.concat([df, new_df])
+
+
+class FHFactorCovariance(object):
+    """
+    Covariance matrix with a factor structure, cov = loadings.loadings' + diag(idiosyncratic), as estimated by
+    FHCovarianceProvider for cov_type equal to 'factor'. The loadings are scaled so that the factors have unit
+    variance and are uncorrelated.
+
+    Only the (n x K) loadings and the n idiosyncratic variances are stored. Products with a vector and quadratic forms
+    take O(n K) operations and linear systems O(n K^2), using the Woodbury identity, instead of the O(n^2) and O(n^3)
+    of a dense matrix. The weighting schemes of FHBacktestAncilliaryFunctions use these without forming the (n x n)
+    matrix, and products with @ work on either side as with a NumPy array.
+
+    Attributes
+    ----------
+
+    loadings : a (n x K) array with the loadings of each series on the factors
+
+    idiosyncratic : a (n,) array with the idiosyncratic variance of each series
+
+    index, columns : the names of the series (the same Index, as in a DataFrame with the covariance matrix)
+
+    shape : the shape (n, n) of the covariance matrix
+
+
+    Methods
+    ----------
+
+    diagonal : the variances of the series
+
+    quad_form : the quadratic form x'.cov.x
+
+    solve : the solution x of cov.x = b
+
+    take : the covariance matrix of a subset of the series, with a factor structure
+
+    block_dot : the product of an off-diagonal block of the covariance matrix with a vector
+
+    to_numpy, to_frame : the dense (n x n) covariance matrix, as an array or a DataFrame
+
+    """
+
+    # NumPy defers ndarray @ FHFactorCovariance to __rmatmul__ instead of converting it to an array
+    __array_ufunc__ = None
+
+    def __init__(self, loadings, idiosyncratic, index=None):
+        """
+        Parameters
+        ----------
+        loadings : a (n x K) array with the loadings of each series on the factors
+        idiosyncratic : a (n,) array with the idiosyncratic variance of each series
+        index : the names of the series (default is None, for 0 to n - 1)
+        """
+        self.idiosyncratic = np.asarray(idiosyncratic, dtype=float)
+        self.loadings = np.asarray(loadings, dtype=float).reshape(len(self.idiosyncratic), -1)
+        self.index = pd.RangeIndex(len(self.idiosyncratic)) if index is None else pd.Index(index)
+
+    @property
+    def columns(self):
+        return self.index
+
+    @property
+    def shape(self):
+        return len(self.idiosyncratic), len(self.idiosyncratic)
+
+    def __matmul__(self, x):
+        x = np.asarray(x, dtype=float)
+        idiosyncratic = self.idiosyncratic if x.ndim == 1 else self.idiosyncratic[:, None]
+        return self.loadings @ (self.loadings.T @ x) + idiosyncratic * x
+
+    def __rmatmul__(self, x):
+        # the matrix is symmetric
+        x = np.asarray(x, dtype=float)
+        return self @ x if x.ndim == 1 else (self @ x.T).T
+
+    def diagonal(self):
+        """
+        The (n,) array with the variances of the series
+        """
+        return np.einsum('ij,ij->i', self.loadings, self.loadings) + self.idiosyncratic
+
+    def quad_form(self, x):
+        """
+        x'.cov.x for a (n,) array x
+        """
+        x = np.asarray(x, dtype=float)
+        factors = self.loadings.T @ x
+        return factors @ factors + (self.idiosyncratic * x) @ x
+
+    def solve(self, b):
+        """
+        The solution x of cov.x = b for a (n,) array b, by the Woodbury identity
+
+            inv(cov) = inv(D) - inv(D).loadings.inv(I + loadings'.inv(D).loadings).loadings'.inv(D)
+
+        with D the diagonal matrix of idiosyncratic variances. Raises a LinAlgError, as np.linalg.solve does for
+        singular matrices, if some idiosyncratic variance is not positive
+        """
+        if not (self.idiosyncratic > 0).all():
+            raise np.linalg.LinAlgError('idiosyncratic variances must be positive')
+        b = np.asarray(b, dtype=float)
+        scaled_loadings = self.loadings / self.idiosyncratic[:, None]
+        capacitance = np.eye(self.loadings.shape[1]) + self.loadings.T @ scaled_loadings
+        return b / self.idiosyncratic - scaled_loadings @ np.linalg.solve(capacitance, scaled_loadings.T @ b)
+
+    def take(self, positions, signs=None):
+        """
+        The FHFactorCovariance of the series in the given positions (an integer array or a slice), which is the
+        block of the covariance matrix on these rows and columns. With an array of signs (1 or -1) for these series,
+        it is the covariance matrix of the series multiplied by their signs
+        """
+        loadings = self.loadings[positions]
+        if signs is not None:
+            loadings = loadings * np.asarray(signs, dtype=float)[:, None]
+        return FHFactorCovariance(loadings, self.idiosyncratic[positions], self.index[positions])
+
+    def block_dot(self, rows, columns, x):
+        """
+        cov[rows, columns].x for disjoint integer arrays of positions rows and columns, which only has the factor
+        part of the covariance matrix
+        """
+        return self.loadings[rows] @ (self.loadings[columns].T @ np.asarray(x, dtype=float))
+
+    def to_numpy(self):
+        """
+        The dense (n x n) covariance matrix
+        """
+        cov = self.loadings @ self.loadings.T
+        cov[np.diag_indices_from(cov)] += self.idiosyncratic
+        return cov
+
+    def to_frame(self):
+        """
+        The dense (n x n) covariance matrix as a DataFrame with the names of the series as index and columns
+        """
+        return pd.DataFrame(index=self.index, columns=self.columns, data=self.to_numpy())
+
+
+class FHCovarianceProvider(object):
+    """
+    This class serves the covariance matrices of FHBacktestAncilliaryFunctions.get_cov_matrix_on_date for many dates
+    of the same time series, as needed when a strategy is rebalanced.
+
+    Log returns, the unconditional covariance matrix and the amount of data available for each series are computed
+    only once. For rolling and expanding windows, the pairwise sums of returns and cross-products of returns over the
+    current window are kept and moved from one date to the next by adding the returns that enter the window and
+    taking out the ones that leave it, instead of recomputing the covariance matrix over the full window every time.
+    EWMA estimates are calculated by a single recursion over the sample that keeps only the matrices on the dates
+    given, in a (dates x n x n) array, instead of the full panel of matrices for every day.
+    Factor models only keep (n x n_factors) loadings and n idiosyncratic variances per date (see FHFactorCovariance),
+    from the principal components of the returns over the rolling window, so no (n x n) matrix is formed when there
+    are more series than returns in the window.
+
+    Methods
+    ----------
+    get_cov_matrix_on_date : the annualized covariance matrix for a given date
+    append : extends the time series with new dates, keeping the running sums and the ewma recursion
+    uses_unconditional_cov : flags the dates whose covariance matrix uses the unconditional covariance matrix
+
+    """
+
+    def __init__(self, ts, h=21, cov_type='rolling', cov_window=756, halflife=60, shrinkage_parameter=1, dates=None,
+                 n_factors=5):
+        """
+        Parameters
+        ----------
+        ts : a DataFrame with daily time series of index/price levels (not returns!)
+        h, cov_type, cov_window, halflife, shrinkage_parameter and n_factors : see the get_cov_matrix_on_date
+                                                                               method of the
+                                                                               FHBacktestAncilliaryFunctions class
+        dates : the dates on which covariance matrices will be requested, typically the rebalancing dates (optional)
+                For cov_type equal to 'ewma' the matrices on these dates are all calculated in a single pass.
+                Other dates are still served, resuming the recursion from the last date calculated when possible
+        """
+
+        if cov_type not in ['rolling', 'expanding', 'ewma', 'factor']:
+            print('cov_type not recognized, assuming rolling window of %s bdays' % str(cov_window))
+            cov_type = 'rolling'
+
+        # clean up
+        ts = ts.astype(float)
+        ts.index = pd.DatetimeIndex(pd.to_datetime(ts.index))
+        self.ts = ts
+        self.h = h
+        self.cov_type = cov_type
+        self.cov_window = cov_window
+        self.halflife = halflife
+        self.shrinkage_parameter = shrinkage_parameter
+        self.n_factors = n_factors
+
+        # h period log returns, from which the unconditional covariance matrix (or factor model) is calculated when
+        # first needed
+        self._returns = np.log(ts).diff(h).to_numpy()
+        self._unc_cov = None
+        self._unc_factor_model = None
+
+        # number of prices available for each series before each date (the backtest uses data with a day lag)
+        self._counts = np.zeros((len(ts.index) + 1, ts.shape[1]), dtype=int)
+        np.cumsum(ts.notnull().to_numpy(), axis=0, out=self._counts[1:])
+
+        # returns with missing values zeroed out, together with the mask of available returns. Returns are shifted
+        # by the first return of each series, which does not change covariances but keeps the running sums of
+        # cross-products accurate. Unlike the sample mean, the shift does not depend on later data, so the sums are
+        # the same when the provider is extended with new dates (see append)
+        self._shift = np.zeros(ts.shape[1])
+        self._shifted = np.zeros(ts.shape[1], dtype=bool)
+        self._valid, self._x = self._shifted_returns(self._returns)
+
+        # pairwise sums over the current window [start, end) of returns: number of returns, sums and cross-products
+        self._window = (0, 0)
+        self._sums = None if cov_type == 'factor' else np.zeros((3, ts.shape[1], ts.shape[1]))
+
+        # ewma estimates on the requested dates and the state of the ewma recursion on the last date calculated
+        self._ewma_dates = pd.DatetimeIndex([])
+        self._ewma_covs = np.zeros((0, ts.shape[1], ts.shape[1]))
+        self._ewma_state = None
+        if cov_type == 'ewma':
+            self._ewma_returns = np.log(ts.shift(1)).diff(1).to_numpy()
+            if dates is not None:
+                positions = ts.index.searchsorted(pd.DatetimeIndex(pd.to_datetime(dates)), side='right') - 1
+                positions = np.unique(positions[positions >= 0])
+                self._ewma_dates = ts.index[positions]
+                self._ewma_covs = self._ewma_cov(positions)
+
+    @property
+    def unc_cov(self):
+        """
+        The unconditional covariance matrix annualized, over the full sample of h period returns
+        """
+        if self._unc_cov is None:
+            returns = pd.DataFrame(self._returns, index=self.ts.index, columns=self.ts.columns)
+            self._unc_cov = returns.cov() * (252 / self.h)
+        return self._unc_cov
+
+    def append(self, new_ts):
+        """
+        Extends ts with the dates of new_ts after its last date. Returns and the amount of data available are
+        calculated for the new dates only, and the running sums and the state of the ewma recursion are kept, so
+        covariance matrices on later dates are served exactly as by a provider built on the extended time series.
+        The unconditional covariance matrix changes with every new date and is recalculated when next needed
+
+        Parameters
+        ----------
+        new_ts : a DataFrame with daily index/price levels for (at least) the columns of ts. Dates up to the last
+                 date of ts are ignored
+        """
+
+        new_ts = new_ts.astype(float)
+        new_ts.index = pd.DatetimeIndex(pd.to_datetime(new_ts.index))
+        new_ts = new_ts.loc[new_ts.index > self.ts.index[-1], self.ts.columns]
+        m = len(new_ts.index)
+        if m == 0:
+            return
+        ts = pd.concat([self.ts, new_ts])
+
+        # the returns of the new dates only need the prices of the last h (ewma: 2) dates before them
+        returns = np.log(ts.iloc[-(m + self.h):]).diff(self.h).to_numpy()[-m:]
+        valid, x = self._shifted_returns(returns)
+        self._returns = np.concatenate([self._returns, returns])
+        self._valid = np.concatenate([self._valid, valid])
+        self._x = np.concatenate([self._x, x])
+        counts = self._counts[-1] + np.cumsum(new_ts.notnull().to_numpy(), axis=0)
+        self._counts = np.concatenate([self._counts, counts])
+        if self.cov_type == 'ewma':
+            ewma_returns = np.log(ts.iloc[-(m + 2):].shift(1)).diff(1).to_numpy()[-m:]
+            self._ewma_returns = np.concatenate([self._ewma_returns, ewma_returns])
+        self._unc_cov = None
+        self._unc_factor_model = None
+        self.ts = ts
+
+    def uses_unconditional_cov(self, dates):
+        """
+        A Boolean array, True for the dates whose covariance matrix takes values from the unconditional covariance
+        matrix, which depends on the full sample (see get_cov_matrix_on_date). Matrices on the other dates only use
+        data available on the date
+        """
+        positions = self.ts.index.searchsorted(pd.DatetimeIndex(pd.to_datetime(dates)), side='right') - 1
+        if len(positions) > 0 and positions.min() < 0:
+            raise ValueError('there is no data in ts on or before %s' % str(min(dates)))
+        early = (self.ts.index[positions] - self.ts.index[0]).days < self.cov_window
+        return np.asarray(early) | (self._counts[positions] <= self.cov_window).any(axis=1)
+
+    def get_cov_matrix_on_date(self, d):
+        """
+        Parameters
+        ----------
+        d : a single date value of the same type as the dates in ts.index
+
+        Returns
+        -------
+        an annualized covariance matrix based on h period returns, as in the get_cov_matrix_on_date method of the
+        FHBacktestAncilliaryFunctions class
+        """
+
+        p = self.ts.index.searchsorted(pd.to_datetime(d), side='right') - 1
+        if p < 0:
+            raise ValueError('there is no data in ts on or before %s' % str(d))
+        r = self.ts.index[p]
+
+        if self.cov_type == 'factor':
+            return self._factor_cov(p)
+
+        # if the dataframe has less than certain amount of data, use the unconditional covariance matrix
+        if (r - self.ts.index[0]).days < self.cov_window:
+            cov = self.unc_cov.copy()
+        # if the ts DataFrame has at least some amount of data, use the conditional cov
+        else:
+            # returns up to p - 1 are the ones available on r. Note the day lag to not use information not available
+            # in the backtest. The rolling window of cov_window prices holds cov_window - h returns
+            if self.cov_type == 'ewma':
+                # This is roughly similar to a GARCH(1, 1) model:
+                k = self._ewma_dates.get_indexer([r])[0]
+                values = self._ewma_covs[k] if k >= 0 else self._ewma_cov(np.array([p]))[0]
+                cond_cov = pd.DataFrame(index=self.ts.columns, columns=self.ts.columns, data=values * 252)
+            elif self.cov_type == 'expanding':
+                cond_cov = self._window_cov(0, p) * (252 / self.h)
+            else:
+                cond_cov = self._window_cov(max(p - self.cov_window + self.h, 0), p) * (252 / self.h)
+
+            # take the series that do not have enough data and replace with unconditional estimates
+            short = self._counts[p] <= self.cov_window
+            values = cond_cov.to_numpy(dtype=float, copy=True)
+            values[short, :] = self.unc_cov.to_numpy()[short, :]
+            values[:, short] = self.unc_cov.to_numpy()[:, short]
+            cov = pd.DataFrame(index=self.unc_cov.index, columns=self.unc_cov.columns, data=values)
+
+        if self.shrinkage_parameter >= 0 and self.shrinkage_parameter < 1:
+            values = cov.to_numpy(dtype=float)
+            vols = np.sqrt(np.diag(values))
+            corr = values / vols[:, None] / vols[None, :]
+            corr = self.shrinkage_parameter * corr + (1 - self.shrinkage_parameter) * np.eye(len(vols))
+            cov = pd.DataFrame(index=cov.index, columns=cov.columns, data=corr * vols[:, None] * vols[None, :])
+
+        return cov
+
+    def _factor_cov(self, p):
+        """
+        The annualized FHFactorCovariance on position p of ts.index, from the principal components of the returns over
+        the rolling window or, as for the other types of covariance, of the full sample if there is too little data
+        """
+
+        if (self.ts.index[p] - self.ts.index[0]).days < self.cov_window:
+            if self._unc_factor_model is None:
+                self._unc_factor_model = self._factor_model(0, len(self._returns))
+            loadings, variances = (x.copy() for x in self._unc_factor_model)
         else:
-            # Equal Weights
-            if weighting_scheme != 'EW':
-                print('%s weighting scheme is not recognized, defaulting to static equal weights' % weighting_scheme)
-            n = cov.shape[0]
-            static_weights = pd.Series(index=cov.index, data=1 / n)
+            loadings, variances = self._factor_model(max(p - self.cov_window + self.h, 0), p)
+            # series that do not have enough data take their unconditional variance
+            short = self._counts[p] <= self.cov_window
+            if short.any():
+                with np.errstate(invalid='ignore'):
+                    variances[short] = np.nanvar(self._returns[:, short], axis=0, ddof=1)
+        loadings = loadings * np.sqrt(252 / self.h)
+        variances = variances * (252 / self.h)
+
+        # at least 0.01% of the variance of each series is idiosyncratic, so the matrix is positive definite
+        common = np.einsum('ij,ij->i', loadings, loadings)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            too_large = common > 0.9999 * variances
+            loadings[too_large] *= np.sqrt(0.9999 * variances[too_large] / common[too_large])[:, None]
+        common = np.einsum('ij,ij->i', loadings, loadings)
+        idiosyncratic = variances - common
+
+        # shrinking correlations towards zero shrinks the loadings and keeps the variances
+        if self.shrinkage_parameter >= 0 and self.shrinkage_parameter < 1:
+            loadings = np.sqrt(self.shrinkage_parameter) * loadings
+            idiosyncratic = idiosyncratic + (1 - self.shrinkage_parameter) * common
+
+        return FHFactorCovariance(loadings, idiosyncratic, self.ts.columns)
+
+    def _factor_model(self, start, end):
+        """
+        Loadings on the first n_factors principal components of the (non-annualized) returns in rows start to end - 1
+        and the variances of the series. Each series is demeaned over its available returns and missing returns are
+        zero, so the loadings of series with fewer returns are scaled up as in pairwise covariance estimates.
+        The principal components come from the eigenvectors of the smaller of the two Gram matrices of the returns
+        """
 
-        return static_weights
+        valid, x = self._valid[start:end], self._x[start:end]
+        t, n = x.shape
+        counts = valid.sum(axis=0)
+        x = x - valid * np.divide(x.sum(axis=0), counts, out=np.zeros(n), where=counts > 0)
+        variances = np.divide(np.einsum('ij,ij->j', x, x), counts - 1, out=np.full(n, np.nan), where=counts > 1)
+
+        loadings = np.zeros((n, self.n_factors))
+        m = counts.max(initial=0)
+        k = min(self.n_factors, t, n)
+        if m > 1 and k > 0:
+            if n <= t:
+                gram = dsyrk(1., x, trans=1)  # upper triangle of x'.x
+            else:
+                gram = dsyrk(1., x)  # upper triangle of x.x'
+            eigenvalues, vectors = eigh(gram, lower=False, subset_by_index=[len(gram) - k, len(gram) - 1])
+            if n <= t:
+                loadings[:, :k] = vectors * np.sqrt(np.maximum(eigenvalues, 0) / (m - 1))
+            else:
+                loadings[:, :k] = x.T @ vectors / np.sqrt(m - 1)
+            loadings *= np.divide(m - 1, counts - 1, out=np.zeros(n), where=counts > 1)[:, None]
+        return loadings, variances
 
-    @staticmethod
-    def cross_sectional_weights_from_signals(signals, weighting_scheme = 'rank', cov = None, vol_target = 0.1):
+    def _window_cov(self, start, end):
+        """
+        Pairwise (non-annualized) covariance matrix of the returns in rows start to end - 1, moving the running sums
+        from the current window or recomputing them, whichever touches fewer rows
         """
-        This method calculates static long-short weights for a given set of signals
 
-        Parameters
-        ----------
+        current_start, current_end = self._window
+        if abs(start - current_start) + abs(end - current_end) >= end - start:
+            self._sums = self._cross_products(start, end)
+        else:
+            if end > current_end:
+                self._sums += self._cross_products(current_end, end)
+            elif end < current_end:
+                self._sums -= self._cross_products(end, current_end)
+            if start < current_start:
+                self._sums += self._cross_products(start, current_start)
+            elif start > current_start:
+                self._sums -= self._cross_products(current_start, start)
+        self._window = (start, end)
+
+        n, sx, sxy = self._sums
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (sxy - sx * sx.T / n) / (n - 1)
+        cov[n < 2] = np.nan
+        return pd.DataFrame(index=self.ts.columns, columns=self.ts.columns, data=cov)
+
+    def _shifted_returns(self, returns):
+        """
+        Mask of the available returns (as floats) and the returns shifted by the first return of each series, zeroed
+        out where missing, for returns of dates after the ones already processed
+        """
+        valid = ~np.isnan(returns)
+        for j in np.flatnonzero(~self._shifted & valid.any(axis=0)):
+            self._shift[j] = returns[np.argmax(valid[:, j]), j]
+            self._shifted[j] = True
+        return valid.astype(float), np.where(valid, returns - self._shift, 0.)
+
+    def _cross_products(self, start, end):
+        x = self._x[start:end]
+        valid = self._valid[start:end]
+        return np.array([valid.T @ valid, x.T @ valid, x.T @ x])
+
+    def _ewma_cov(self, positions):
+        """
+        Pairwise (non-annualized) ewma covariance matrices on the given increasing positions of ts.index, with the
+        day lag of the backtest. This is the recursion of pandas ewm(halflife=halflife).cov() (adjusted weights,
+        unbiased) run for all pairs of series at once, each pair using the days on which both series have returns
+        """
 
-        signals : a Pandas series containing a set of signals on which assets will be sorted. Typically, we want to
-                  be long and have higher weight on assets with large signals and to be short and have large negative
-                  weights in the assets with low signals
+        n = self.ts.shape[1]
+        decay = 1. - 1. / (1. + (1 / (1 - np.exp(np.log(0.5) / self.halflife)) - 1))
+
+        # restart the recursion if the first position is before the last one calculated
+        if self._ewma_state is None or positions[0] < self._ewma_state[0]:
+            self._ewma_state = (-1, np.full((n, n), np.nan), np.zeros((n, n)), np.ones((n, n)), np.ones((n, n)),
+                                np.ones((n, n)), np.zeros((n, n)))
+        last, mean, cov, sum_wt, sum_wt2, old_wt, nobs = self._ewma_state
+
+        def unbiased_cov():
+            numerator = sum_wt * sum_wt
+            denominator = numerator - sum_wt2
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where((nobs >= 1) & (denominator > 0), (numerator / denominator) * cov, np.nan)
+
+        covs = np.empty((len(positions), n, n))
+        k = np.searchsorted(positions, last, side='right')
+        covs[:k] = unbiased_cov()
+        for t in range(last + 1, positions[-1] + 1):
+            # mean[i, j] is the ewma mean of series i over the days on which series i and j have returns
+            x = self._ewma_returns[t]
+            cur_x, cur_y = x[:, None], x[None, :]
+            is_observation = ~np.isnan(x)
+            is_observation = is_observation[:, None] & is_observation[None, :]
+            started = ~np.isnan(mean)
+            update = started & is_observation
+
+            if update.all():  # all pairs have started and have returns, the usual case after the first days
+                old_wt = old_wt * decay
+                new_mean = np.where(mean != cur_x, (old_wt * mean + cur_x) / (old_wt + 1.), mean)
+                cov = (old_wt * (cov + (mean - new_mean) * (mean.T - new_mean.T))
+                       + (cur_x - new_mean) * (cur_y - new_mean.T)) / (old_wt + 1.)
+                mean = new_mean
+                sum_wt = sum_wt * decay + 1.
+                sum_wt2 = sum_wt2 * (decay * decay) + 1.
+                old_wt = old_wt + 1.
+            else:
+                sum_wt = np.where(started, sum_wt * decay, sum_wt)
+                sum_wt2 = np.where(started, sum_wt2 * (decay * decay), sum_wt2)
+                old_wt = np.where(started, old_wt * decay, old_wt)
 
-        weighting_scheme :  this is a string that can take the following values
-            'zscores' : z-score long-short weights adding up to 200% in absolute value
-            'winsorized' : same as 'zscores' but with z-scores winsorized at 10th/90th percentile limits
-            'vol_target' : long-short weights set to achieve a certain volatility target for the entire portfolio
-            'ERC' : Equal Risk Contribution Portfolio
-            'IVP' : Inverse Volatility Portfolio
-            'EW' : Equal Weights
-            'rank' : Signal Rank Based Portfolio (this is the case if the parameter is not given or not recognized)
+                new_mean = np.where(update & (mean != cur_x), (old_wt * mean + cur_x) / (old_wt + 1.), mean)
+                new_cov = (old_wt * (cov + (mean - new_mean) * (mean.T - new_mean.T))
+                           + (cur_x - new_mean) * (cur_y - new_mean.T)) / (old_wt + 1.)
+                cov = np.where(update, new_cov, cov)
+                sum_wt = np.where(update, sum_wt + 1., sum_wt)
+                sum_wt2 = np.where(update, sum_wt2 + 1., sum_wt2)
+                old_wt = np.where(update, old_wt + 1., old_wt)
+                mean = np.where(~started & is_observation, cur_x, new_mean)
+            nobs = nobs + is_observation
 
-        cov : a DataFrame with the covariance matrix used in all weighting schemes but equal weights
-        vol_target : used in the 'vol_target' and 'ERC' weighting schemes to set the overall volatility of the portfolio
+            if t == positions[k]:
+                covs[k] = unbiased_cov()
+                k += 1
 
-        Returns
-        -------
-        a Pandas series with static long-short weights as type float
-        """
+        self._ewma_state = (max(last, positions[-1]), mean, cov, sum_wt, sum_wt2, old_wt, nobs)
+        return covs
 
-        assert isinstance(signals, pd.Series), "input 'signals' must be a pandas Series"
-        assert isinstance(weighting_scheme, str), "input 'weighting_scheme' must be a string"
 
-        if weighting_scheme.lower().find('zscores')>-1:
-            # z-score long-short weights adding up to 200% in absolute value
-            weights = signals.copy().fillna(0) * 0
-            scores = pd.Series(index=signals.dropna().index, data=stats.zscore(signals.dropna()))
-            weights[scores.index] = scores.values
-            weights = weights / (np.nansum(np.abs(weights)) / 2)
+class FHBacktestCache(object):
+    """
+    Opt-in on-disk cache of the covariance matrices and rebalancing weights of FHLongOnlyWeights and
+    FHSignalBasedWeights, so that rebuilding a strategy in a new session does not recompute them.
 
-        elif weighting_scheme.lower().find('winsorized')>-1:
-            # z-scores winsorized at 10th/90th percentile limits long-short weights adding up to 200%
-            weights = signals.copy().fillna(0) * 0
-            raw_scores = stats.zscore(signals.dropna())
-            w_scores = stats.mstats.winsorize(raw_scores, limits=.1)
-            scores = pd.Series(index=signals.dropna().index, data=w_scores)
-            weights[scores.index] = scores.values
-            weights = weights / (np.nansum(np.abs(weights)) / 2)
+    Entries are content-addressed: the name of each entry is a hash of everything its value depends on.
+    The covariance matrix on a date is keyed by the prices up to that date and the covariance parameters, and on the
+    dates with too little data for some series also by the unconditional covariance matrix of the full sample (all
+    the prices for factor models) that it takes values from, so new prices only invalidate those dates. The weights
+    on a date are keyed by the weighting function and its arguments on that date: weighting scheme, covariance matrix,
+    signals, volatility target and seed. Warm starts only change the starting point of the solvers, so they are not
+    part of the key and weights read from the cache may differ from new calculations by the tolerance of the solvers.
 
-        elif weighting_scheme.lower().find('vol_target')>-1:
-            # long-short weights set to achieve a certain volatility target for the entire portfolio
+    Each entry is a .npy file, read back memory-mapped, with a .json file for the labels of the weights.
+    Entries are evicted in least recently used order when the files take more than max_bytes.
 
-            # maximize the portfolio signal (actually minimize the opposite of that)
-            port_signal = lambda x: - x.dot(signals.values)
+    Attributes
+    ----------
 
-            # subject to the portfolio volatility being equal to vol_target
-            port_vol = lambda x: np.sqrt(x.dot(cov).dot(x)) - vol_target
-            eq_cons = {'type': 'eq', 'fun': lambda x: port_vol(x)}
+    path : the cache directory
 
-            # initialize optimization with rank-based portfolio
-            ranks = signals.rank()
-            w0 = ranks - ranks.mean()
-            w0 = w0 / (np.nansum(np.abs(w0)) / 2)
+    max_bytes : the maximum size of the cache files in bytes
 
-            # bounds are set in order to be long/short what the rank based portfolio tells us to be long/short
-            # the maximum weight in absolute value is the maximum weight in the rank-based portfolio
-            bounds = pd.DataFrame(index=signals.index, columns=['lower', 'upper'])
-            bounds['lower'] = np.array([np.sign(w0) * max(np.abs(w0)), np.zeros(w0.shape)]).min(axis=0)
-            bounds['upper'] = np.array([np.sign(w0) * max(np.abs(w0)), np.zeros(w0.shape)]).max(axis=0)
+    hits, misses : the number of entries found and not found in the cache since it was created
 
-            res = opt.basinhopping(port_signal, np.nan_to_num(w0.values),
-                        minimizer_kwargs={'method': 'SLSQP', 'constraints': eq_cons, 'bounds': bounds.values},
-                                   T=1.0,
-                                   niter=500,
-                                   stepsize=0.5,
-                                   interval=50,
-                                   disp=False,
-                                   niter_success=100)
 
-            if not res['lowest_optimization_result']['success']:
-                raise ArithmeticError('Optimization convergence failed for volatility target weighting scheme')
+    Methods
+    ----------
 
-            weights = pd.Series(index=signals.index, data = np.nan_to_num(res.x))
+    covariances : the covariance matrices of a time series on many dates, as in FHCovarianceProvider
 
-        elif weighting_scheme.find('ERC')>-1:
-            # Equal Risk Contribution Portfolio
+    map_over_dates : the weights on many dates, as in FHBacktestAncilliaryFunctions.map_over_dates
 
-            # minimize the distance to the equal risk portfolio
-            n = cov.shape[0]
-            target_risk_contribution = np.ones(n) / n
-            dist_to_target = lambda x: np.linalg.norm(x * (x @ cov / (vol_target ** 2)) - target_risk_contribution)
+    get, put : read and write single entries
 
-            # subject to the portfolio volatility being equal to vol_target
-            port_vol = lambda x: np.sqrt(x.dot(cov).dot(x))
-            eq_cons = {'type': 'eq', 'fun': lambda x: port_vol(x) - vol_target}
+    clear : deletes all entries
 
-            # initialize optimization with rank-based portfolio
-            ranks = signals.rank()
-            w0 = ranks - ranks.mean()
-            w0 = w0 / (np.nansum(np.abs(w0)) / 2)
+    """
 
-            # bounds are set in order to be long/short what the rank based portfolio tells us to be long/short
-            # the maximum weight in absolute value is the maximum weight in the rank-based portfolio
-            bounds = pd.DataFrame(index=signals.index, columns=['lower', 'upper'])
-            bounds['lower'] = np.array([np.sign(w0) * max(np.abs(w0)), np.zeros(w0.shape)]).min(axis=0)
-            bounds['upper'] = np.array([np.sign(w0) * max(np.abs(w0)), np.zeros(w0.shape)]).max(axis=0)
+    # part of all keys, to be increased when calculations change and old entries should not be used
+    version = 3
 
-            res = opt.basinhopping(dist_to_target, target_risk_contribution,
-                                   minimizer_kwargs={'method': 'SLSQP', 'constraints': eq_cons, 'bounds': bounds.values},
-                                   T=1.0,
-                                   niter=500,
-                                   stepsize=0.5,
-                                   interval=50,
-                                   disp=False,
-                                   niter_success=100)
+    def __init__(self, path, max_bytes=2 ** 30):
+        """
+        Parameters
+        ----------
+        path : the cache directory. It is created if it does not exist
+        max_bytes : the maximum size of the cache files in bytes (default is 1 GiB)
+        """
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.path, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
 
-            if not res['lowest_optimization_result']['success']:
-                raise ArithmeticError('Optimization convergence failed for ERC weighting scheme')
-            weights = pd.Series(index=signals.index, data=np.nan_to_num(res.x))
+    @staticmethod
+    def hash_key(*parts):
+        """
+        Hex digest of the SHA-256 hash of parts, which may be strings, numbers, None, functions, NumPy arrays,
+        Pandas Series or DataFrames (values, index and column names) and FHFactorCovariance (loadings, idiosyncratic
+        variances and names)
+        """
+        h = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, FHFactorCovariance):
+                h.update(('factor%r' % part.index.tolist()).encode())
+                for values in [part.loadings, part.idiosyncratic]:
+                    h.update(('%s%s' % (values.dtype.str, values.shape)).encode())
+                    h.update(np.ascontiguousarray(values).tobytes())
+            elif isinstance(part, (pd.Series, pd.DataFrame)):
+                h.update(('pandas%r' % part.index.tolist()).encode())
+                if isinstance(part, pd.DataFrame):
+                    h.update(repr(part.columns.tolist()).encode())
+                values = part.to_numpy()
+                if values.dtype.kind in 'biufcmM':
+                    h.update(('%s%s' % (values.dtype.str, values.shape)).encode())
+                    h.update(np.ascontiguousarray(values).tobytes())
+                else:
+                    h.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+            elif isinstance(part, np.ndarray):
+                h.update(('array%s%s' % (part.dtype.str, part.shape)).encode())
+                h.update(np.ascontiguousarray(part).tobytes())
+            elif callable(part):
+                h.update(('function%s' % getattr(part, '__qualname__', repr(part))).encode())
+            else:
+                h.update(('%s%r' % (type(part).__name__, part)).encode())
+            h.update(b'|')
+        return h.hexdigest()
 
-        elif weighting_scheme.find('IVP')>-1:
-            # Inverse Volatility Portfolio
-            ranks = signals.rank()
-            weights = ranks - ranks.mean()
-            vols = pd.Series(index=cov.index, data=np.sqrt(np.diag(cov)))
-            weights = np.sign(weights) / vols
-            weights = weights / (np.nansum(np.abs(weights)) / 2)
+    def get(self, key):
+        """
+        Returns a tuple with the read-only memory-mapped array and the metadata dictionary stored for key, or None if
+        key is not in the cache
+        """
+        fp = os.path.join(self.path, key + '.npy')
+        try:
+            values = np.load(fp, mmap_mode='r')
+            with open(os.path.join(self.path, key + '.json')) as f:
+                metadata = json.load(f)
+            os.utime(fp)  # most recently used
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return values, metadata
+
+    def put(self, key, values, metadata=None):
+        """
+        Stores the array values, with a dictionary of JSON serializable metadata, as the entry for key.
+        Least recently used entries are then evicted if the cache is over max_bytes
+        """
+        values = np.ascontiguousarray(values)
+        for ext, write in [('.npy', lambda f: np.save(f, values)),
+                           ('.json', lambda f: f.write(json.dumps({} if metadata is None else metadata).encode()))]:
+            fp = os.path.join(self.path, key + ext)
+            tmp = '%s.%d.tmp' % (fp, os.getpid())
+            with open(tmp, 'wb') as f:
+                write(f)
+            # replacing the file is atomic, so other processes never read partial entries
+            self._size += os.path.getsize(tmp) - (os.path.getsize(fp) if os.path.isfile(fp) else 0)
+            os.replace(tmp, fp)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def clear(self):
+        """
+        Deletes all the entries of the cache
+        """
+        for key, _, _ in self._entries():
+            self._remove(key)
+        self._size = 0
 
-        elif weighting_scheme == 'EW':
-            # Equal Weights
-            ranks = signals.rank()
-            weights = ranks - ranks.mean()
-            weights = np.sign(weights) / signals.shape[0]
-            weights = weights / (np.nansum(np.abs(weights)) / 2)
+    def covariances(self, ts, dates, h=21, cov_type='rolling', cov_window=756, halflife=60, shrinkage_parameter=1,
+                    n_factors=5):
+        """
+        Covariance matrices of ts on each of the dates, as in FHCovarianceProvider, reading the ones in the cache and
+        calculating and storing the others. Factor models are stored as their loadings and idiosyncratic variances
 
-        else:
-            # Signal Rank Based Portfolio
-            if weighting_scheme.lower().find('rank')== -1:
-                print('Unclear weighting scheme, assuming signal-rank based weights')
-            ranks = signals.rank()
-            weights = ranks - ranks.mean()
-            weights = weights / (np.nansum(np.abs(weights)) / 2)
+        Parameters
+        ----------
+        ts : a DataFrame with daily time series of index/price levels (not returns!)
+        dates : the dates of the covariance matrices
+        h, cov_type, cov_window, halflife, shrinkage_parameter and n_factors : see FHCovarianceProvider
+
+        Returns
+        -------
+        a list with one annualized covariance matrix (DataFrame, or FHFactorCovariance for factor models) per date
+        """
+        ts = ts.astype(float)
+        ts.index = pd.DatetimeIndex(pd.to_datetime(ts.index))
+        dates = list(dates)
+
+        # the matrix on a date depends on the prices up to that date. Dates with too little data also take values from
+        # the unconditional covariance matrix of the full sample (as in the uses_unconditional_cov method of
+        # FHCovarianceProvider), so only their keys include it and new data does not invalidate the other entries.
+        # Factor models depend on the full sample through the unconditional factor model and variances instead, so
+        # the dense unconditional covariance matrix is not calculated for them
+        factor = cov_type == 'factor'
+        row_hashes = pd.util.hash_pandas_object(ts, index=True).to_numpy()
+        positions = ts.index.searchsorted(pd.to_datetime(dates), side='right') - 1
+        counts = np.zeros((len(ts.index) + 1, ts.shape[1]), dtype=int)
+        np.cumsum(ts.notnull().to_numpy(), axis=0, out=counts[1:])
+        unconditional = (np.asarray((ts.index[positions] - ts.index[0]).days < cov_window)
+                         | (counts[positions] <= cov_window).any(axis=1))
+        unc_cov = None
+        if unconditional.any():
+            unc_cov = row_hashes if factor else (np.log(ts).diff(h).cov() * (252 / h)).to_numpy()
+        keys = [self.hash_key(self.version, 'covariance', list(ts.columns), row_hashes[:p + 1],
+                              unc_cov if full_sample else None, h, cov_type, cov_window,
+                              halflife if cov_type == 'ewma' else None, shrinkage_parameter,
+                              n_factors if factor else None)
+                for p, full_sample in zip(positions, unconditional)]
+
+        covs = [None] * len(dates)
+        missing = []
+        for i, key in enumerate(keys):
+            entry = self.get(key)
+            if entry is None:
+                missing.append(i)
+            elif factor:
+                covs[i] = FHFactorCovariance(entry[0][:, :-1], entry[0][:, -1], ts.columns)
+            else:
+                covs[i] = pd.DataFrame(entry[0], index=ts.columns, columns=ts.columns, copy=False)
+
+        if len(missing) > 0:
+            provider = FHCovarianceProvider(ts, h=h, cov_type=cov_type, cov_window=cov_window, halflife=halflife,
+                                            shrinkage_parameter=shrinkage_parameter,
+                                            dates=[dates[i] for i in missing], n_factors=n_factors)
+            for i in missing:
+                covs[i] = provider.get_cov_matrix_on_date(dates[i])
+                if isinstance(covs[i], FHFactorCovariance):
+                    self.put(keys[i], np.column_stack([covs[i].loadings, covs[i].idiosyncratic]))
+                else:
+                    self.put(keys[i], covs[i].to_numpy(dtype=float))
+        return covs
+
+    def map_over_dates(self, weighting_function, n_jobs, *iterables, warm_start=False):
+        """
+        Weights returned by weighting_function for each rebalancing date, as in the map_over_dates method of the
+        FHBacktestAncilliaryFunctions class, reading the ones in the cache and calculating and storing the others.
+        Weights read from the cache have attrs['solver'] equal to 'cache'
+        """
+        arguments = list(zip(*iterables))
+        keys = [self.hash_key(self.version, 'weights', weighting_function, *args) for args in arguments]
+
+        results = [None] * len(arguments)
+        missing = []
+        for i, key in enumerate(keys):
+            entry = self.get(key)
+            if entry is None:
+                missing.append(i)
+            else:
+                values, metadata = entry
+                results[i] = pd.Series(values, index=pd.Index(metadata['index']), copy=False)
+                results[i].attrs.update(solver='cache', iterations=0, warm_start=False)
+
+        if len(missing) > 0:
+            calculated = FHBacktestAncilliaryFunctions.map_over_dates(weighting_function, n_jobs,
+                                                                      *zip(*[arguments[i] for i in missing]),
+                                                                      warm_start=warm_start)
+            for i, weights in zip(missing, calculated):
+                results[i] = weights
+                self.put(keys[i], weights.to_numpy(dtype=float), {'index': weights.index.tolist()})
+        return results
+
+    def _entries(self):
+        """
+        List of (key, last use time, size in bytes) of the entries in the cache
+        """
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.npy'):
+                key = entry.name[:-4]
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                metadata = os.path.join(self.path, key + '.json')
+                size = stat.st_size + (os.path.getsize(metadata) if os.path.isfile(metadata) else 0)
+                entries.append((key, stat.st_mtime_ns, size))
+        return entries
+
+    def _remove(self, key):
+        for ext in ['.npy', '.json']:
+            try:
+                os.remove(os.path.join(self.path, key + ext))
+            except OSError:
+                pass
+
+    def _evict(self):
+        """
+        Deletes the least recently used entries until the cache is within max_bytes
+        """
+        entries = sorted(self._entries(), key=lambda x: x[1])
+        self._size = sum(size for _, _, size in entries)
+        for key, _, size in entries:
+            if self._size <= self.max_bytes:
+                break
+            self._remove(key)
+            self._size -= size
 
-        return weights.astype(float)
 
 class FHLongOnlyWeights(object):
     """
@@ -496,6 +2268,10 @@ class FHLongOnlyWeights(object):
     weights : a Pandas DataFrame containing the time series of notional allocation (weights) on each underlying tracker
               for each rebalancing date
 
+    solver_info : a Pandas DataFrame with the solver used to calculate the weights on each rebalancing date, its
+                  number of iterations and whether it was warm-started from the previous weights
+                  ('cache' for weights read from a FHBacktestCache, only for dynamic weights)
+
     holdings : a Pandas DataFrame containing the time series of the quantitiy held
                on each underlying tracker on all dates
 
@@ -503,6 +2279,9 @@ class FHLongOnlyWeights(object):
 
     backtest : a Pandas Series containing the time series of the indexed cumulative pnl of the strategy
 
+    state : a dictionary with what the append method needs to advance the backtest (None before run_backtest),
+            as in the FHSignalBasedWeights class ('pending_rebalance_costs' is always zero, there are no costs)
+
 
     Methods
     ----------
@@ -516,12 +2295,15 @@ class FHLongOnlyWeights(object):
     run_backtest : runs the strategy, calculating the performance and the attributes backtest, pnl and holdings
                    It also returns the backtest as a Pandas DataFrame
 
+    append : advances the strategy, and its backtest, with the prices of new dates
+
     """
 
 
     def __init__(self, ts, DTINI='1997-12-31', DTEND='today', static = True,
                        weighting_scheme = 'IVP', rebalance='M', rescale_weights = False, vol_target = 0.1,
-                       cov_type='rolling', cov_period=21, cov_window=756, halflife=60):
+                       cov_type='rolling', cov_period=21, cov_window=756, halflife=60, n_factors=5, n_jobs=1,
+                       warm_start=True, cache=None):
         """
         This class implements long-only portfolio strategies.
 
@@ -535,7 +2317,9 @@ class FHLongOnlyWeights(object):
 
         DTEND : a string containing the end date for the backtest (default is 'today')
 
-        static : a Boolean where True is if the strategy has static weights (default) and False otherwise
+        static : a Boolean where True is if the strategy has static weights (default) and False otherwise.
+                 Static weights are the weighting_scheme weights for the expanding covariance matrix on the last date
+                 with prices for all the trackers, falling back to equal weights if they cannot be calculated
 
         weighting_scheme :  a string that defines the strategy weighting scheme to be used as argument on
                             the static_weights method in the FHBacktestAncilliaryFunctions class.
@@ -556,7 +2340,8 @@ class FHLongOnlyWeights(object):
 
         cov_type : is a string with the type of covariance calulation. See the cov_type parameter on the
                     get_cov_matrix_on_date method of the FHBacktestAncilliaryFunctions class.
-                    The default is 'rolling'
+                    The default is 'rolling'. With 'factor' the weighting schemes scale to thousands of assets,
+                    except 'HRP', which forms the dense correlation matrix for its distances (see hrp_weights)
 
         cov_period : an integer used to calculate the rolling returns that will be used in the covariance calculation.
                      See the h parameter on the get_cov_matrix_on_date method of the FHBacktestAncilliaryFunctions class.
@@ -570,6 +2355,22 @@ class FHLongOnlyWeights(object):
         halflife : for cov_type equal to 'ewma' a halflife paramter may be specified. See the cov_window parameter
                    on the get_cov_matrix_on_date method of the FHBacktestAncilliaryFunctions class.
                    The default is 60 bdays, about 3 months, if no parameter is specified
+
+        n_factors : for cov_type equal to 'factor' the number of factors may be specified. See the n_factors
+                    parameter on the get_cov_matrix_on_date method of the FHBacktestAncilliaryFunctions class.
+                    The default is 5 factors
+
+        n_jobs : the number of processes used to calculate the weights on the rebalancing dates. See the
+                 map_over_dates method of the FHBacktestAncilliaryFunctions class. The default is 1, no parallelism.
+                 The optimizations on each rebalancing date are seeded and warm starts are chained in blocks of
+                 dates that do not depend on the number of processes, so the weights do not depend on n_jobs
+
+        warm_start : a Boolean, True (default) to start the optimization on each rebalancing date from the weights of
+                     the previous date, falling back to a cold start if it does not converge. See the map_over_dates
+                     method of the FHBacktestAncilliaryFunctions class
+
+        cache : a FHBacktestCache to read and store the covariance matrices and weights of dynamic strategies
+                (default is None, no cache)
         """
 
         assert isinstance(ts, pd.DataFrame), "input 'ts' must be a pandas DataFrame"
@@ -577,15 +2378,21 @@ class FHLongOnlyWeights(object):
                                 "input 'rescale_weights' must be boolean or string"
 
 
-        # store the names of the underlyings
+        # store the names of the underlyings and what the append method needs to build the strategy again
         self.underlyings = ts.columns
+        self._parameters = dict(DTINI=DTINI, DTEND=DTEND, static=static, weighting_scheme=weighting_scheme,
+                                rebalance=rebalance, rescale_weights=rescale_weights, vol_target=vol_target,
+                                cov_type=cov_type, cov_period=cov_period, cov_window=cov_window, halflife=halflife,
+                                n_factors=n_factors, n_jobs=n_jobs, warm_start=warm_start, cache=cache)
+        self._covariances = None
+        self.state = None
 
         # fill na's and store time series data
-        ts = ts.copy().fillna(method='ffill').dropna(how='all')
+        ts = ts.copy().ffill().dropna(how='all')
         ts.index = pd.DatetimeIndex(pd.to_datetime(ts.index))
-        relevant_time_period = pd.DatetimeIndex([t for t in ts.index if
-                                                 pd.to_datetime(DTINI) <= t <= pd.to_datetime(DTEND)])
+        relevant_time_period = ts.index[(ts.index >= pd.to_datetime(DTINI)) & (ts.index <= pd.to_datetime(DTEND))]
         self.ts = ts.loc[relevant_time_period]
+        self._data = ts
 
         # find and store the rebalancing dates
         baf = FHBacktestAncilliaryFunctions()
@@ -604,13 +2411,22 @@ class FHLongOnlyWeights(object):
                 self.weights = baf.expand_static_weights(self.rebalance_dates, static_weights)
 
         else:
-            dynamic_weights = pd.DataFrame(index=self.rebalance_dates,columns=ts.columns)
-            for r in dynamic_weights.index:
-                cov = baf.get_cov_matrix_on_date(r, ts, cov_type=cov_type, h=cov_period,
-                                                 cov_window=cov_window, halflife=halflife)
-                static_weights = baf.static_weights(weighting_scheme, cov, vol_target=vol_target)
-                dynamic_weights.loc[r] = static_weights.values
+            # covariances are calculated in order of the dates, then the optimizations may run in parallel
+            if cache is None:
+                covariances = FHCovarianceProvider(ts, h=cov_period, cov_type=cov_type, cov_window=cov_window,
+                                                   halflife=halflife, dates=self.rebalance_dates, n_factors=n_factors)
+                covs = [covariances.get_cov_matrix_on_date(r) for r in self.rebalance_dates]
+                self._covariances = covariances
+            else:
+                covs = cache.covariances(ts, self.rebalance_dates, h=cov_period, cov_type=cov_type,
+                                         cov_window=cov_window, halflife=halflife, n_factors=n_factors)
+            map_over_dates = baf.map_over_dates if cache is None else cache.map_over_dates
+            static_weights = map_over_dates(baf.static_weights, n_jobs, repeat(weighting_scheme), covs,
+                                            repeat(vol_target), range(len(covs)), warm_start=warm_start)
+            dynamic_weights = pd.DataFrame(index=self.rebalance_dates, columns=ts.columns,
+                                           data=[w.values for w in static_weights])
             self.weights = dynamic_weights.copy()
+            self.solver_info = baf._solver_info(self.rebalance_dates, static_weights)
 
 
         # default to one if rescale_weights = True
@@ -622,9 +2438,10 @@ class FHLongOnlyWeights(object):
             if rescale_weights == True: # only print this if boolean True
                 print('type of re-scaling not given, rescalling to one')
             self._rescale_weights(by=rsw_string, vol_target=vol_target, cov_type=cov_type,
-                                  h=cov_period, cov_window=cov_window, halflife=halflife)
+                                  h=cov_period, cov_window=cov_window, halflife=halflife, n_factors=n_factors)
 
-    def _rescale_weights(self, by='to_one', vol_target=0.1, h=21, cov_type='rolling', cov_window=756, halflife=60):
+    def _rescale_weights(self, by='to_one', vol_target=0.1, h=21, cov_type='rolling', cov_window=756, halflife=60,
+                         n_factors=5):
         """"
         This function transforms static weights in a dataframe of constant weights having dates_to_expand as index
 
@@ -646,12 +2463,21 @@ class FHLongOnlyWeights(object):
             r_weights = r_weights.fillna(0).multiply(k,axis=0)
         elif by == 'vol':
             num_assets_in_reb_date = self.ts.reindex(self.weights.index).dropna(how='all').count(axis=1)
+            covariances = FHCovarianceProvider(self.ts, h=h, cov_type=cov_type, cov_window=cov_window,
+                                               halflife=halflife, dates=num_assets_in_reb_date.index,
+                                               n_factors=n_factors)
             for r in num_assets_in_reb_date.index:
                 if num_assets_in_reb_date.diff(1).loc[r] != 0:
                     active_assets = r_weights.loc[r][r_weights.loc[r] != 0].index
-                    cov = FHBacktestAncilliaryFunctions.get_cov_matrix_on_date(r, self.ts[active_assets],
-                                                h=h, cov_type=cov_type, cov_window=cov_window, halflife=halflife)
-                    rescale_factor = vol_target / np.sqrt((r_weights.loc[r,active_assets] @ cov) @ r_weights.loc[r,active_assets])
+                    # pairwise estimates, so the covariance of the active assets is a block of the full matrix
+                    cov = covariances.get_cov_matrix_on_date(r)
+                    if isinstance(cov, FHFactorCovariance):
+                        cov = cov.take(cov.index.get_indexer(active_assets))
+                        port_variance = cov.quad_form(r_weights.loc[r, active_assets].to_numpy(dtype=float))
+                    else:
+                        cov = cov.loc[active_assets, active_assets]
+                        port_variance = (r_weights.loc[r,active_assets] @ cov) @ r_weights.loc[r,active_assets]
+                    rescale_factor = vol_target / np.sqrt(port_variance)
                     r_weights.loc[r] = rescale_factor * r_weights.loc[r]
                 else:
                     r_weights.loc[r] = r_weights.loc[:r].iloc[-2].values
@@ -660,7 +2486,7 @@ class FHLongOnlyWeights(object):
                 print('type of re-scaling not recognized, rescalling to one')
             k = 1 / r_weights.sum(axis=1)
             r_weights = r_weights.fillna(0).multiply(k,axis=0)
-        self.weights = r_weights.copy().fillna(method='ffill').dropna(how='all')
+        self.weights = r_weights.copy().ffill().dropna(how='all')
 
 
     def run_backtest(self, backtest_name = 'backtest'):
@@ -673,43 +2499,126 @@ class FHLongOnlyWeights(object):
         """
         # TODO: incorporate transaction costs
 
-        # set up backtest series. Same calendar as the underlying time series and indexed to start at one
-        self.backtest = pd.Series(index=self.ts.index)
-        self.backtest.iloc[0] = 1
-
-        # set up pnl series. Same calendar as the underlying time series and indexed to start at zero pnl on day one
-        self.pnl = pd.Series(index=self.ts.index)
-        self.pnl.iloc[0] = 0
-
         # take the first set of weights available and use those at the start of the backtest
         if min(self.weights.index)>min(self.ts.index):
             w0 = pd.DataFrame(columns=[min(self.ts.index)], index=self.weights.columns, data=self.weights.iloc[0].values)
-            self.weights = self.weights.append(w0.T).sort_index()
-
-        # set up the DataFrame that will store the quantities of each underlying held during the backtest
-        self.holdings = pd.DataFrame(index=self.ts.index,columns=self.ts.columns)
-        self.holdings.iloc[0] = self.weights.iloc[0] / self.ts.iloc[0] # first trade
+            self.weights = pd.concat([self.weights, w0.T]).sort_index()
+
+        # convert prices, weights and rebalancing dates to arrays once and run the strategy on them
+        weights = self.weights.reindex(columns=self.ts.columns)
+        rebalance_positions = np.flatnonzero(self.ts.index.isin(weights.index)[1:]) + 1
+        rebalance_weights = weights.reindex(self.ts.index[rebalance_positions]).to_numpy(dtype=float)
+        backtest, pnl, holdings, _, state = \
+            FHBacktestAncilliaryFunctions.simulate_holdings(self.ts.to_numpy(dtype=float),
+                                                            weights.iloc[0].to_numpy(dtype=float),
+                                                            rebalance_positions, rebalance_weights,
+                                                            return_state=True)
+        self._set_state(state, dict(backtest_name=backtest_name))
+
+        # pnl series, same calendar as the underlying time series and indexed to start at zero pnl on day one
+        self.pnl = pd.Series(index=self.ts.index, data=pnl)
+
+        # the quantities of each underlying held during the backtest
+        self.holdings = pd.DataFrame(index=self.ts.index, columns=self.ts.columns, data=holdings)
+
+        # backtest series, same calendar as the underlying time series and indexed to start at one
+        self.backtest = pd.Series(index=self.ts.index, data=backtest).to_frame(backtest_name)
+        return self.backtest
 
-        # loop over days, running the strategy
-        for t, tm1 in zip(self.backtest.index[1:], self.backtest.index[:-1]):
+    def append(self, new_prices):
+        """
+        Advances the strategy with the prices of new dates, with the same results as building it again on the
+        extended time series with the same parameters (and running the backtest, if run_backtest was called).
+        See the append method of the FHSignalBasedWeights class for when only the new dates are calculated.
+        Static weights come from the covariance matrix on the last date, so they are always calculated again,
+        together with the full backtest
 
-            # calculate pnl as q x change in price
-            prices_t = self.ts.loc[:t].iloc[-1]
-            previous_prices = self.ts.loc[:tm1].iloc[-1]
-            self.pnl[t] = (self.holdings.loc[tm1].copy() * (prices_t -previous_prices)).sum()
+        Parameters
+        ----------
 
-            # acumulate the pnl in the backtest series
-            self.backtest[t] = self.backtest[tm1] + self.pnl[t]
+        new_prices : a Pandas DataFrame with the index/price levels of the underlyings on the dates after the last
+                     date of ts. Missing values are filled forward, as in the constructor
 
-            # check if it is a rebalancing day, if so, recalculate the holdings based on new weights, i.e., rebalance
-            if t in self.weights.index:
-                self.holdings.loc[t] = self.backtest.loc[tm1]*self.weights.loc[t] / self.ts.loc[t]
-            else:
-                self.holdings.loc[t] = self.holdings.loc[tm1].copy()
+        Returns
+        -------
+        the backtest, as run_backtest, or None if run_backtest was not called
+        """
 
-        self.backtest = self.backtest.astype(float).to_frame(backtest_name).copy()
+        baf = FHBacktestAncilliaryFunctions()
+        parameters = self._parameters
+        ts = baf._append_dates(self._data, new_prices, ffill=True)
+        if self._covariances is not None:
+            self._covariances.append(ts)
+
+        relevant_time_period = ts.index[(ts.index >= pd.to_datetime(parameters['DTINI']))
+                                        & (ts.index <= pd.to_datetime(parameters['DTEND']))]
+        rebalance_dates = baf.resample_dates(relevant_time_period, parameters['rebalance'])
+        incremental = (self._covariances is not None and len(self.rebalance_dates) > 0
+                       and relevant_time_period[:len(self.ts.index)].equals(self.ts.index)
+                       and rebalance_dates[:len(self.rebalance_dates)].equals(self.rebalance_dates)
+                       and not self._covariances.uses_unconditional_cov(rebalance_dates).any())
+
+        if not incremental:
+            strategy = FHLongOnlyWeights(ts, **parameters)
+            if self.state is not None:
+                strategy.run_backtest(**self.state['backtest_arguments'])
+            self.__dict__.update(strategy.__dict__)
+            return None if self.state is None else self.backtest
+
+        # weights on the new rebalancing dates, seeded by their position as in the constructor
+        new_dates = rebalance_dates[len(self.rebalance_dates):]
+        covs = [self._covariances.get_cov_matrix_on_date(r) for r in new_dates]
+        arguments = zip(repeat(parameters['weighting_scheme']), covs, repeat(parameters['vol_target']),
+                        range(len(self.rebalance_dates), len(rebalance_dates)))
+        if parameters['warm_start']:
+            initial_weights = self.weights.loc[self.rebalance_dates[-1]].to_numpy(dtype=float)
+            static_weights = baf._warm_started_map(baf.static_weights, arguments, initial_weights,
+                                                   start=len(self.rebalance_dates))
+        else:
+            static_weights = [baf.static_weights(*args) for args in arguments]
+        if len(new_dates) > 0:
+            dynamic_weights = pd.DataFrame(index=new_dates, columns=ts.columns,
+                                           data=[w.values for w in static_weights])
+            self.weights = pd.concat([self.weights, dynamic_weights])
+            self.solver_info = pd.concat([self.solver_info, baf._solver_info(new_dates, static_weights)])
+
+        last = len(self.ts.index) - 1
+        self.rebalance_dates = rebalance_dates
+        self.ts = ts.loc[relevant_time_period]
+        self._data = ts
+        if self.state is None:
+            return None
+
+        # resume the backtest on the last date of the previous run, where a rebalance may happen
+        prices = self.ts.iloc[last:]
+        weights = self.weights.reindex(columns=self.ts.columns)
+        rebalance_positions = prices.index.get_indexer(weights.index[weights.index >= prices.index[0]])
+        rebalance_positions = rebalance_positions[(rebalance_positions > 0) | ((rebalance_positions == 0) & (last > 0))]
+        rebalance_weights = weights.reindex(prices.index[rebalance_positions]).to_numpy(dtype=float)
+        state = dict(q=self.state['holdings'].to_numpy(dtype=float), reb_costs=self.state['pending_rebalance_costs'],
+                     nav=self.state['nav'], previous_nav=self.state['previous_nav'])
+        backtest, pnl, holdings, _, state = \
+            FHBacktestAncilliaryFunctions.simulate_holdings(prices.to_numpy(dtype=float), None, rebalance_positions,
+                                                            rebalance_weights, state=state, return_state=True)
+        self._set_state(state, self.state['backtest_arguments'])
+
+        # the results on the last date of the previous run are replaced, as a rebalance may have been added on it
+        self.pnl = pd.concat([self.pnl, pd.Series(index=prices.index[1:], data=pnl[1:])])
+        self.holdings = pd.concat([self.holdings.iloc[:-1],
+                                   pd.DataFrame(index=prices.index, columns=self.ts.columns, data=holdings)])
+        self.backtest = pd.concat([self.backtest, pd.Series(index=prices.index[1:], data=backtest[1:])
+                                  .to_frame(self.state['backtest_arguments']['backtest_name'])])
         return self.backtest
 
+    def _set_state(self, state, backtest_arguments):
+        """
+        Stores the state returned by simulate_holdings on the last date, with the arguments of run_backtest
+        """
+        self.state = dict(date=self.ts.index[-1], holdings=pd.Series(index=self.ts.columns, data=state['q']),
+                          nav=state['nav'], previous_nav=state['previous_nav'],
+                          pending_rebalance_costs=state['reb_costs'], backtest_arguments=backtest_arguments,
+                          covariances=self._covariances)
+
 class FHSignalBasedWeights(object):
     """
     Implements long-short portfolio strategies
@@ -726,6 +2635,10 @@ class FHSignalBasedWeights(object):
     weights : a Pandas DataFrame containing the time series of notional allocation (weights) on each underlying tracker
               for each rebalancing date
 
+    solver_info : a Pandas DataFrame with the solver used to calculate the weights on each rebalancing date, its
+                  number of iterations and whether it was warm-started from the previous weights
+                  ('cache' for weights read from a FHBacktestCache)
+
     holdings : a Pandas DataFrame containing the time series of the quantitiy held
                on each underlying tracker on all dates
 
@@ -735,6 +2648,13 @@ class FHSignalBasedWeights(object):
 
     backtest : a Pandas Series containing the time series of the indexed cumulative pnl of the strategy
 
+    state : a dictionary with what the append method needs to advance the backtest (None before run_backtest):
+            the last 'date', the quantities of each underlying held into that date before any rebalance on it
+            'holdings', the backtest on that date 'nav' and on the date before 'previous_nav', the rebalancing
+            costs not yet taken out of the pnl 'pending_rebalance_costs', the arguments of run_backtest
+            'backtest_arguments' and the FHCovarianceProvider with the covariance accumulators 'covariances'
+            (None if the weighting scheme does not use covariances). Like the strategy, it can be pickled
+
 
     Methods
     ----------
@@ -742,11 +2662,14 @@ class FHSignalBasedWeights(object):
     run_backtest : runs the strategy, calculating the performance and the attributes backtest, pnl and holdings
                    It also returns the backtest as a Pandas DataFrame
 
+    append : advances the strategy, and its backtest, with the data of new dates
+
     """
 
     def __init__(self, ts, signals, DTINI='1997-12-31', DTEND='today',
                  weighting_scheme = 'IVP', rebalance='M', vol_target = 0.1,
-                 cov_type='rolling', cov_period=21, cov_window=756, halflife=60):
+                 cov_type='rolling', cov_period=21, cov_window=756, halflife=60, n_factors=5, n_jobs=1,
+                 warm_start=True, covariances=None, cache=None):
         """
         This class implements long-short portfolio strategies.
 
@@ -777,7 +2700,9 @@ class FHSignalBasedWeights(object):
 
         cov_type : is a string with the type of covariance calulation. See the cov_type parameter on the
                     get_cov_matrix_on_date method of the FHBacktestAncilliaryFunctions class.
-                    The default is 'rolling'
+                    The default is 'rolling'. With 'factor' the weighting schemes scale to thousands of assets,
+                    except 'vol_target' on the dates where the bounds keep the volatility of the maximum signal
+                    portfolio below the target (see get_cov_matrix_on_date)
 
         cov_period : an integer used to calculate the rolling returns that will be used in the covariance calculation.
                      See the h parameter on the get_cov_matrix_on_date method of the FHBacktestAncilliaryFunctions class.
@@ -791,19 +2716,47 @@ class FHSignalBasedWeights(object):
         halflife : for cov_type equal to 'ewma' a halflife paramter may be specified. See the cov_window parameter
                    on the get_cov_matrix_on_date method of the FHBacktestAncilliaryFunctions class.
                    The default is 60 bdays, about 3 months, if no parameter is specified
+
+        n_factors : for cov_type equal to 'factor' the number of factors may be specified. See the n_factors
+                    parameter on the get_cov_matrix_on_date method of the FHBacktestAncilliaryFunctions class.
+                    The default is 5 factors
+
+        n_jobs : the number of processes used to calculate the weights on the rebalancing dates. See the
+                 map_over_dates method of the FHBacktestAncilliaryFunctions class. The default is 1, no parallelism.
+                 The optimizations on each rebalancing date are seeded and warm starts are chained in blocks of
+                 dates that do not depend on the number of processes, so the weights do not depend on n_jobs
+
+        warm_start : a Boolean, True (default) to start the optimization on each rebalancing date from the weights of
+                     the previous date, falling back to a cold start if it does not converge. See the map_over_dates
+                     method of the FHBacktestAncilliaryFunctions class
+
+        covariances : the covariance matrices used by the weighting scheme, either as a FHCovarianceProvider built on ts
+                      with the covariance parameters above or as a list with one matrix per rebalancing date.
+                      This allows strategies with the same covariance parameters to share them (see FHSignalBasedGrid).
+                      The default is None, calculating the covariance matrices for this strategy only
+
+        cache : a FHBacktestCache to read and store the covariance matrices (unless given in covariances) and weights
+                (default is None, no cache). Weighting schemes without optimizer are calculated for all the
+                rebalancing dates at once, which is faster than reading them, so their weights are not stored
         """
 
         assert isinstance(ts, pd.DataFrame), "input 'ts' must be a pandas DataFrame"
         assert isinstance(signals, pd.DataFrame), "input 'signals' must be a pandas DataFrame"
 
-        # store the names of the underlyings
+        # store the names of the underlyings and what the append method needs to build the strategy again
         self.underlyings = pd.Index([x for x in ts.columns if x in signals.columns])
+        self._parameters = dict(DTINI=DTINI, DTEND=DTEND, weighting_scheme=weighting_scheme, rebalance=rebalance,
+                                vol_target=vol_target, cov_type=cov_type, cov_period=cov_period,
+                                cov_window=cov_window, halflife=halflife, n_factors=n_factors, n_jobs=n_jobs,
+                                warm_start=warm_start, covariances=covariances, cache=cache)
+        self._covariances = None
+        self.state = None
 
         # fill na's and store time series data
-        ts = ts.copy().fillna(method='ffill').dropna(how='all')
+        ts = ts.copy().ffill().dropna(how='all')
         ts.index = pd.DatetimeIndex(pd.to_datetime(ts.index))
         t0 = max(signals.index.min(),pd.to_datetime(DTINI))
-        relevant_time_period = pd.DatetimeIndex([t for t in ts.index if t0 <= t <= pd.to_datetime(DTEND)])
+        relevant_time_period = ts.index[(ts.index >= t0) & (ts.index <= pd.to_datetime(DTEND))]
         self.ts = ts.loc[relevant_time_period,self.underlyings]
 
         # find and store the rebalancing dates
@@ -811,18 +2764,36 @@ class FHSignalBasedWeights(object):
         self.rebalance_dates = baf.resample_dates(relevant_time_period, rebalance)
 
         # get weights according to given weighting scheme
-        dynamic_weights = pd.DataFrame(index=self.rebalance_dates, columns=self.underlyings)
-        for r in dynamic_weights.index:
-            if weighting_scheme in ['vol_target','ERC','IVP']:
-                cov = baf.get_cov_matrix_on_date(r, ts, h=cov_period, cov_type=cov_type,
-                                                                cov_window=cov_window, halflife=halflife)
+        # covariances are calculated in order of the dates, then the optimizations may run in parallel
+        if weighting_scheme in ['vol_target','ERC','IVP']:
+            if covariances is None and cache is not None:
+                covariances = cache.covariances(ts, self.rebalance_dates, h=cov_period, cov_type=cov_type,
+                                                cov_window=cov_window, halflife=halflife, n_factors=n_factors)
+            elif covariances is None:
+                covariances = FHCovarianceProvider(ts, h=cov_period, cov_type=cov_type, cov_window=cov_window,
+                                                   halflife=halflife, dates=self.rebalance_dates, n_factors=n_factors)
+            if isinstance(covariances, FHCovarianceProvider):
+                self._covariances = covariances
+                covs = [covariances.get_cov_matrix_on_date(r) for r in self.rebalance_dates]
             else:
-                cov = None
-            static_weights = baf.cross_sectional_weights_from_signals(signals.loc[r],
-                                                                      weighting_scheme=weighting_scheme,
-                                                                      cov=cov, vol_target=vol_target)
-            dynamic_weights.loc[r] = static_weights.values
+                covs = list(covariances)
+                assert len(covs) == len(self.rebalance_dates), "one covariance matrix per rebalancing date is needed"
+        else:
+            covs = [None] * len(self.rebalance_dates)
+        if baf._signal_scheme(weighting_scheme) in ['vol_target', 'ERC']:
+            map_over_dates = baf.map_over_dates if cache is None else cache.map_over_dates
+            static_weights = map_over_dates(baf.cross_sectional_weights_from_signals, n_jobs,
+                                            [signals.loc[r] for r in self.rebalance_dates], repeat(weighting_scheme),
+                                            covs, repeat(vol_target), range(len(covs)), warm_start=warm_start)
+            dynamic_weights = pd.DataFrame(index=self.rebalance_dates, columns=self.underlyings,
+                                           data=[w.values for w in static_weights])
+        else:
+            # the other weighting schemes are row-wise, so the weights on all dates are calculated at once
+            dynamic_weights = self._panel_weights(signals, self.rebalance_dates, weighting_scheme, covs)
+            static_weights = [None] * len(self.rebalance_dates)
         self.weights = dynamic_weights.copy()
+        self.solver_info = baf._solver_info(self.rebalance_dates, static_weights)
+        self._data = (ts, signals)
 
     def run_backtest(self, backtest_name = 'backtest', holdings_costs_bps_pa = 0, rebalance_costs_bps = 0):
         """"
@@ -836,88 +2807,433 @@ class FHSignalBasedWeights(object):
 
         holdings_costs_bps_pa : a Pandas Series with the cost per year in bps of holding 100% notional of each underlying
                                 if a float or an integer is given, that number will be used for all underlyings
+                                an array or list is taken as one cost per underlying, in the order of the columns of ts
                                 Default is zero holdings costs
 
         rebalance_costs_bps : a Pandas Series with the cost of trading in/out of 100% notional of each underlying
                               if a float or an integer is given, that number will be used for all underlyings
+                              an array or list is taken as one cost per underlying, in the order of the columns of ts
                               Default is zero holdings costs
 
-        """
-
-        # set up backtest series. Same calendar as the underlying time series and indexed to start at one
-        self.backtest = pd.Series(index=self.ts.index)
-        self.backtest.iloc[0] = 1
+        The traded notional on a rebalancing date is the absolute change in the quantity held of each underlying
+        times its price. Rebalancing costs are taken out of the pnl of the day after the rebalance
 
-        # set up pnl series. Same calendar as the underlying time series and indexed to start at zero pnl on day one
-        self.pnl = pd.Series(index=self.ts.index)
-        self.pnl.iloc[0] = 0
+        """
 
         # take the first set of weights available and use those at the start of the backtest
         if min(self.weights.index)>min(self.ts.index):
             w0 = pd.DataFrame(columns=[min(self.ts.index)], index=self.weights.columns, data=self.weights.iloc[0].values)
-            self.weights = self.weights.append(w0.T).sort_index()
+            self.weights = pd.concat([self.weights, w0.T]).sort_index()
+
+        # per underlying rebalancing costs (tc) and holdings costs (hc)
+        tc = self._costs_per_underlying(rebalance_costs_bps)
+        hc = self._costs_per_underlying(holdings_costs_bps_pa)
+
+        # convert prices, weights, rebalancing dates and costs to arrays once and run the strategy on them
+        weights = self.weights.reindex(columns=self.ts.columns)
+        rebalance_positions = np.flatnonzero(self.ts.index.isin(weights.index)[1:]) + 1
+        rebalance_weights = weights.reindex(self.ts.index[rebalance_positions]).to_numpy(dtype=float)
+        days = np.zeros(len(self.ts.index), dtype=int)
+        days[1:] = np.diff(self.ts.index.values).astype('timedelta64[D]').astype(int)
+        backtest, pnl, holdings, traded_notional, state = \
+            FHBacktestAncilliaryFunctions.simulate_holdings(self.ts.to_numpy(dtype=float),
+                                                            weights.iloc[0].to_numpy(dtype=float),
+                                                            rebalance_positions, rebalance_weights,
+                                                            holdings_costs=hc, rebalance_costs=tc, days=days,
+                                                            return_state=True)
+        self._set_state(state, dict(backtest_name=backtest_name, holdings_costs_bps_pa=holdings_costs_bps_pa,
+                                    rebalance_costs_bps=rebalance_costs_bps))
+
+        # pnl series, same calendar as the underlying time series and indexed to start at zero pnl on day one
+        self.pnl = pd.Series(index=self.ts.index, data=pnl)
+
+        # the quantities of each underlying held and the notional traded of each underlying per day
+        self.holdings = pd.DataFrame(index=self.ts.index, columns=self.ts.columns, data=holdings)
+        self.traded_notional = pd.DataFrame(index=self.ts.index, columns=self.ts.columns, data=traded_notional)
+
+        # backtest series, same calendar as the underlying time series and indexed to start at one
+        self.backtest = pd.Series(index=self.ts.index, data=backtest).to_frame(backtest_name)
+        return self.backtest
+
+    def append(self, new_prices, new_signals=None):
+        """
+        Advances the strategy with the data of new dates. The weights, solver_info and, after run_backtest, the
+        backtest, pnl, holdings and traded_notional are the same as the ones of the strategy built again on the
+        extended data, with the same parameters, and backtested with the same arguments.
+
+        When the strategy only depends on the data available on each date, only the new dates are calculated:
+        covariance matrices continue from the accumulators of the FHCovarianceProvider, weights are calculated on
+        the new rebalancing dates only (warm-started from the last weights, as in the constructor) and the backtest
+        resumes from state.
+        Otherwise, the strategy is built again over all the dates, which happens when some covariance matrix uses
+        the unconditional covariance matrix of the full sample (see the uses_unconditional_cov method of the
+        FHCovarianceProvider class) and when a cache is used.
+        The last date may become a rebalancing date with the new dates (see resample_dates), so its holdings and
+        traded notional may change
+
+        Parameters
+        ----------
 
-        # set up the DataFrame that will store the quantities of each underlying held during the backtest
-        self.holdings = pd.DataFrame(index=self.ts.index,columns=self.ts.columns)
-        self.holdings.iloc[0] = self.weights.iloc[0] / self.ts.iloc[0]
+        new_prices : a Pandas DataFrame with the index/price levels of the underlyings on the dates after the last
+                     date of ts. Missing values are filled forward, as in the constructor
 
-        # set up the DataFrame that will store the traded notionals of each underlying per day
-        self.traded_notional = pd.DataFrame(index=self.ts.index,columns=self.ts.columns,data=0)
+        new_signals : a Pandas DataFrame with the signals on the dates after the last date of signals, or None if
+                      the signals given to the constructor already have the new dates
 
+        Returns
+        -------
+        the backtest, as run_backtest, or None if run_backtest was not called
+        """
 
-        # set up the tc Series that will keep the rebalancing costs
-        if isinstance(rebalance_costs_bps, pd.Series):
-            tc = rebalance_costs_bps[self.ts.columns] / 10000
-        elif isinstance(rebalance_costs_bps, float) or isinstance(rebalance_costs_bps, int):
-            tc = pd.Series(index=self.ts.columns,data=rebalance_costs_bps/10000)
+        baf = FHBacktestAncilliaryFunctions()
+        parameters = self._parameters
+        if self._covariances is None and parameters['covariances'] is not None \
+                and parameters['weighting_scheme'] in ['vol_target', 'ERC', 'IVP']:
+            raise ValueError('append needs covariances given as a FHCovarianceProvider (or None), not as a list')
+
+        ts, signals = self._data
+        ts = baf._append_dates(ts, new_prices, ffill=True)
+        if new_signals is not None:
+            signals = baf._append_dates(signals, new_signals)
+        if self._covariances is not None:
+            self._covariances.append(ts)
+
+        t0 = max(signals.index.min(), pd.to_datetime(parameters['DTINI']))
+        relevant_time_period = ts.index[(ts.index >= t0) & (ts.index <= pd.to_datetime(parameters['DTEND']))]
+        rebalance_dates = baf.resample_dates(relevant_time_period, parameters['rebalance'])
+        incremental = (parameters['cache'] is None and len(self.rebalance_dates) > 0
+                       and relevant_time_period[:len(self.ts.index)].equals(self.ts.index)
+                       and rebalance_dates[:len(self.rebalance_dates)].equals(self.rebalance_dates)
+                       and (self._covariances is None
+                            or not self._covariances.uses_unconditional_cov(rebalance_dates).any()))
+
+        if not incremental:
+            strategy = FHSignalBasedWeights(ts, signals, **parameters)
+            if self.state is not None:
+                strategy.run_backtest(**self.state['backtest_arguments'])
+            self.__dict__.update(strategy.__dict__)
+            return None if self.state is None else self.backtest
+
+        # weights on the new rebalancing dates, seeded by their position as in the constructor
+        new_dates = rebalance_dates[len(self.rebalance_dates):]
+        if self._covariances is not None:
+            covs = [self._covariances.get_cov_matrix_on_date(r) for r in new_dates]
         else:
-            tc = pd.Series(index=self.ts.columns, data=0)
+            covs = [None] * len(new_dates)
+        if baf._signal_scheme(parameters['weighting_scheme']) not in ['vol_target', 'ERC']:
+            dynamic_weights = self._panel_weights(signals, new_dates, parameters['weighting_scheme'], covs)
+            static_weights = [None] * len(new_dates)
+        else:
+            arguments = zip([signals.loc[r] for r in new_dates], repeat(parameters['weighting_scheme']), covs,
+                            repeat(parameters['vol_target']), range(len(self.rebalance_dates), len(rebalance_dates)))
+            if parameters['warm_start']:
+                initial_weights = self.weights.loc[self.rebalance_dates[-1]].to_numpy(dtype=float)
+                static_weights = baf._warm_started_map(baf.cross_sectional_weights_from_signals, arguments,
+                                                       initial_weights, start=len(self.rebalance_dates))
+            else:
+                static_weights = [baf.cross_sectional_weights_from_signals(*args) for args in arguments]
+            dynamic_weights = pd.DataFrame(index=new_dates, columns=self.underlyings,
+                                           data=[w.values for w in static_weights])
+        if len(new_dates) > 0:
+            self.weights = pd.concat([self.weights, dynamic_weights])
+            self.solver_info = pd.concat([self.solver_info, baf._solver_info(new_dates, static_weights)])
+
+        last = len(self.ts.index) - 1
+        self.rebalance_dates = rebalance_dates
+        self.ts = ts.loc[relevant_time_period, self.underlyings]
+        self._data = (ts, signals)
+        if self.state is None:
+            return None
+
+        # resume the backtest on the last date of the previous run, where a rebalance may happen
+        arguments = self.state['backtest_arguments']
+        prices = self.ts.iloc[last:]
+        weights = self.weights.reindex(columns=self.ts.columns)
+        rebalance_positions = prices.index.get_indexer(weights.index[weights.index >= prices.index[0]])
+        rebalance_positions = rebalance_positions[(rebalance_positions > 0) | ((rebalance_positions == 0) & (last > 0))]
+        rebalance_weights = weights.reindex(prices.index[rebalance_positions]).to_numpy(dtype=float)
+        days = np.zeros(len(prices.index), dtype=int)
+        days[1:] = np.diff(prices.index.values).astype('timedelta64[D]').astype(int)
+        state = dict(q=self.state['holdings'].to_numpy(dtype=float), reb_costs=self.state['pending_rebalance_costs'],
+                     nav=self.state['nav'], previous_nav=self.state['previous_nav'])
+        backtest, pnl, holdings, traded_notional, state = \
+            FHBacktestAncilliaryFunctions.simulate_holdings(prices.to_numpy(dtype=float), None,
+                                                            rebalance_positions, rebalance_weights,
+                                                            holdings_costs=self._costs_per_underlying(
+                                                                arguments['holdings_costs_bps_pa']),
+                                                            rebalance_costs=self._costs_per_underlying(
+                                                                arguments['rebalance_costs_bps']),
+                                                            days=days, state=state, return_state=True)
+        self._set_state(state, arguments)
+
+        # the results on the last date of the previous run are replaced, as a rebalance may have been added on it
+        self.pnl = pd.concat([self.pnl, pd.Series(index=prices.index[1:], data=pnl[1:])])
+        self.holdings = pd.concat([self.holdings.iloc[:-1],
+                                   pd.DataFrame(index=prices.index, columns=self.ts.columns, data=holdings)])
+        self.traded_notional = pd.concat([self.traded_notional.iloc[:-1],
+                                          pd.DataFrame(index=prices.index, columns=self.ts.columns,
+                                                       data=traded_notional)])
+        self.backtest = pd.concat([self.backtest, pd.Series(index=prices.index[1:], data=backtest[1:])
+                                  .to_frame(arguments['backtest_name'])])
+        return self.backtest
+
+    def _set_state(self, state, backtest_arguments):
+        """
+        Stores the state returned by simulate_holdings on the last date, with the arguments of run_backtest
+        """
+        self.state = dict(date=self.ts.index[-1], holdings=pd.Series(index=self.ts.columns, data=state['q']),
+                          nav=state['nav'], previous_nav=state['previous_nav'],
+                          pending_rebalance_costs=state['reb_costs'], backtest_arguments=backtest_arguments,
+                          covariances=self._covariances)
 
-        # set up the hc Series that will keep the holding costs
-        if isinstance(holdings_costs_bps_pa, pd.Series):
-            hc = holdings_costs_bps_pa[self.ts.columns] / 10000
-        elif isinstance(holdings_costs_bps_pa, float) or isinstance(holdings_costs_bps_pa, int):
-            hc = pd.Series(index=self.ts.columns, data=holdings_costs_bps_pa / 10000)
+    def _panel_weights(self, signals, dates, weighting_scheme, covs):
+        """
+        Weights of a weighting scheme without optimizer on the given dates, calculated for all of them at once by
+        the panel_weights_from_signals method of the FHBacktestAncilliaryFunctions class, with the volatilities in the
+        covariance matrices covs (a list with one matrix, or None, per date)
+        """
+        if len(dates) == 0:
+            return pd.DataFrame(index=dates, columns=self.underlyings, dtype=float)
+        vols = None
+        if covs[0] is not None:
+            vols = pd.DataFrame(index=dates, columns=covs[0].index,
+                                data=[np.sqrt(FHBacktestAncilliaryFunctions._variances(cov)) for cov in covs])
+        weights = FHBacktestAncilliaryFunctions.panel_weights_from_signals(signals.loc[dates], weighting_scheme, vols)
+        return weights.reindex(columns=self.underlyings)
+
+    def _costs_per_underlying(self, costs_bps):
+        """"
+        Converts costs in bps, given as a Pandas Series, a float/integer or a per underlying array like structure
+        (in the order of the columns of ts), to a float array of costs (as fractions) for each underlying
+        """
+        if isinstance(costs_bps, pd.Series):
+            costs = costs_bps[self.ts.columns] / 10000
+        elif isinstance(costs_bps, float) or isinstance(costs_bps, int):
+            costs = pd.Series(index=self.ts.columns, data=costs_bps / 10000)
+        elif isinstance(costs_bps, (np.ndarray, list, tuple)):
+            assert len(costs_bps) == self.ts.shape[1], "costs must have one value per underlying"
+            costs = pd.Series(index=self.ts.columns, data=np.asarray(costs_bps, dtype=float) / 10000)
         else:
-            hc = pd.Series(index=self.ts.columns, data=0)
+            costs = pd.Series(index=self.ts.columns, data=0)
+        return costs.to_numpy(dtype=float)
+
+
+class FHSignalBasedGrid(object):
+    """
+    Runs FHSignalBasedWeights strategies for all the combinations of a grid of parameters, such as rebalancing
+    frequencies, weighting schemes, volatility targets and covariance parameters.
 
-        reb_costs = 0
+    The stages shared by the strategies are calculated only once: the forward-filled time series, the rebalancing
+    dates of each rebalancing frequency and the covariance matrices of each set of covariance parameters, with one
+    FHCovarianceProvider per set serving all the rebalancing dates that use it. Strategies that differ only on
+    parameters their weighting scheme does not use, such as the volatility target of rank based weights, are run
+    once. The strategies are then independent from each other, so they can run in a pool of processes.
 
-        # loop over days, running the strategy
-        for t, tm1 in zip(self.backtest.index[1:], self.backtest.index[:-1]):
+    Attributes
+    ----------
 
-            # calculate pnl as q x change in price
-            prices_t = self.ts.loc[:t].iloc[-1]
-            previous_prices = self.ts.loc[:tm1].iloc[-1]
-            self.pnl[t] = (self.holdings.loc[tm1] * (prices_t -previous_prices)).sum()
+    parameters : a Pandas DataFrame with one row per strategy and one column per parameter of the grid
 
-            # take out holdings costs from the pnl
-            holdings_costs = (self.holdings.loc[tm1] * previous_prices * hc * (t - tm1).days/365.25).sum()
+    backtests : a Pandas DataFrame containing the indexed cumulative pnl of each strategy, with the parameters of the
+                grid as columns (a MultiIndex)
 
-            # acumulate the net of transaction costs pnl in the backtest series
-            self.backtest[t] = self.backtest[tm1] + self.pnl[t] - reb_costs - holdings_costs
-            reb_costs = 0
+    results : a Pandas DataFrame with the parameters and summary statistics of each strategy, one row per strategy:
+                'return' : annualized return
+                'volatility' : annualized volatility of daily returns
+                'sharpe' : ratio of return to volatility
+                'max_drawdown' : largest drop from a previous peak, as a negative fraction
+                'turnover' : average notional traded per year, as a fraction of the strategy value
 
-            if t in self.weights.index: # if it is a rebalance date
-                # recalculate the notionals based on the new weights, i.e., rebalance
-                self.holdings.loc[t,:] = (self.backtest.loc[tm1]*self.weights.loc[t] / self.ts.loc[t]).values
 
-                # calcualte the trasaction costs to be subtracted from the next day pnl
-                self.traded_notional.loc[t,:] = (np.abs(self.holdings.loc[t] - self.backtest.loc[tm1])* prices_t).values
-                reb_costs = (self.traded_notional.loc[t,:] * tc).sum()
-            else:
-                self.holdings.loc[t] = self.holdings.loc[tm1].copy()
+    Methods
+    ----------
 
+    run_backtests : runs all the strategies, calculating the attributes backtests and results
+                    It also returns the backtests as a Pandas DataFrame
 
-        self.backtest = self.backtest.astype(float).to_frame(backtest_name).copy()
-        return self.backtest
+    """
+
+    # parameters of FHSignalBasedWeights that the grid can take
+    grid_parameters = ['weighting_scheme', 'rebalance', 'vol_target', 'cov_type', 'cov_period', 'cov_window',
+                       'halflife', 'n_factors', 'warm_start']
+
+    # data sent once to each process of the pool
+    _worker_data = {}
+
+    def __init__(self, ts, signals, grid, DTINI='1997-12-31', DTEND='today', n_jobs=1):
+        """
+        Parameters
+        ----------
+
+        ts : a Pandas DataFrame containing the indexed time series of returns for a set of trackers, as in
+             FHSignalBasedWeights
+
+        signals : a Pandas DataFrame containing the time series of the signals, as in FHSignalBasedWeights
+
+        grid : a dictionary with the name of FHSignalBasedWeights parameters as keys and lists of values as values,
+               as in {'rebalance': ['ME', 'QE'], 'weighting_scheme': ['IVP', 'ERC'], 'vol_target': [0.05, 0.1]}.
+               Parameters not in the grid take the default values of FHSignalBasedWeights. The names are in the
+               grid_parameters attribute and the values must be hashable, e.g., rebalancing codes as strings
+
+        DTINI : a string containing the initial date for the backtests (default is '1997-12-31')
+
+        DTEND : a string containing the end date for the backtests (default is 'today')
+
+        n_jobs : the number of processes used to run the strategies. 1 (default) runs serially in the current
+                 process and -1 uses all CPUs
+        """
+
+        assert isinstance(ts, pd.DataFrame), "input 'ts' must be a pandas DataFrame"
+        assert isinstance(signals, pd.DataFrame), "input 'signals' must be a pandas DataFrame"
+        assert isinstance(grid, dict) and len(grid) > 0, "input 'grid' must be a non-empty dictionary"
+        unknown = [k for k in grid if k not in self.grid_parameters]
+        assert len(unknown) == 0, "parameters %s can not be in the grid" % str(unknown)
 
+        # fill na's once for all strategies
+        ts = ts.copy().ffill().dropna(how='all')
+        ts.index = pd.DatetimeIndex(pd.to_datetime(ts.index))
+        self.ts = ts
+        self.signals = signals
+        self.DTINI = DTINI
+        self.DTEND = DTEND
+        self.n_jobs = n_jobs
+
+        # one row per combination of the values in the grid
+        values = [list(v) if isinstance(v, (list, tuple, np.ndarray, pd.Index)) else [v] for v in grid.values()]
+        self.parameters = pd.MultiIndex.from_product(values, names=list(grid.keys())).to_frame(index=False)
+
+    def run_backtests(self, holdings_costs_bps_pa=0, rebalance_costs_bps=0):
+        """
+        Runs all the strategies, calculating the attributes backtests and results
+
+        Parameters
+        ----------
+
+        holdings_costs_bps_pa, rebalance_costs_bps : costs used in all strategies. See the run_backtest method of
+                                                     FHSignalBasedWeights
 
+        Returns
+        -------
+        a Pandas DataFrame with the indexed cumulative pnl of each strategy
+        """
+
+        baf = FHBacktestAncilliaryFunctions()
+        defaults = {k: v.default for k, v in inspect.signature(FHSignalBasedWeights.__init__).parameters.items()
+                    if k in self.grid_parameters}
+        strategies = [dict(defaults, **row) for row in self.parameters.to_dict('records')]
+
+        # rebalancing dates for each frequency, on the same calendar used by FHSignalBasedWeights
+        t0 = max(self.signals.index.min(), pd.to_datetime(self.DTINI))
+        relevant_time_period = self.ts.index[(self.ts.index >= t0) & (self.ts.index <= pd.to_datetime(self.DTEND))]
+        rebalance_dates = {r: baf.resample_dates(relevant_time_period, r)
+                           for r in dict.fromkeys(p['rebalance'] for p in strategies)}
+
+        # one covariance provider per set of covariance parameters, serving the union of the rebalancing dates of
+        # the strategies that use it. Matrices are calculated once per date and shared by all these strategies
+        specs = [self._cov_spec(p) for p in strategies]
+        spec_dates = {}
+        for spec, p in zip(specs, strategies):
+            if spec is not None:
+                spec_dates[spec] = spec_dates.get(spec, pd.DatetimeIndex([])).union(rebalance_dates[p['rebalance']])
+        matrices = {}
+        for spec, dates in spec_dates.items():
+            cov_type, h, cov_window, halflife, n_factors = spec
+            provider = FHCovarianceProvider(self.ts, h=h, cov_type=cov_type, cov_window=cov_window,
+                                            halflife=60 if halflife is None else halflife, dates=dates,
+                                            n_factors=5 if n_factors is None else n_factors)
+            matrices[spec] = {d: provider.get_cov_matrix_on_date(d) for d in dates}
+
+        # strategies that differ only on parameters not used by their weighting scheme are run only once
+        keys = [self._strategy_key(p, spec) for p, spec in zip(strategies, specs)]
+        tasks = []
+        for key in dict.fromkeys(keys):
+            p, spec = strategies[keys.index(key)], specs[keys.index(key)]
+            dates = rebalance_dates[p['rebalance']]
+            covariances = None if spec is None else [matrices[spec][d] for d in dates]
+            kwargs = dict(p, rebalance=list(dates), DTINI=self.DTINI, DTEND=self.DTEND, covariances=covariances)
+            tasks.append(kwargs)
+        backtest_kwargs = dict(holdings_costs_bps_pa=holdings_costs_bps_pa, rebalance_costs_bps=rebalance_costs_bps)
+
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+        if n_jobs is None or n_jobs <= 1:
+            outputs = [self._run_strategy(self.ts, self.signals, kwargs, backtest_kwargs) for kwargs in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks)), initializer=self._init_worker,
+                                     initargs=(self.ts, self.signals)) as executor:
+                outputs = list(executor.map(self._run_strategy_in_worker, tasks, repeat(backtest_kwargs)))
+        outputs = dict(zip(dict.fromkeys(keys), outputs))
+        outputs = [outputs[key] for key in keys]
+
+        columns = pd.MultiIndex.from_frame(self.parameters)
+        self.backtests = pd.concat([backtest for backtest, _ in outputs], axis=1)
+        self.backtests.columns = columns
+        self.results = pd.concat([self.parameters, pd.DataFrame([statistics for _, statistics in outputs])], axis=1)
+        return self.backtests
 
+    @staticmethod
+    def _cov_spec(parameters):
+        """
+        The covariance parameters that change the covariance matrices of a strategy, or None if its weighting scheme
+        does not use them
+        """
+        if parameters['weighting_scheme'] not in ['vol_target', 'ERC', 'IVP']:
+            return None
+        cov_type = parameters['cov_type']
+        cov_type = cov_type if cov_type in ['rolling', 'expanding', 'ewma', 'factor'] else 'rolling'
+        halflife = parameters['halflife'] if cov_type == 'ewma' else None
+        n_factors = parameters['n_factors'] if cov_type == 'factor' else None
+        return cov_type, parameters['cov_period'], parameters['cov_window'], halflife, n_factors
 
+    @staticmethod
+    def _strategy_key(parameters, cov_spec):
+        """
+        The parameters that change the weights of a strategy
+        """
+        optimized = parameters['weighting_scheme'] in ['vol_target', 'ERC']
+        return (parameters['weighting_scheme'], parameters['rebalance'], cov_spec,
+                parameters['vol_target'] if optimized else None, parameters['warm_start'] if optimized else None)
 
+    @staticmethod
+    def _run_strategy(ts, signals, kwargs, backtest_kwargs):
+        """
+        Runs one strategy, returning its backtest and summary statistics
+        """
+        strategy = FHSignalBasedWeights(ts, signals, **kwargs)
+        backtest = strategy.run_backtest(**backtest_kwargs).iloc[:, 0]
+        return backtest, FHSignalBasedGrid.summary_statistics(backtest, strategy.traded_notional)
 
+    @staticmethod
+    def _init_worker(ts, signals):
+        FHSignalBasedGrid._worker_data['ts'] = ts
+        FHSignalBasedGrid._worker_data['signals'] = signals
 
+    @staticmethod
+    def _run_strategy_in_worker(kwargs, backtest_kwargs):
+        data = FHSignalBasedGrid._worker_data
+        return FHSignalBasedGrid._run_strategy(data['ts'], data['signals'], kwargs, backtest_kwargs)
 
+    @staticmethod
+    def summary_statistics(backtest, traded_notional=None):
+        """
+        Summary statistics of a backtest
 
+        Parameters
+        ----------
+        backtest : a Pandas Series with the indexed cumulative pnl of a strategy
+        traded_notional : a Pandas DataFrame with the notional traded on each underlying on each date (optional)
 
+        Returns
+        -------
+        a dictionary with the annualized return and volatility, Sharpe ratio, maximum drawdown and, if the traded
+        notional is given, the turnover (average notional traded per year, as a fraction of the strategy value)
+        """
+        years = (backtest.index[-1] - backtest.index[0]).days / 365.25
+        ann_return = (backtest.iloc[-1] / backtest.iloc[0]) ** (1 / years) - 1 if years > 0 else np.nan
+        volatility = backtest.pct_change().std() * np.sqrt(252)
+        statistics = {'return': ann_return,
+                      'volatility': volatility,
+                      'sharpe': ann_return / volatility if volatility > 0 else np.nan,
+                      'max_drawdown': (backtest / backtest.cummax() - 1).min()}
+        if traded_notional is not None:
+            statistics['turnover'] = (traded_notional.sum(axis=1) / backtest).sum() / years if years > 0 else np.nan
+        return statistics
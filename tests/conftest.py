@@ -0,0 +1,20 @@
+import os
+import sys
+import importlib.util
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='session')
+def backtesting():
+    """
+    The portfolio/backtesting.py module. It is loaded from its file because portfolio/__init__.py imports names that
+    portfolio/performance.py does not define, so the package itself cannot be imported. It is registered in
+    sys.modules, so that its objects can be pickled
+    """
+    spec = importlib.util.spec_from_file_location('backtesting', os.path.join(ROOT, 'portfolio', 'backtesting.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['backtesting'] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,74 @@
+"""
+append gives the same strategy as building it again on the extended data, with the same parameters, and running
+the same backtest: weights, solver_info, backtest, pnl, holdings and traded_notional are equal, not only close
+"""
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(7)
+    index = pd.bdate_range('2005-01-03', periods=1500)
+    returns = rng.normal(0.0003, 0.01, (len(index), 6)) + rng.normal(0, 0.006, (len(index), 1))
+    ts = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index, columns=list('ABCDEF'))
+    ts.iloc[:100, 2] = np.nan
+    ts = ts.mask(rng.random(ts.shape) < 0.01)  # missing prices are filled forward
+    signals = np.log(ts.ffill()).diff(126)
+    return ts, signals
+
+
+def split(df, cut):
+    return df.iloc[:cut], df.iloc[cut:cut + 1], df.iloc[cut + 1:]
+
+
+def assert_same_strategy(appended, rebuilt, attributes):
+    for name in attributes:
+        assert getattr(appended, name).equals(getattr(rebuilt, name)), name
+
+
+@pytest.mark.parametrize('weighting_scheme', ['vol_target', 'ERC', 'IVP', 'rank'])
+def test_signal_based_append(backtesting, data, weighting_scheme):
+    ts, signals = data
+    parameters = dict(DTINI='2006-06-30', weighting_scheme=weighting_scheme, rebalance='ME', cov_window=252)
+    costs = dict(holdings_costs_bps_pa=25, rebalance_costs_bps=pd.Series(index=ts.columns, data=np.arange(1., 7.)))
+    first, day, rest = split(ts, 1100)
+
+    strategy = backtesting.FHSignalBasedWeights(first, signals.iloc[:1100], **parameters)
+    strategy.run_backtest(**costs)
+    strategy = pickle.loads(pickle.dumps(strategy))
+    strategy.append(day, signals.iloc[1100:1101])
+    strategy.append(rest, signals.iloc[1101:])
+
+    rebuilt = backtesting.FHSignalBasedWeights(ts, signals, **parameters)
+    rebuilt.run_backtest(**costs)
+    assert_same_strategy(strategy, rebuilt, ['weights', 'solver_info', 'backtest', 'pnl', 'holdings',
+                                             'traded_notional'])
+
+
+@pytest.mark.parametrize('weighting_scheme', ['IVP', 'MVR', 'ERC'])
+def test_long_only_append(backtesting, data, weighting_scheme):
+    ts, _ = data
+    parameters = dict(DTINI='2006-06-30', static=False, weighting_scheme=weighting_scheme, rebalance='ME',
+                      cov_window=252)
+    first, day, rest = split(ts, 1100)
+
+    strategy = backtesting.FHLongOnlyWeights(first, **parameters)
+    strategy.run_backtest()
+    strategy = pickle.loads(pickle.dumps(strategy))
+    strategy.append(day)
+    strategy.append(rest)
+
+    rebuilt = backtesting.FHLongOnlyWeights(ts, **parameters)
+    rebuilt.run_backtest()
+    assert_same_strategy(strategy, rebuilt, ['weights', 'solver_info', 'backtest', 'pnl', 'holdings'])
+
+
+def test_append_without_backtest(backtesting, data):
+    ts, signals = data
+    strategy = backtesting.FHSignalBasedWeights(ts.iloc[:1100], signals, DTINI='2006-06-30', weighting_scheme='zscores')
+    assert strategy.append(ts.iloc[1100:]) is None
+    rebuilt = backtesting.FHSignalBasedWeights(ts, signals, DTINI='2006-06-30', weighting_scheme='zscores')
+    assert_same_strategy(strategy, rebuilt, ['weights', 'solver_info'])
@@ -0,0 +1,42 @@
+"""
+Covariance matrices stored in a FHBacktestCache are keyed by the prices up to their date, so extending the prices with
+new dates only recalculates the matrices on the dates that use the unconditional covariance matrix of the full sample
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope='module')
+def ts():
+    rng = np.random.default_rng(5)
+    index = pd.bdate_range('2010-01-01', periods=1200)
+    ts = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, (len(index), 4)), axis=0)), index=index,
+                      columns=list('ABCD'))
+    ts.iloc[:700, 3] = np.nan  # D has too little data on the first dates after 2012
+    return ts
+
+
+@pytest.mark.parametrize('cov_type', ['rolling', 'ewma', 'factor'])
+def test_new_prices_keep_conditional_entries(backtesting, ts, tmp_path, cov_type):
+    parameters = dict(h=21, cov_type=cov_type, cov_window=252, n_factors=2)
+    dates = backtesting.FHBacktestAncilliaryFunctions.resample_dates(ts.index[:-1], 'ME')
+    provider = backtesting.FHCovarianceProvider(ts.iloc[:-1], **parameters)
+    unconditional = provider.uses_unconditional_cov(dates)
+    assert unconditional.any() and not unconditional.all()
+
+    cache = backtesting.FHBacktestCache(tmp_path)
+    cache.covariances(ts.iloc[:-1], dates, **parameters)
+    hits, misses = cache.hits, cache.misses
+    covs = cache.covariances(ts, dates, **parameters)
+    assert cache.misses - misses == unconditional.sum()
+    assert cache.hits - hits == (~unconditional).sum()
+
+    reference = backtesting.FHCovarianceProvider(ts, dates=dates, **parameters)
+    for d, cov in zip(dates, covs):
+        expected = reference.get_cov_matrix_on_date(d)
+        if cov_type == 'factor':
+            np.testing.assert_array_equal(cov.loadings, expected.loadings)
+            np.testing.assert_array_equal(cov.idiosyncratic, expected.idiosyncratic)
+        else:
+            np.testing.assert_allclose(cov.to_numpy(), expected.to_numpy(), rtol=1e-12, atol=0)
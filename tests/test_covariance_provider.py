@@ -0,0 +1,111 @@
+"""
+FHCovarianceProvider returns the covariance matrices of the original get_cov_matrix_on_date (reproduced below as
+reference_cov_matrix_on_date), which recalculated everything on each date with pandas: up to rounding for the rolling
+and expanding windows, which are updated with running sums, and exactly for the ewma recursion
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def reference_cov_matrix_on_date(d, ts, h=21, cov_type='rolling', cov_window=756, halflife=60,
+                                 shrinkage_parameter=1):
+    ts = ts.astype(float)
+    ts.index = pd.DatetimeIndex(pd.to_datetime(ts.index))
+    r = max([x for x in ts.index if x <= pd.to_datetime(d)])
+
+    t0 = ts.index[0]
+    unc_cov = np.log(ts).diff(h).cov() * (252 / h)
+
+    if (r - t0).days < cov_window:
+        cov = unc_cov.copy()
+    else:
+        past_data = ts.shift(1).loc[:r]
+        if cov_type == 'expanding':
+            cond_cov = np.log(past_data).diff(h).cov() * (252 / h)
+        elif cov_type == 'ewma':
+            cond_cov = (np.log(past_data).diff(1).ewm(halflife=halflife).cov().loc[r]) * 252
+        else:
+            cond_cov = np.log(past_data.iloc[-cov_window:]).diff(h).cov() * (252 / h)
+
+        count_past = past_data.count()
+        for x in count_past[count_past <= cov_window].index:
+            cond_cov.loc[x, :] = unc_cov.loc[x, :].values
+            cond_cov.loc[:, x] = unc_cov.loc[:, x].values
+        cov = cond_cov.copy()
+
+    if 0 <= shrinkage_parameter < 1:
+        vols = pd.Series(index=cov.index, data=np.sqrt(np.diag(cov)))
+        corr = cov.div(vols, axis=0).div(vols, axis=1)
+        corr = shrinkage_parameter * corr + (1 - shrinkage_parameter) * np.eye(len(vols))
+        cov = corr.multiply(vols, axis=0).multiply(vols, axis=1).copy()
+
+    return cov
+
+
+@pytest.fixture(scope='module')
+def prices():
+    # series starting at different dates, one of them with an interior gap in the data
+    rng = np.random.default_rng(13)
+    index = pd.bdate_range('2010-01-04', periods=1000)
+    returns = rng.normal(0.0002, 0.01, (len(index), 5)) + rng.normal(0, 0.005, (len(index), 1))
+    ts = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index, columns=list('ABCDE'))
+    ts.iloc[:150, 1] = np.nan
+    ts.iloc[:400, 3] = np.nan
+    ts.iloc[600:640, 4] = np.nan
+    return ts
+
+
+@pytest.fixture(scope='module')
+def dates(prices):
+    return pd.DatetimeIndex(prices.resample('BME').last().index[1:-1])
+
+
+def relative_errors(cov, reference):
+    vols = np.sqrt(np.abs(np.diag(reference)))
+    return np.abs(np.asarray(cov) - np.asarray(reference)) / np.outer(vols, vols)
+
+
+@pytest.mark.parametrize('cov_type', ['rolling', 'expanding'])
+def test_windows_match_reference(backtesting, prices, dates, cov_type):
+    provider = backtesting.FHCovarianceProvider(prices, cov_type=cov_type, cov_window=252, dates=dates)
+    for d in dates:
+        reference = reference_cov_matrix_on_date(d, prices, cov_type=cov_type, cov_window=252)
+        cov = provider.get_cov_matrix_on_date(d)
+        assert cov.index.equals(reference.index) and cov.columns.equals(reference.columns)
+        assert relative_errors(cov, reference).max() < 1e-12
+
+
+def test_ewma_matches_reference_exactly(backtesting, prices, dates):
+    provider = backtesting.FHCovarianceProvider(prices, cov_type='ewma', cov_window=252, halflife=30, dates=dates)
+    for d in dates:
+        reference = reference_cov_matrix_on_date(d, prices, cov_type='ewma', cov_window=252, halflife=30)
+        np.testing.assert_array_equal(provider.get_cov_matrix_on_date(d).values, reference.values)
+
+
+def test_shrinkage_matches_reference(backtesting, prices, dates):
+    provider = backtesting.FHCovarianceProvider(prices, cov_type='ewma', cov_window=252, shrinkage_parameter=0.5)
+    for d in dates[::4]:
+        reference = reference_cov_matrix_on_date(d, prices, cov_type='ewma', cov_window=252, shrinkage_parameter=0.5)
+        np.testing.assert_array_equal(provider.get_cov_matrix_on_date(d).values, reference.values)
+
+
+@pytest.mark.parametrize('cov_type', ['rolling', 'expanding', 'ewma'])
+def test_request_order_does_not_matter(backtesting, prices, dates, cov_type):
+    in_order = backtesting.FHCovarianceProvider(prices, cov_type=cov_type, cov_window=252, dates=dates)
+    shuffled = backtesting.FHCovarianceProvider(prices, cov_type=cov_type, cov_window=252)
+    covs = {d: in_order.get_cov_matrix_on_date(d) for d in dates}
+    for d in np.random.default_rng(0).permutation(dates):
+        cov = shuffled.get_cov_matrix_on_date(d)
+        assert relative_errors(cov, covs[d]).max() < 1e-12
+        if cov_type == 'ewma':
+            assert cov.equals(covs[d])
+
+
+@pytest.mark.parametrize('cov_type', ['rolling', 'expanding', 'ewma'])
+def test_get_cov_matrix_on_date_uses_the_provider(backtesting, prices, dates, cov_type):
+    provider = backtesting.FHCovarianceProvider(prices, cov_type=cov_type, cov_window=252)
+    d = dates[-1]
+    cov = backtesting.FHBacktestAncilliaryFunctions.get_cov_matrix_on_date(d, prices, cov_type=cov_type,
+                                                                            cov_window=252)
+    assert cov.equals(provider.get_cov_matrix_on_date(d))
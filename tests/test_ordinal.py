@@ -0,0 +1,32 @@
+"""
+Scalar offsets of BusinessDayOrdinals near the edges of its table, where the rolls leave the table, are the same as
+numpy.busday_offset with the same busdaycalendar
+"""
+import numpy as np
+import pytest
+from calendars import DayCounts
+from calendars.holidays.ordinal import BusinessDayOrdinals
+
+ROLLS = ['following', 'preceding', 'modifiedfollowing', 'modifiedpreceding']
+# the table starts on a holiday and ends on a Thursday before a weekend and a holiday in the next month
+CALENDAR = np.busdaycalendar(holidays=['2020-01-01', '2020-12-25', '2021-01-01'])
+TABLE = BusinessDayOrdinals(CALENDAR, '2020-01-01', '2020-12-31')
+EDGES = np.concatenate([np.arange('2020-01-01', '2020-01-08', dtype='datetime64[D]'),
+                        np.arange('2020-12-24', '2021-01-01', dtype='datetime64[D]')])
+
+
+@pytest.mark.parametrize('roll', ROLLS)
+@pytest.mark.parametrize('offset', [-3, -1, 0, 1, 2, 3])
+def test_scalar_offsets_at_table_edges(roll, offset):
+    for d in EDGES:
+        expected = np.busday_offset(d, offset, roll=roll, busdaycal=CALENDAR)
+        assert TABLE.offset(d, offset, roll) == expected, (d, offset, roll)
+        assert TABLE.offset(d, offset, roll) == TABLE.offset(np.array([d]), offset, roll)[0], (d, offset, roll)
+
+
+def test_modified_roll_past_default_window():
+    ordinals = DayCounts('bus/252', adj='modifiedfollowing', calendar='anbima')
+    numpy = DayCounts('bus/252', adj='modifiedfollowing', calendar='anbima', ordinals=False)
+    for d in ['2039-12-29', '2039-12-30', '2039-12-31']:
+        for offset in [1, 2, 5]:
+            assert ordinals.workday(d, offset) == numpy.workday(d, offset), (d, offset)
@@ -0,0 +1,98 @@
+"""
+Pins the rebalancing dates returned by FHBacktestAncilliaryFunctions.resample_dates, which are the same as the ones of
+the original implementation (with a loop over the dates to snap them to the index), for every rebalance code, lists of
+months, custom dates (including duplicates) and parameters that are not recognized
+"""
+import pandas as pd
+import pytest
+
+# business days with a few holes, so that rebalancing days are snapped to the closest day of the index
+HOLES = pd.to_datetime(['2020-01-01', '2020-01-15', '2020-03-31', '2020-06-30', '2020-07-01', '2020-12-25',
+                        '2020-12-31', '2021-01-01'])
+LONG_INDEX = pd.bdate_range('2019-11-25', '2021-02-12').difference(HOLES)
+SHORT_INDEX = pd.bdate_range('2019-12-23', '2020-02-21').difference(HOLES)
+
+MONTH_END = ['2019-11-29', '2019-12-31', '2020-01-31', '2020-02-28', '2020-03-30', '2020-04-30', '2020-05-29',
+             '2020-06-29', '2020-07-31', '2020-08-31', '2020-09-30', '2020-10-30', '2020-11-30', '2020-12-30',
+             '2021-01-29']
+QUARTER_END = ['2019-12-31', '2020-03-30', '2020-06-29', '2020-09-30', '2020-12-30']
+SEMESTER_END = ['2019-12-31', '2020-06-29', '2020-12-30']
+YEAR_END = ['2019-12-31', '2020-12-30']
+
+EXPECTED = {
+    'W': (SHORT_INDEX, ['2019-12-30', '2019-12-31', '2019-12-31', '2020-01-02', '2020-01-03', '2020-01-06',
+                        '2020-01-07', '2020-01-09', '2020-01-10', '2020-01-13', '2020-01-14', '2020-01-14',
+                        '2020-01-16', '2020-01-17', '2020-01-20', '2020-01-21', '2020-01-23', '2020-01-24',
+                        '2020-01-27', '2020-01-28', '2020-01-29', '2020-01-30', '2020-01-31', '2020-02-03',
+                        '2020-02-04', '2020-02-05', '2020-02-06', '2020-02-07', '2020-02-10', '2020-02-11',
+                        '2020-02-12', '2020-02-13', '2020-02-14', '2020-02-17', '2020-02-18', '2020-02-19',
+                        '2020-02-20', '2020-02-21']),
+    'WW': (SHORT_INDEX, ['2019-12-25', '2019-12-31', '2020-01-08', '2020-01-14', '2020-01-22', '2020-01-29',
+                         '2020-02-05', '2020-02-12', '2020-02-19']),
+    'WF': (SHORT_INDEX, ['2019-12-27', '2020-01-03', '2020-01-10', '2020-01-17', '2020-01-24', '2020-01-31',
+                         '2020-02-07', '2020-02-14', '2020-02-21']),
+    'WM': (SHORT_INDEX, ['2019-12-30', '2020-01-06', '2020-01-13', '2020-01-20', '2020-01-27', '2020-02-03',
+                         '2020-02-10', '2020-02-17']),
+    'M': (LONG_INDEX, MONTH_END),
+    'ME': (LONG_INDEX, MONTH_END),
+    'MM': (LONG_INDEX, ['2019-12-13', '2020-01-14', '2020-02-14', '2020-03-13', '2020-04-15', '2020-05-15',
+                        '2020-06-15', '2020-07-15', '2020-08-14', '2020-09-15', '2020-10-15', '2020-11-13',
+                        '2020-12-15', '2021-01-15']),
+    'MS': (LONG_INDEX, ['2019-12-02', '2020-01-02', '2020-02-03', '2020-03-02', '2020-04-01', '2020-05-01',
+                        '2020-06-01', '2020-07-02', '2020-08-03', '2020-09-01', '2020-10-01', '2020-11-02',
+                        '2020-12-01', '2021-01-04', '2021-02-01']),
+    'Q': (LONG_INDEX, QUARTER_END),
+    'QE': (LONG_INDEX, QUARTER_END),
+    'QM': (LONG_INDEX, ['2019-12-13', '2020-03-13', '2020-06-15', '2020-09-15', '2020-12-15']),
+    'QS': (LONG_INDEX, ['2019-12-02', '2020-03-02', '2020-06-01', '2020-09-01', '2020-12-01']),
+    'S': (LONG_INDEX, SEMESTER_END),
+    'SE': (LONG_INDEX, SEMESTER_END),
+    'SM': (LONG_INDEX, ['2019-12-13', '2020-06-15', '2020-12-15']),
+    'SS': (LONG_INDEX, ['2019-12-02', '2020-06-01', '2020-12-01']),
+    'Y': (LONG_INDEX, YEAR_END),
+    'YE': (LONG_INDEX, YEAR_END),
+    'YM': (LONG_INDEX, ['2020-01-14', '2021-01-15']),
+    'YS': (LONG_INDEX, ['2020-01-02', '2021-01-04']),
+}
+
+
+def resample(backtesting, index, rebalance):
+    return backtesting.FHBacktestAncilliaryFunctions.resample_dates(index, rebalance)
+
+
+@pytest.mark.parametrize('code', list(EXPECTED))
+def test_rebalance_codes(backtesting, code):
+    index, expected = EXPECTED[code]
+    dates = resample(backtesting, index, code)
+    assert isinstance(dates, pd.DatetimeIndex)
+    assert dates.equals(pd.DatetimeIndex(pd.to_datetime(expected)))
+    assert dates.isin(index).all()
+
+
+def test_list_of_months(backtesting):
+    dates = resample(backtesting, LONG_INDEX, [3, 6, 12])
+    assert dates.equals(pd.DatetimeIndex(pd.to_datetime(['2019-12-31', '2020-03-30', '2020-06-29', '2020-12-30'])))
+
+
+def test_custom_dates(backtesting):
+    # dates not in the index are snapped to the closest one (the earlier one in a tie) and dates after it are dropped
+    custom = list(pd.to_datetime(['2020-01-15', '2020-02-14', '2020-06-30', '2020-07-04', '2021-03-01']))
+    dates = resample(backtesting, LONG_INDEX, custom)
+    assert dates.equals(pd.DatetimeIndex(pd.to_datetime(['2020-01-14', '2020-02-14', '2020-06-29', '2020-07-03'])))
+
+
+def test_duplicate_custom_dates(backtesting):
+    # duplicates are kept, including the ones that come from snapping different dates to the same day
+    custom = list(pd.to_datetime(['2020-06-30', '2020-07-01', '2020-07-01']))
+    dates = resample(backtesting, LONG_INDEX, custom)
+    assert dates.equals(pd.DatetimeIndex(pd.to_datetime(['2020-06-29', '2020-07-02', '2020-07-02'])))
+
+
+@pytest.mark.parametrize('rebalance, message', [
+    ('XX', 'rebalance string not recognized, assuming month end frequency (last day of the month)'),
+    (3, 'rebalance parameter not recognized, assuming month end frequency (last day of the month)'),
+])
+def test_not_recognized(backtesting, capsys, rebalance, message):
+    dates = resample(backtesting, LONG_INDEX, rebalance)
+    assert capsys.readouterr().out == message + '\n'
+    assert dates.equals(pd.DatetimeIndex(pd.to_datetime(MONTH_END)))
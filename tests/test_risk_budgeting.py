@@ -0,0 +1,55 @@
+"""
+Risk budgeting weights within caps have the target volatility, respect the caps, and equal risk contributions for the
+assets below their caps, with the same weights for a FHFactorCovariance and its dense matrix
+"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def covariances(backtesting):
+    rng = np.random.default_rng(3)
+    loadings = 0.1 * rng.normal(size=(40, 4))
+    idiosyncratic = rng.uniform(0.01, 0.04, 40)
+    signs = np.where(rng.normal(size=40) > 0, 1., -1.)
+    factor = backtesting.FHFactorCovariance(loadings, idiosyncratic).take(np.arange(40), signs)
+    dense = (loadings @ loadings.T + np.diag(idiosyncratic)) * np.outer(signs, signs)
+    return factor, dense
+
+
+@pytest.mark.parametrize('vol_target', [0.02, 0.1])
+def test_bounded_risk_parity_weights(backtesting, covariances, vol_target):
+    functions = backtesting.FHBacktestAncilliaryFunctions
+    factor, dense = covariances
+    y, converged, _ = functions.risk_parity_weights(dense)
+    caps = np.full(40, 0.9 * vol_target * y.max())
+    weights = {}
+    for cov in [factor, dense]:
+        w, converged, _ = functions.bounded_risk_parity_weights(cov, vol_target, caps)
+        assert converged
+        assert (w >= 0).all() and (w <= caps).all()
+        assert np.sqrt(w @ dense @ w) == pytest.approx(vol_target, rel=1e-8)
+        contributions = w * (dense @ w)
+        below = (w > 0) & (w < caps)
+        assert below.any() and (w == caps).any()
+        assert contributions[below] == pytest.approx(np.full(below.sum(), contributions[below].mean()), rel=1e-6)
+        assert (contributions[w == caps] <= contributions[below].mean() * (1 + 1e-6)).all()
+        weights[type(cov).__name__] = w
+    assert weights['FHFactorCovariance'] == pytest.approx(weights['ndarray'], rel=1e-6, abs=1e-12)
+
+
+def test_unbinding_caps_give_risk_parity(backtesting, covariances):
+    functions = backtesting.FHBacktestAncilliaryFunctions
+    _, dense = covariances
+    y, _, _ = functions.risk_parity_weights(dense)
+    w, converged, _ = functions.bounded_risk_parity_weights(dense, 0.1, np.full(40, 1.))
+    assert converged
+    assert w == pytest.approx(0.1 * y / np.sqrt(y @ dense @ y), rel=1e-6)
+
+
+def test_hedges_are_dropped_above_the_capped_volatility(backtesting):
+    # the first two assets hedge each other, so the capped weights have a volatility of 0.16 only
+    cov = 0.04 * np.array([[1, -0.95, 0], [-0.95, 1, 0], [0, 0, 1]])
+    w, converged, _ = backtesting.FHBacktestAncilliaryFunctions.bounded_risk_parity_weights(cov, 0.2, np.full(3, 0.8))
+    assert converged
+    assert w == pytest.approx([np.sqrt(0.5), 0, np.sqrt(0.5)])
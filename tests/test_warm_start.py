@@ -0,0 +1,48 @@
+"""
+Warm starts are chained in blocks of dates that do not depend on the number of processes, so the weights of a
+strategy, and of the strategy extended with append, are the same for any n_jobs
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(11)
+    index = pd.bdate_range('2005-01-03', periods=1300)
+    returns = rng.normal(0.0003, 0.01, (len(index), 5)) + rng.normal(0, 0.006, (len(index), 1))
+    ts = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index, columns=list('ABCDE'))
+    signals = np.log(ts).diff(126)
+    return ts, signals
+
+
+@pytest.mark.parametrize('n_jobs', [2, 3])
+def test_signal_based_weights_do_not_depend_on_n_jobs(backtesting, data, n_jobs):
+    ts, signals = data
+    parameters = dict(DTINI='2006-01-31', weighting_scheme='ERC', rebalance='ME', cov_window=252, warm_start=True)
+    serial = backtesting.FHSignalBasedWeights(ts, signals, n_jobs=1, **parameters)
+    parallel = backtesting.FHSignalBasedWeights(ts, signals, n_jobs=n_jobs, **parameters)
+    assert parallel.weights.equals(serial.weights)
+    assert parallel.solver_info.equals(serial.solver_info)
+
+
+def test_long_only_weights_do_not_depend_on_n_jobs(backtesting, data):
+    ts, _ = data
+    parameters = dict(DTINI='2006-01-31', static=False, weighting_scheme='MVR', rebalance='ME', cov_window=252,
+                      warm_start=True)
+    serial = backtesting.FHLongOnlyWeights(ts, n_jobs=1, **parameters)
+    parallel = backtesting.FHLongOnlyWeights(ts, n_jobs=2, **parameters)
+    assert parallel.weights.equals(serial.weights)
+    assert parallel.solver_info.equals(serial.solver_info)
+
+
+def test_parallel_append(backtesting, data):
+    ts, signals = data
+    parameters = dict(DTINI='2006-01-31', weighting_scheme='ERC', rebalance='ME', cov_window=252, warm_start=True,
+                      n_jobs=2)
+    strategy = backtesting.FHSignalBasedWeights(ts.iloc[:900], signals.iloc[:900], **parameters)
+    strategy.append(ts.iloc[900:], signals.iloc[900:])
+    rebuilt = backtesting.FHSignalBasedWeights(ts, signals, **parameters)
+    assert strategy.weights.equals(rebuilt.weights)
+    assert strategy.solver_info.equals(rebuilt.solver_info)